@@ -16,8 +16,6 @@ from django.core.paginator import Paginator
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 import json
-import openpyxl
-from openpyxl_image_loader import SheetImageLoader
 from PIL import Image
 import io
 import os
@@ -28,6 +26,7 @@ from .models import (
     Product, ProductAssemblyProcess, ProductStage, Station, ProductMedia, BOMTemplate, BOMTemplateItem, 
     AssemblyProcess, AssemblyStage, BillOfMaterial, BOMItem
 )
+from screen_app.bom_import import ExcelBOMImporter
 
 
 def get_product_stages_for_dropdown(request, product_id):
@@ -144,224 +143,13 @@ def upload_bom_items_excel(request, template_id):
         return JsonResponse({'success': False, 'error': str(e)})
 
 def process_excel_file_for_template(excel_file, bom_template, default_unit, default_supplier, overwrite_existing):
-    """Process Excel file and create BOM items and template items"""
-    result = {
-        'success': False,
-        'created': 0,
-        'updated': 0,
-        'skipped': 0,
-        'errors': []
-    }
-    
-    try:
-        # Load workbook
-        workbook = openpyxl.load_workbook(excel_file, data_only=True)
-        sheet = workbook.active
-        
-        # Load images from the sheet
-        image_loader = SheetImageLoader(sheet)
-        
-        # Find header row
-        header_row = None
-        for row_num in range(1, 6):
-            row_values = [str(cell.value).strip().upper() if cell.value else '' for cell in sheet[row_num]]
-            if any('ITEM DESCRIPTION' in val or 'DESCRIPTION' in val for val in row_values):
-                header_row = row_num
-                break
-        
-        if header_row is None:
-            result['error'] = "Could not find header row with 'ITEM DESCRIPTION' column"
-            return result
-        
-        # Map column indices
-        headers = [str(cell.value).strip().upper() if cell.value else '' for cell in sheet[header_row]]
-        
-        col_mapping = {}
-        for idx, header in enumerate(headers):
-            if 'S.' in header and 'NO' in header:
-                col_mapping['s_no'] = idx
-            elif 'CODE' in header and 'ITEM' not in header:  # Just "Code" column, not "Item Code"
-                col_mapping['code'] = idx
-            elif 'ITEM DESCRIPTION' in header or 'DESCRIPTION' in header:
-                col_mapping['description'] = idx
-            elif 'PART NO' in header or 'PART_NO' in header:
-                col_mapping['part_no'] = idx
-            elif 'QTY' in header or 'QUANTITY' in header:
-                col_mapping['qty'] = idx
-            elif 'PHOTO' in header or 'IMAGE' in header:
-                col_mapping['photo'] = idx
-        
-        # Validate required columns
-        required_cols = ['description', 'part_no']
-        missing_cols = [col for col in required_cols if col not in col_mapping]
-        if missing_cols:
-            result['error'] = f"Missing required columns: {missing_cols}"
-            return result
-        
-        # Process data rows
-        for row_num in range(header_row + 1, sheet.max_row + 1):
-            row = sheet[row_num]
-            
-            # Skip empty rows
-            if all(cell.value is None or str(cell.value).strip() == '' for cell in row):
-                continue
-            
-            try:
-                # Extract data
-                s_no = str(row[col_mapping.get('s_no', 0)].value).strip() if col_mapping.get('s_no') is not None else str(row_num - header_row)
-                code = str(row[col_mapping.get('code', 0)].value).strip() if col_mapping.get('code') is not None and row[col_mapping.get('code', 0)].value else ''
-                description = str(row[col_mapping['description']].value).strip() if row[col_mapping['description']].value else ''
-                part_no = str(row[col_mapping['part_no']].value).strip() if row[col_mapping['part_no']].value else ''
-                qty = str(row[col_mapping.get('qty', 0)].value).strip() if col_mapping.get('qty') is not None and row[col_mapping.get('qty', 0)].value else '1'
-                
-                # Skip if essential data is missing
-                if not description or not part_no:
-                    result['skipped'] += 1
-                    continue
-                
-                # Use the Code column if provided, otherwise generate from description
-                if code:
-                    # Use the provided code, clean it up
-                    item_code = code.upper().replace(' ', '_').replace('-', '_')
-                    item_code = ''.join(c for c in item_code if c.isalnum() or c == '_')
-                else:
-                    # Generate item_code from description as fallback
-                    item_code = description.upper().replace(' ', '_').replace('-', '_')
-                    item_code = ''.join(c for c in item_code if c.isalnum() or c == '_')
-                
-                # Ensure item_code is not empty
-                if not item_code:
-                    item_code = f"ITEM_{row_num - header_row}"
-                
-                # Check if BOM item exists
-                bom_item = None
-                item_created = False
-                try:
-                    bom_item = BOMItem.objects.get(item_code=item_code)
-                    if overwrite_existing:
-                        # Update existing item
-                        bom_item.item_description = description
-                        bom_item.part_number = part_no
-                        bom_item.unit_of_measure = default_unit
-                        if default_supplier:
-                            bom_item.supplier = default_supplier
-                        
-                        # Handle image extraction for existing item
-                        if 'photo' in col_mapping:
-                            photo_cell = f"{openpyxl.utils.get_column_letter(col_mapping['photo'] + 1)}{row_num}"
-                            if image_loader.image_in(photo_cell):
-                                try:
-                                    image = image_loader.get(photo_cell)
-                                    if image:
-                                        # Delete old image if exists
-                                        if bom_item.item_photo:
-                                            bom_item.item_photo.delete(save=False)
-                                        
-                                        img_io = io.BytesIO()
-                                        if image.mode == 'RGBA':
-                                            image.save(img_io, format='PNG', optimize=True)
-                                            filename = f"{item_code.lower()}.png"
-                                        else:
-                                            if image.mode not in ['RGB', 'L']:
-                                                image = image.convert('RGB')
-                                            image.save(img_io, format='JPEG', quality=95, optimize=True)
-                                            filename = f"{item_code.lower()}.jpg"
-                                        
-                                        img_io.seek(0)
-                                        image_file = ContentFile(img_io.getvalue(), name=filename)
-                                        bom_item.item_photo = image_file
-                                except Exception as e:
-                                    result['errors'].append(f"Row {row_num}: Could not extract image - {str(e)}")
-                        
-                        bom_item.save()
-                        result['updated'] += 1
-                    # If not overwriting, just use the existing item
-                except BOMItem.DoesNotExist:
-                    # Create new BOM item
-                    bom_item_data = {
-                        'item_code': item_code,
-                        'item_description': description,
-                        'part_number': part_no,
-                        'unit_of_measure': default_unit,
-                        'supplier': default_supplier or '',
-                        'is_active': True
-                    }
-                    
-                    # Handle image extraction for new item
-                    if 'photo' in col_mapping:
-                        photo_cell = f"{openpyxl.utils.get_column_letter(col_mapping['photo'] + 1)}{row_num}"
-                        if image_loader.image_in(photo_cell):
-                            try:
-                                image = image_loader.get(photo_cell)
-                                if image:
-                                    img_io = io.BytesIO()
-                                    if image.mode == 'RGBA':
-                                        image.save(img_io, format='PNG', optimize=True)
-                                        filename = f"{item_code.lower()}.png"
-                                    else:
-                                        if image.mode not in ['RGB', 'L']:
-                                            image = image.convert('RGB')
-                                        image.save(img_io, format='JPEG', quality=95, optimize=True)
-                                        filename = f"{item_code.lower()}.jpg"
-                                    
-                                    img_io.seek(0)
-                                    image_file = ContentFile(img_io.getvalue(), name=filename)
-                                    bom_item_data['item_photo'] = image_file
-                            except Exception as e:
-                                result['errors'].append(f"Row {row_num}: Could not extract image - {str(e)}")
-                    
-                    bom_item = BOMItem.objects.create(**bom_item_data)
-                    result['created'] += 1
-                    item_created = True
-                
-                # Create or update BOM Template Item
-                try:
-                    serial_number = int(s_no) if s_no.isdigit() else row_num - header_row
-                    
-                    # Parse quantity - handle different formats
-                    try:
-                        base_quantity = float(qty) if qty.replace('.', '').replace(',', '').isdigit() else 1.0
-                    except (ValueError, AttributeError):
-                        base_quantity = 1.0
-                    
-                    # Check if template item already exists with this serial number
-                    try:
-                        template_item = BOMTemplateItem.objects.get(
-                            bom_template=bom_template,
-                            serial_number=serial_number
-                        )
-                        
-                        if overwrite_existing:
-                            template_item.item = bom_item
-                            template_item.base_quantity = base_quantity
-                            template_item.save()
-                        # If not overwriting and item exists, skip
-                        
-                    except BOMTemplateItem.DoesNotExist:
-                        # Create new template item
-                        BOMTemplateItem.objects.create(
-                            bom_template=bom_template,
-                            item=bom_item,
-                            serial_number=serial_number,
-                            base_quantity=base_quantity,
-                            is_active=True
-                        )
-                        
-                except Exception as e:
-                    result['errors'].append(f"Row {row_num}: Error creating template item - {str(e)}")
-                    # If we created a BOM item but failed to create template item, we might want to keep the BOM item
-                    # for potential future use, so we don't delete it here
-                    
-            except Exception as e:
-                result['errors'].append(f"Row {row_num}: {str(e)}")
-                continue
-        
-        result['success'] = True
-        
-    except Exception as e:
-        result['error'] = str(e)
-    
-    return result 
+    """Process Excel file and create BOM items and template items (streaming, see screen_app.bom_import)"""
+    importer = ExcelBOMImporter(
+        bom_template, default_unit, default_supplier, overwrite_existing,
+        item_model=BOMItem, template_item_model=BOMTemplateItem,
+        cache=None, search_index=None
+    )
+    return importer.run(excel_file)
 
  
 # ZIP Upload for Product Media
@@ -3,6 +3,11 @@ ASGI config for fcc project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server (e.g. ``uvicorn fcc.asgi:application``) so the
+station SSE streams run as async generators: an idle display then waits on
+the event loop instead of holding a worker thread. Ordinary views run in
+Django's sync-to-async thread as usual.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
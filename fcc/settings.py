@@ -57,6 +57,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'fcc.wsgi.application'
+ASGI_APPLICATION = 'fcc.asgi.application'
 
 # Database
 DATABASES = {
@@ -108,3 +109,21 @@ X_FRAME_OPTIONS = 'SAMEORIGIN'
 
 LOGIN_URL = '/accounts/login/'
 LOGOUT_REDIRECT_URL = '/'
+
+# Shared display state (BOM pagination, reload/sync signals) - must be visible
+# to every worker process. SQLite works for all workers on one host; use Redis
+# when the app runs on several hosts.
+SCREEN_STATE_BACKEND = {
+    'BACKEND': 'screen_app.state.SQLiteStateBackend',
+    'LOCATION': BASE_DIR / 'screen_state.sqlite3',
+}
+# SCREEN_STATE_BACKEND = {
+#     'BACKEND': 'screen_app.state.RedisStateBackend',
+#     'LOCATION': 'redis://localhost:6379/0',
+# }
+
+# Media delivery offload for stream_video/stream_pdf: None (Django sends the
+# file with sendfile), 'x-accel-redirect' (nginx, internal location below) or
+# 'x-sendfile' (Apache mod_xsendfile / lighttpd)
+SCREEN_MEDIA_OFFLOAD = None
+SCREEN_MEDIA_OFFLOAD_PREFIX = '/protected-media/'
@@ -5,22 +5,14 @@ from django.db import models
 from django.urls import path
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
-import openpyxl
-from openpyxl_image_loader import SheetImageLoader
-from PIL import Image
-import io
-import os
-import zipfile
-import tempfile
-from pathlib import Path
 from .models import (
     Product, AssemblyStage, AssemblyProcess, BillOfMaterial, 
     ProductMedia, Station, AssemblySession,
     # New models
     BOMItem, BOMTemplate, BOMTemplateItem
 )
+from .media_import import import_media_zip
+from .bom_import import import_bom_excel
 
 
 
@@ -179,163 +171,8 @@ class BOMItemAdmin(admin.ModelAdmin):
         return render(request, 'admin/bomitem_excel_upload.html', context)
     
     def process_excel_file(self, excel_file, default_unit, default_supplier, overwrite_existing):
-        """Process the uploaded Excel file and create BOM items"""
-        result = {
-            'success': False,
-            'created': 0,
-            'updated': 0,
-            'skipped': 0,
-            'errors': []
-        }
-        
-        try:
-            # Load workbook
-            workbook = openpyxl.load_workbook(excel_file, data_only=True)
-            sheet = workbook.active
-            
-            # Load images from the sheet
-            image_loader = SheetImageLoader(sheet)
-            
-            # Expected columns: S. NO, ITEM DESCRIPTION, PART NO., QTY, ITEM PHOTO
-            # Find header row (usually row 1)
-            header_row = None
-            for row_num in range(1, 6):  # Check first 5 rows for headers
-                row_values = [str(cell.value).strip().upper() if cell.value else '' for cell in sheet[row_num]]
-                if any('ITEM DESCRIPTION' in val or 'DESCRIPTION' in val for val in row_values):
-                    header_row = row_num
-                    break
-            
-            if header_row is None:
-                result['error'] = "Could not find header row with 'ITEM DESCRIPTION' column"
-                return result
-            
-            # Map column indices
-            headers = [str(cell.value).strip().upper() if cell.value else '' for cell in sheet[header_row]]
-            
-            col_mapping = {}
-            for idx, header in enumerate(headers):
-                if 'S.' in header and 'NO' in header:
-                    col_mapping['s_no'] = idx
-                elif 'ITEM DESCRIPTION' in header or 'DESCRIPTION' in header:
-                    col_mapping['description'] = idx
-                elif 'PART NO' in header or 'PART_NO' in header:
-                    col_mapping['part_no'] = idx
-                elif 'QTY' in header or 'QUANTITY' in header:
-                    col_mapping['qty'] = idx
-                elif 'PHOTO' in header or 'IMAGE' in header:
-                    col_mapping['photo'] = idx
-            
-            # Validate required columns
-            required_cols = ['description', 'part_no']
-            missing_cols = [col for col in required_cols if col not in col_mapping]
-            if missing_cols:
-                result['error'] = f"Missing required columns: {missing_cols}"
-                return result
-            
-            # Process data rows
-            for row_num in range(header_row + 1, sheet.max_row + 1):
-                row = sheet[row_num]
-                
-                # Skip empty rows
-                if all(cell.value is None or str(cell.value).strip() == '' for cell in row):
-                    continue
-                
-                try:
-                    # Extract data
-                    s_no = str(row[col_mapping.get('s_no', 0)].value).strip() if col_mapping.get('s_no') is not None else str(row_num - header_row)
-                    description = str(row[col_mapping['description']].value).strip() if row[col_mapping['description']].value else ''
-                    part_no = str(row[col_mapping['part_no']].value).strip() if row[col_mapping['part_no']].value else ''
-                    qty = str(row[col_mapping.get('qty', 0)].value).strip() if col_mapping.get('qty') is not None and row[col_mapping.get('qty', 0)].value else '1'
-                    
-                    # Skip if essential data is missing
-                    if not description or not part_no:
-                        result['skipped'] += 1
-                        continue
-                    
-                    # Generate item_code from description (clean and uppercase)
-                    item_code = description.upper().replace(' ', '_').replace('-', '_')
-                    # Remove special characters and keep only alphanumeric and underscore
-                    item_code = ''.join(c for c in item_code if c.isalnum() or c == '_')
-                    
-                    # Check if item exists
-                    existing_item = None
-                    try:
-                        existing_item = BOMItem.objects.get(item_code=item_code)
-                        if not overwrite_existing:
-                            result['skipped'] += 1
-                            continue
-                    except BOMItem.DoesNotExist:
-                        pass
-                    
-                    # Handle image extraction - use original image without padding
-                    image_file = None
-                    if 'photo' in col_mapping:
-                        photo_cell = f"{openpyxl.utils.get_column_letter(col_mapping['photo'] + 1)}{row_num}"
-                        if image_loader.image_in(photo_cell):
-                            try:
-                                # Get the image using the image loader
-                                image = image_loader.get(photo_cell)
-                                if image:
-                                    # Save the image without any processing - just as extracted
-                                    img_io = io.BytesIO()
-                                    
-                                    # Use the original format and quality
-                                    if image.mode == 'RGBA':
-                                        image.save(img_io, format='PNG', optimize=True)
-                                        filename = f"{item_code.lower()}.png"
-                                    else:
-                                        if image.mode not in ['RGB', 'L']:
-                                            image = image.convert('RGB')
-                                        image.save(img_io, format='JPEG', quality=95, optimize=True)
-                                        filename = f"{item_code.lower()}.jpg"
-                                    
-                                    img_io.seek(0)
-                                    image_file = ContentFile(img_io.getvalue(), name=filename)
-                                    
-                            except Exception as e:
-                                result['errors'].append(f"Row {row_num}: Could not extract image - {str(e)}")
-                    
-                    # Create or update BOM item
-                    item_data = {
-                        'item_description': description,
-                        'part_number': part_no,
-                        'unit_of_measure': default_unit,
-                        'supplier': default_supplier,
-                        'is_active': True
-                    }
-                    
-                    if existing_item:
-                        # Update existing item
-                        for key, value in item_data.items():
-                            setattr(existing_item, key, value)
-                        
-                        if image_file:
-                            # Delete old image if exists
-                            if existing_item.item_photo:
-                                existing_item.item_photo.delete(save=False)
-                            existing_item.item_photo = image_file
-                        
-                        existing_item.save()
-                        result['updated'] += 1
-                    else:
-                        # Create new item
-                        item_data['item_code'] = item_code
-                        if image_file:
-                            item_data['item_photo'] = image_file
-                        
-                        BOMItem.objects.create(**item_data)
-                        result['created'] += 1
-                
-                except Exception as e:
-                    result['errors'].append(f"Row {row_num}: {str(e)}")
-                    continue
-            
-            result['success'] = True
-            
-        except Exception as e:
-            result['error'] = str(e)
-        
-        return result
+        """Process the uploaded Excel file and create BOM items (streaming, see bom_import)"""
+        return import_bom_excel(excel_file, None, default_unit, default_supplier, overwrite_existing)
     
     def changelist_view(self, request, extra_context=None):
         """Add upload button to changelist"""
@@ -820,101 +657,17 @@ class ProductAdmin(admin.ModelAdmin):
         return render(request, 'admin/product_zip_upload.html', context)
     
     def process_zip_file(self, product, form_data):
-        """Process uploaded zip file and create ProductMedia objects"""
-        result = {
-            'success': False,
-            'total_files': 0,
-            'pdfs': 0,
-            'videos': 0,
-            'skipped': 0,
-            'errors': []
-        }
-        
-        zip_file = form_data['zip_file']
-        process = form_data.get('process')
-        bom = form_data.get('bom')
-        default_duration = form_data['default_duration']
-        display_screen_1 = form_data['display_screen_1']
-        display_screen_2 = form_data['display_screen_2']
-        display_screen_3 = form_data['display_screen_3']
-        
-        # Supported file extensions
-        PDF_EXTENSIONS = {'.pdf'}
-        VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv', '.wmv', '.flv', '.webm'}
-        
-        try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Extract zip file
-                with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-                    zip_ref.extractall(temp_dir)
-                
-                # Process all files in the extracted directory
-                for root, dirs, files in os.walk(temp_dir):
-                    for filename in files:
-                        file_path = os.path.join(root, filename)
-                        file_ext = Path(filename).suffix.lower()
-                        
-                        # Skip hidden files and system files
-                        if filename.startswith('.') or filename.startswith('__MACOSX'):
-                            continue
-                        
-                        try:
-                            # Determine media type based on extension
-                            media_type = None
-                            duration = None
-                            
-                            if file_ext in PDF_EXTENSIONS:
-                                media_type = 'PROCESS_DOCUMENT'
-                                result['pdfs'] += 1
-                            elif file_ext in VIDEO_EXTENSIONS:
-                                media_type = 'VIDEO'
-                                duration = default_duration
-                                result['videos'] += 1
-                            else:
-                                result['skipped'] += 1
-                                continue
-                            
-                            # Read file content
-                            with open(file_path, 'rb') as f:
-                                file_content = f.read()
-                            
-                            # Create ContentFile
-                            django_file = ContentFile(file_content, name=filename)
-                            
-                            # Create ProductMedia object
-                            media_data = {
-                                'product': product,
-                                'media_type': media_type,
-                                'file': django_file,
-                                'display_screen_1': display_screen_1,
-                                'display_screen_2': display_screen_2,
-                                'display_screen_3': display_screen_3,
-                            }
-                            
-                            # Add optional fields
-                            if process:
-                                media_data['process'] = process
-                            if bom:
-                                media_data['bom'] = bom
-                            if duration:
-                                media_data['duration'] = duration
-                            
-                            # Create the ProductMedia object
-                            ProductMedia.objects.create(**media_data)
-                            result['total_files'] += 1
-                            
-                        except Exception as e:
-                            result['errors'].append(f"{filename}: {str(e)}")
-                            continue
-            
-            result['success'] = True
-            
-        except zipfile.BadZipFile:
-            result['error'] = "Invalid zip file"
-        except Exception as e:
-            result['error'] = str(e)
-        
-        return result
+        """Process uploaded zip file and create ProductMedia objects (streaming, see media_import)"""
+        return import_media_zip(
+            product,
+            form_data['zip_file'],
+            process=form_data.get('process'),
+            bom=form_data.get('bom'),
+            default_duration=form_data['default_duration'],
+            display_screen_1=form_data['display_screen_1'],
+            display_screen_2=form_data['display_screen_2'],
+            display_screen_3=form_data['display_screen_3'],
+        )
     
     def change_view(self, request, object_id, form_url='', extra_context=None):
         """Add zip upload button to product change view"""
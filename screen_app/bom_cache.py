@@ -0,0 +1,85 @@
+"""
+Versioned LRU cache for BOM template expansions.
+
+BOMTemplate.generate_bom_for_quantity is called several times per request
+(items for the display, pagination info, split info) and again for every
+display. Expansions are cached under (template id, template version,
+effective quantity); signals bump a template's version whenever one of its
+lines or items changes, so stale entries are simply never looked up again and
+age out of the LRU.
+
+The entries live in each worker, but the template versions are kept in
+shared_state, so a change saved through one worker invalidates the
+expansions cached by all of them.
+"""
+import threading
+from collections import OrderedDict
+
+from django.db import transaction
+
+from .state import StateKeys, shared_state
+
+
+class BOMExpansionCache:
+    """Thread-safe LRU of expanded BOM rows"""
+
+    MAX_ENTRIES = 256
+
+    def __init__(self, max_entries=None):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_entries = max_entries or self.MAX_ENTRIES
+
+    def version(self, template_id):
+        """Current version of a template's expansion"""
+        return shared_state.get(StateKeys.bom_template_version(template_id), 0)
+
+    def bump(self, *template_ids):
+        """
+        Invalidate the cached expansions of the given templates.
+
+        Inside a transaction the versions are bumped again on commit: a
+        worker that rebuilt from the old rows in between would otherwise
+        have cached them under the version bumped at save time.
+        """
+        template_ids = [template_id for template_id in template_ids if template_id is not None]
+        self._bump(template_ids)
+        if template_ids and transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self._bump(template_ids))
+
+    @staticmethod
+    def _bump(template_ids):
+        for template_id in template_ids:
+            shared_state.incr(StateKeys.bom_template_version(template_id))
+
+    def get_or_build(self, template_id, effective_quantity, build):
+        """
+        Return a fresh list of expanded rows, calling build() on a miss.
+
+        Rows are shallow-copied on the way out because callers annotate them
+        (e.g. screen_position) and must not leak that into the cache.
+        """
+        key = (template_id, self.version(template_id), effective_quantity)
+        with self._lock:
+            rows = self._entries.get(key)
+            if rows is not None:
+                self._entries.move_to_end(key)
+
+        if rows is None:
+            rows = tuple(build())
+            # Only store if nothing was invalidated while we were building
+            if key[1] == self.version(template_id):
+                with self._lock:
+                    self._entries[key] = rows
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+
+        return [dict(row) for row in rows]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+bom_expansion_cache = BOMExpansionCache()
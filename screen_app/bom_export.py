@@ -0,0 +1,151 @@
+"""
+Streaming CSV / XLSX exports of BOM items and BOM templates.
+
+Rows are read with values_list(...).iterator(chunk_size=...) - no model
+instances, no full result set in memory - and written as they are produced:
+
+- CSV goes straight out through a StreamingHttpResponse, csv.writer writing
+  into an Echo pseudo-buffer that just hands each line back;
+- XLSX uses openpyxl's write-only workbook, which flushes rows to a temp
+  file as they are appended, and the finished file is streamed from disk.
+
+Memory therefore stays flat whatever the size of the catalog.
+"""
+import csv
+import re
+import tempfile
+import time
+
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+
+ITERATOR_CHUNK_SIZE = 2000
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+ALL_ITEMS_HEADER = [
+    'Item Code', 'Description', 'Part Number', 'Unit',
+    'Supplier', 'Cost per Unit', 'Weight per Unit', 'Active', 'Created Date'
+]
+TEMPLATE_HEADER = [
+    'S.NO', 'Item Code', 'Item Description', 'Part Number',
+    'Quantity', 'Unit', 'Supplier', 'Cost per Unit', 'Line Cost', 'Notes'
+]
+
+
+class Echo:
+    """File-like object whose write() returns the value instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def all_items_rows():
+    """Header and one row per BOM item, ordered by item code"""
+    from .models import BOMItem
+
+    yield ALL_ITEMS_HEADER
+    items = BOMItem.objects.order_by('item_code').values_list(
+        'item_code', 'item_description', 'part_number', 'unit_of_measure',
+        'supplier', 'cost_per_unit', 'weight_per_unit', 'is_active', 'created_date'
+    )
+    for code, description, part_number, unit, supplier, cost, weight, is_active, created in items.iterator(
+            chunk_size=ITERATOR_CHUNK_SIZE):
+        yield [
+            code,
+            description,
+            part_number,
+            unit,
+            supplier or '',
+            cost or '',
+            weight or '',
+            'Yes' if is_active else 'No',
+            created.strftime('%Y-%m-%d %H:%M:%S'),
+        ]
+
+
+def template_rows(template, quantity=1, summary=True):
+    """Header, the template's active lines for a quantity and a summary block"""
+    from .models import BOMTemplateItem
+
+    yield TEMPLATE_HEADER
+    effective_quantity = template.get_effective_quantity(quantity)
+    lines = BOMTemplateItem.objects.filter(bom_template=template, is_active=True).order_by('serial_number').values_list(
+        'serial_number', 'base_quantity', 'notes', 'item__item_code', 'item__item_description',
+        'item__part_number', 'item__unit_of_measure', 'item__supplier', 'item__cost_per_unit'
+    )
+
+    line_count = 0
+    total_cost = 0
+    for serial, base_quantity, notes, code, description, part_number, unit, supplier, cost in lines.iterator(
+            chunk_size=ITERATOR_CHUNK_SIZE):
+        calculated_quantity = base_quantity * effective_quantity
+        line_cost = calculated_quantity * (cost or 0)
+        total_cost += line_cost
+        line_count += 1
+        yield [
+            serial,
+            code,
+            description,
+            part_number,
+            calculated_quantity,
+            unit,
+            supplier or '',
+            cost or '',
+            f"{line_cost:.2f}" if line_cost > 0 else '',
+            notes or '',
+        ]
+
+    if summary:
+        yield []
+        yield ['Summary']
+        yield ['Total Items:', line_count]
+        yield ['Total Cost:', f"{total_cost:.2f}"]
+        yield ['Quantity:', quantity]
+        yield ['Template:', template.template_name]
+        yield ['Product:', f"{template.product.code} - {template.product.name}"]
+        yield ['Generated:', time.strftime('%Y-%m-%d %H:%M:%S')]
+
+
+def _content_disposition(response, filename):
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def stream_csv(rows, filename):
+    """StreamingHttpResponse writing rows as CSV lines as they are produced"""
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse((writer.writerow(row) for row in rows), content_type='text/csv')
+    return _content_disposition(response, filename)
+
+
+def sheet_title(title, used):
+    """Valid, unique worksheet title (max 31 chars, no []:*?/\\)"""
+    base = re.sub(r'[\[\]:*?/\\]', '-', title).strip() or 'Sheet'
+    candidate, counter = base[:31], 2
+    while candidate.lower() in used:
+        suffix = f" ({counter})"
+        candidate = base[:31 - len(suffix)] + suffix
+        counter += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def stream_xlsx(sheets, filename):
+    """
+    Write-only XLSX response for [(sheet title, rows), ...].
+
+    openpyxl spools each sheet's rows to disk while they are appended; the
+    finished workbook is a temp file that is streamed and deleted on close.
+    """
+    workbook = Workbook(write_only=True)
+    used_titles = set()
+    for title, rows in sheets:
+        worksheet = workbook.create_sheet(sheet_title(title, used_titles))
+        for row in rows:
+            worksheet.append(row)
+
+    output = tempfile.TemporaryFile(suffix='.xlsx')
+    workbook.save(output)
+    output.seek(0)
+    response = FileResponse(output, content_type=XLSX_CONTENT_TYPE)
+    return _content_disposition(response, filename)
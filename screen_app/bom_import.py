@@ -0,0 +1,409 @@
+"""
+Streaming Excel importer for BOM items and BOM template lines.
+
+The sheet is opened read-only and walked once with iter_rows(values_only=True),
+so no cell objects are built and memory stays flat for large sheets. Existing
+items (by item code) and template lines (by serial number) are fetched once
+up front into dicts; every row is then resolved in memory and the changes are
+written with bulk_create / bulk_update inside one transaction - a handful of
+queries for the whole sheet instead of 2-4 per row.
+
+bulk_create / bulk_update do not send post_save, so the importer bumps the
+BOM expansion cache and updates the search index itself (see bom_cache,
+search and signals).
+
+Embedded photos are extracted and thumbnailed in parallel by bom_photos;
+rows only link BOMItem.item_photo to the stored files.
+
+Used by the nipha-admin upload (process_excel_file_for_template), the
+background import jobs and the Django admin (BOMItemAdmin.process_excel_file).
+"""
+import openpyxl
+from django.db import transaction
+from django.utils import timezone
+from openpyxl.drawing.spreadsheet_drawing import SpreadsheetDrawing
+from openpyxl.packaging.relationship import get_dependents, get_rels_path
+from openpyxl.reader.drawings import find_images
+
+from .bom_cache import bom_expansion_cache
+from .bom_photos import PHOTO_VARIANTS, store_bom_photos, thumbnail_name
+from .events import publish_station_change
+from .search import search_backend
+
+HEADER_SCAN_ROWS = 5
+BULK_BATCH_SIZE = 500
+
+ITEM_UPDATE_FIELDS = ['item_description', 'part_number', 'unit_of_measure', 'supplier', 'item_photo', 'updated_date']
+LINE_UPDATE_FIELDS = ['item', 'base_quantity']
+
+
+def _text(value):
+    return str(value).strip() if value is not None else ''
+
+
+def clean_item_code(value):
+    """Item code from a Code cell or description: upper case, alphanumerics and underscores"""
+    item_code = value.upper().replace(' ', '_').replace('-', '_')
+    return ''.join(c for c in item_code if c.isalnum() or c == '_')
+
+
+def map_columns(headers):
+    """Column index of each known field in the header row"""
+    col_mapping = {}
+    for idx, header in enumerate(headers):
+        if 'S.' in header and 'NO' in header:
+            col_mapping['s_no'] = idx
+        elif 'CODE' in header and 'ITEM' not in header:  # Just "Code" column, not "Item Code"
+            col_mapping['code'] = idx
+        elif 'ITEM DESCRIPTION' in header or 'DESCRIPTION' in header:
+            col_mapping['description'] = idx
+        elif 'PART NO' in header or 'PART_NO' in header:
+            col_mapping['part_no'] = idx
+        elif 'QTY' in header or 'QUANTITY' in header:
+            col_mapping['qty'] = idx
+        elif 'UOM' in header or ('UNIT' in header and 'MEASURE' in header):
+            col_mapping['uom'] = idx
+        elif 'PHOTO' in header or 'IMAGE' in header:
+            col_mapping['photo'] = idx
+    return col_mapping
+
+
+def sheet_images(sheet):
+    """
+    {(row, column index): image bytes} of the pictures anchored in a sheet.
+
+    Read-only worksheets do not load drawings, so the sheet's drawing parts
+    are read straight from the workbook archive.
+    """
+    archive = sheet.parent._archive
+    rels_path = get_rels_path(sheet._worksheet_path)
+    if rels_path not in archive.namelist():
+        return {}
+
+    images = {}
+    for rel in get_dependents(archive, rels_path).find(SpreadsheetDrawing._rel_type):
+        _, found = find_images(archive, rel.target)
+        for image in found:
+            anchor = getattr(image.anchor, '_from', None)
+            if anchor is not None:
+                images[(anchor.row + 1, anchor.col)] = image._data()
+    return images
+
+
+class BOMRow:
+    """One parsed data row of the sheet"""
+    __slots__ = ('index', 'row_num', 'serial_number', 'item_code', 'description', 'part_no',
+                 'quantity', 'unit_of_measure', 'image', 'photo')
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+
+class ExcelBOMImporter:
+    """
+    Import a BOM sheet into BOM items and, when bom_template is given, its lines.
+
+    Without a template (the Django admin upload) only items are imported and
+    existing items are skipped unless overwrite_existing is set. The model
+    classes can be swapped for apps with the same BOM schema.
+    """
+
+    def __init__(self, bom_template=None, default_unit='NO.', default_supplier='', overwrite_existing=False,
+                 item_model=None, template_item_model=None, cache=bom_expansion_cache,
+                 search_index=search_backend):
+        from .models import BOMItem, BOMTemplateItem
+
+        self.bom_template = bom_template
+        self.default_unit = default_unit
+        self.default_supplier = default_supplier or ''
+        self.overwrite_existing = overwrite_existing
+        self.item_model = item_model or BOMItem
+        self.template_item_model = template_item_model or BOMTemplateItem
+        self.cache = cache
+        self.search_index = search_index
+
+    @staticmethod
+    def new_result():
+        return {
+            'success': False,
+            'created': 0,
+            'updated': 0,
+            'skipped': 0,
+            'errors': []
+        }
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def read_sheet(self, excel_file, result, resume_from=0):
+        """Parse the active sheet into (rows, data row count); None on a bad layout"""
+        workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            rows = sheet.iter_rows(values_only=True)
+
+            header_row = None
+            for row_num, values in enumerate(rows, start=1):
+                if row_num > HEADER_SCAN_ROWS:
+                    break
+                headers = [_text(value).upper() for value in values]
+                if any('ITEM DESCRIPTION' in val or 'DESCRIPTION' in val for val in headers):
+                    header_row = row_num
+                    break
+            if header_row is None:
+                result['error'] = "Could not find header row with 'ITEM DESCRIPTION' column"
+                return None, 0
+
+            col_mapping = map_columns(headers)
+            missing_cols = [col for col in ['description', 'part_no'] if col not in col_mapping]
+            if missing_cols:
+                result['error'] = f"Missing required columns: {missing_cols}"
+                return None, 0
+
+            images = sheet_images(sheet) if 'photo' in col_mapping else {}
+            parsed = []
+            data_rows = 0
+            for index, values in enumerate(rows):
+                row_num = header_row + 1 + index
+                data_rows = index + 1
+                if index < resume_from:
+                    continue
+                row = self.parse_row(index, row_num, header_row, values, col_mapping, images, result)
+                if row is not None:
+                    parsed.append(row)
+            return parsed, data_rows
+        finally:
+            workbook.close()
+
+    def parse_row(self, index, row_num, header_row, values, col_mapping, images, result):
+        """BOMRow for a data row, or None when it is empty or skipped"""
+        def cell(field):
+            idx = col_mapping.get(field)
+            return values[idx] if idx is not None and idx < len(values) else None
+
+        # Skip empty rows
+        if all(value is None or str(value).strip() == '' for value in values):
+            return None
+
+        try:
+            s_no = _text(cell('s_no')) if 's_no' in col_mapping else str(row_num - header_row)
+            code = _text(cell('code'))
+            description = _text(cell('description'))
+            part_no = _text(cell('part_no'))
+            qty = _text(cell('qty')) or '1'
+            uom = _text(cell('uom'))
+
+            # Skip if essential data is missing
+            if not description or not part_no:
+                result['skipped'] += 1
+                return None
+
+            # Use the Code column if provided, otherwise generate from description
+            item_code = clean_item_code(code or description) or f"ITEM_{row_num - header_row}"
+
+            serial_number = int(s_no) if s_no.isdigit() else row_num - header_row
+            try:
+                base_quantity = float(qty) if qty.replace('.', '').replace(',', '').isdigit() else 1.0
+            except ValueError:
+                base_quantity = 1.0
+
+            return BOMRow(
+                index=index,
+                row_num=row_num,
+                serial_number=serial_number,
+                item_code=item_code,
+                description=description,
+                part_no=part_no,
+                quantity=base_quantity,
+                unit_of_measure=uom or self.default_unit,
+                image=images.get((row_num, col_mapping['photo'])) if 'photo' in col_mapping else None,
+            )
+        except Exception as e:
+            result['errors'].append(f"Row {row_num}: {str(e)}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def prefetch(self, rows):
+        """Existing items by item code and template lines by serial number"""
+        codes = {row.item_code for row in rows}
+        items = {}
+        codes_list = list(codes)
+        for start in range(0, len(codes_list), BULK_BATCH_SIZE):
+            items.update(self.item_model.objects.filter(
+                item_code__in=codes_list[start:start + BULK_BATCH_SIZE]
+            ).in_bulk(field_name='item_code'))
+
+        lines = {}
+        if self.bom_template is not None:
+            lines = {
+                line.serial_number: line
+                for line in self.template_item_model.objects.filter(bom_template=self.bom_template)
+            }
+        return items, lines
+
+    def attach_photos(self, rows, items, result):
+        """Store the photos of rows that will set one; sets row.photo to the stored name"""
+        images = {}
+        for row in rows:
+            if row.image is not None and (self.overwrite_existing or row.item_code not in items):
+                images[row.row_num] = row.image
+            row.image = None
+
+        stored, failed = store_bom_photos(images, self.item_model._meta.get_field('item_photo'))
+        for row in rows:
+            row.photo = stored.get(row.row_num)
+            if row.row_num in failed:
+                result['errors'].append(f"Row {row.row_num}: Could not extract image - {failed[row.row_num]}")
+
+    def resolve(self, rows, items, lines, result):
+        """Apply rows to the in-memory items/lines; returns what has to be written"""
+        new_items, changed_items, new_lines, changed_lines = {}, {}, [], {}
+        replaced_photos = []
+
+        for row in rows:
+            bom_item = items.get(row.item_code)
+            if bom_item is not None:
+                if self.overwrite_existing:
+                    bom_item.item_description = row.description
+                    bom_item.part_number = row.part_no
+                    bom_item.unit_of_measure = row.unit_of_measure
+                    if self.default_supplier:
+                        bom_item.supplier = self.default_supplier
+                    if row.photo and row.photo != bom_item.item_photo.name:
+                        if bom_item.item_photo and bom_item.pk:
+                            replaced_photos.append(bom_item.item_photo.name)
+                        bom_item.item_photo = row.photo
+                    if bom_item.pk:
+                        changed_items[row.item_code] = bom_item
+                    result['updated'] += 1
+                elif self.bom_template is None:
+                    result['skipped'] += 1
+                    continue
+                # If not overwriting, just use the existing item
+            else:
+                bom_item = self.item_model(
+                    item_code=row.item_code,
+                    item_description=row.description,
+                    part_number=row.part_no,
+                    unit_of_measure=row.unit_of_measure,
+                    supplier=self.default_supplier,
+                    is_active=True,
+                )
+                if row.photo:
+                    bom_item.item_photo = row.photo
+                items[row.item_code] = new_items[row.item_code] = bom_item
+                result['created'] += 1
+
+            if self.bom_template is None:
+                continue
+
+            line = lines.get(row.serial_number)
+            if line is None:
+                line = self.template_item_model(
+                    bom_template=self.bom_template,
+                    item=bom_item,
+                    serial_number=row.serial_number,
+                    base_quantity=row.quantity,
+                    is_active=True,
+                )
+                lines[row.serial_number] = line
+                new_lines.append(line)
+            elif self.overwrite_existing:
+                line.item = bom_item
+                line.base_quantity = row.quantity
+                if line.pk:
+                    changed_lines[row.serial_number] = line
+
+        return list(new_items.values()), list(changed_items.values()), new_lines, list(changed_lines.values()), replaced_photos
+
+    def write(self, new_items, changed_items, new_lines, changed_lines, replaced_photos):
+        """bulk write one resolved batch (call inside a transaction)"""
+        now = timezone.now()
+        for bom_item in changed_items:
+            bom_item.updated_date = now
+
+        self.item_model.objects.bulk_create(new_items, batch_size=BULK_BATCH_SIZE)
+        if changed_items:
+            self.item_model.objects.bulk_update(changed_items, ITEM_UPDATE_FIELDS, batch_size=BULK_BATCH_SIZE)
+        self.template_item_model.objects.bulk_create(new_lines, batch_size=BULK_BATCH_SIZE)
+        if changed_lines:
+            self.template_item_model.objects.bulk_update(changed_lines, LINE_UPDATE_FIELDS, batch_size=BULK_BATCH_SIZE)
+
+        if replaced_photos:
+            transaction.on_commit(lambda: self.delete_unused_photos(replaced_photos))
+        if self.cache is not None:
+            self.invalidate(changed_items)
+        if self.search_index is not None:
+            # Same database and transaction as the rows themselves
+            self.search_index.index(new_items + changed_items)
+
+    def delete_unused_photos(self, names):
+        """Delete replaced photos - stored photos are shared, so only when nothing uses them"""
+        in_use = set(self.item_model.objects.filter(item_photo__in=names).values_list('item_photo', flat=True))
+        storage = self.item_model._meta.get_field('item_photo').storage
+        for name in set(names) - in_use:
+            storage.delete(name)
+            for variant in PHOTO_VARIANTS:
+                storage.delete(thumbnail_name(name, variant))
+
+    def invalidate(self, changed_items):
+        """Bulk writes skip the post_save signals - bump the cached expansions ourselves"""
+        templates = set()
+        if self.bom_template is not None:
+            templates.add((self.bom_template.pk, self.bom_template.product_id))
+        if changed_items:
+            templates.update(self.template_item_model.objects.filter(
+                item__in=[bom_item.pk for bom_item in changed_items]
+            ).values_list('bom_template_id', 'bom_template__product_id'))
+        if templates:
+            transaction.on_commit(lambda: self.cache.bump(*(template_id for template_id, _ in templates)))
+        for product_id in {product_id for _, product_id in templates}:
+            publish_station_change('bom', product_id=product_id)
+
+    def run(self, excel_file, resume_from=0, progress=None, progress_every=100):
+        """
+        Import a sheet; returns the upload summary used by the admin pages.
+
+        Without progress the whole sheet is written in one transaction.
+        Background jobs pass progress(rows_done, total_rows, result): rows
+        are then written in batches of progress_every data rows, each in its
+        own transaction together with the callback (the job checkpoint), and
+        rows before resume_from are skipped.
+        """
+        result = self.new_result()
+        try:
+            rows, data_rows = self.read_sheet(excel_file, result, resume_from)
+            if rows is None:
+                return result
+            items, lines = self.prefetch(rows)
+            self.attach_photos(rows, items, result)
+
+            batch_size = progress_every if progress else max(len(rows), 1)
+            batch_ends = list(range(resume_from + batch_size, data_rows, batch_size)) + [data_rows]
+            position = 0
+            for batch_end in batch_ends:
+                batch = []
+                while position < len(rows) and rows[position].index < batch_end:
+                    batch.append(rows[position])
+                    position += 1
+                with transaction.atomic():
+                    self.write(*self.resolve(batch, items, lines, result))
+                    if progress:
+                        progress(batch_end, data_rows, result)
+
+            result['success'] = True
+        except Exception as e:
+            result['error'] = str(e)
+        return result
+
+
+def import_bom_excel(excel_file, bom_template=None, default_unit='NO.', default_supplier='',
+                     overwrite_existing=False, **options):
+    """Import BOM items (and lines of bom_template) from an Excel sheet"""
+    importer = ExcelBOMImporter(bom_template, default_unit, default_supplier, overwrite_existing)
+    return importer.run(excel_file, **options)
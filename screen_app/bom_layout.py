@@ -0,0 +1,100 @@
+"""
+Single-pass BOM page planner.
+
+A BOMPageLayout expands a template once and answers every pagination
+question about it - total pages, which serial range each display shows on a
+page, and the items of one display/page - without expanding the BOM again.
+"""
+import math
+
+
+class BOMPageLayout:
+    """Page and display layout of one expanded BOM template"""
+
+    DISPLAY_COUNT = 3
+    ITEMS_PER_DISPLAY = 8
+
+    def __init__(self, template, quantity=1, items_per_screen=8):
+        self.template = template
+        self.quantity = quantity
+        self.is_split = template.should_split_across_displays()
+        self.items = template.generate_bom_for_quantity(quantity)
+        self.total_items = len(self.items)
+
+        if self.is_split:
+            # SINGLE_UNIT / BATCH_50: 8 items on each of the 3 displays per page
+            self.items_per_display = self.ITEMS_PER_DISPLAY
+            self.items_per_page = self.ITEMS_PER_DISPLAY * self.DISPLAY_COUNT
+            self.screens_count = self.DISPLAY_COUNT
+        else:
+            # Stage-specific BOMs: paginated on Display 1 only
+            self.items_per_display = items_per_screen
+            self.items_per_page = items_per_screen
+            self.screens_count = 1
+
+        self.total_pages = math.ceil(self.total_items / self.items_per_page) if self.total_items > 0 else 1
+
+    def page_bounds(self, page):
+        """(start, end) item indexes of a page"""
+        if page < 1:
+            return 0, 0
+        page_start = (page - 1) * self.items_per_page
+        return page_start, min(page_start + self.items_per_page, self.total_items)
+
+    def display_bounds(self, page, display_number):
+        """(start, end) item indexes shown on a display for a page - empty when start >= end"""
+        page_start, page_end = self.page_bounds(page)
+        if not self.is_split:
+            if display_number != 1:
+                return page_start, page_start
+            return page_start, page_end
+
+        page_items_count = page_end - page_start
+        display_start = (display_number - 1) * self.items_per_display
+        display_end = min(display_start + self.items_per_display, page_items_count)
+        return page_start + display_start, page_start + display_end
+
+    def items_for_display(self, display_number, page=1):
+        """Items a display shows on a page"""
+        start, end = self.display_bounds(page, display_number)
+        if start >= end or start >= self.total_items:
+            return []
+        return self.items[start:end]
+
+    def display_distribution(self, page=1):
+        """Serial ranges of each display for a page (None for non-split BOMs)"""
+        if not self.is_split:
+            return None
+
+        distribution = {}
+        for display in range(1, self.DISPLAY_COUNT + 1):
+            start, end = self.display_bounds(page, display)
+            if end > start:
+                distribution[f'display_{display}'] = {
+                    'start_serial': start + 1,
+                    'end_serial': end,
+                    'item_count': end - start
+                }
+            else:
+                distribution[f'display_{display}'] = {
+                    'start_serial': 0,
+                    'end_serial': 0,
+                    'item_count': 0
+                }
+        return distribution
+
+    def page_ranges(self):
+        """Per-display serial ranges for every page"""
+        return [
+            {'page': page, 'displays': self.display_distribution(page)}
+            for page in range(1, self.total_pages + 1)
+        ]
+
+    def pagination_info(self):
+        """Pagination summary in the BOMTemplate.get_pagination_info_for_split format"""
+        return {
+            'total_pages': self.total_pages,
+            'items_per_page': self.items_per_page,
+            'items_per_screen': self.items_per_display,
+            'total_items': self.total_items
+        }
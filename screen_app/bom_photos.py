@@ -0,0 +1,172 @@
+"""
+Parallel processing of the photos embedded in BOM spreadsheets.
+
+Pictures are hashed first so identical photos (the same part on several
+lines or sheets) are processed and stored once. The unique ones are decoded
+and resized in a process pool - Pillow work is CPU bound and would otherwise
+serialise on the request thread - and the resulting files are written to
+storage from a thread pool.
+
+Every photo is stored full size under a content-addressed name
+("photo.<hash>.<ext>", see media_store) plus one thumbnail per entry of
+PHOTO_VARIANTS next to it in a thumbs/ directory. Photos already in a web
+format are stored as-is rather than re-encoded. The row import then only
+links BOMItem.item_photo to the stored name.
+
+    SCREEN_BOM_PHOTO_WORKERS = None   # process pool size (default: CPU count)
+"""
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, features
+
+from .media_store import fingerprinted_name
+
+logger = logging.getLogger(__name__)
+
+# Longest side in pixels of each stored thumbnail
+PHOTO_VARIANTS = {
+    'sm': 128,
+    'md': 320,
+    'lg': 800,
+}
+THUMBNAIL_QUALITY = 82
+THUMBNAIL_DIR = 'thumbs'
+POOL_THRESHOLD = 4   # fewer unique photos than this are processed inline
+WRITE_THREADS = 4
+
+# Formats browsers show directly - stored without re-encoding
+WEB_FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp'}
+
+
+def thumbnail_extension():
+    return '.webp' if features.check('webp') else '.png'
+
+
+def thumbnail_name(photo_name, variant):
+    """Storage name of a photo's thumbnail: <dir>/thumbs/<stem>.<variant>.<ext>"""
+    directory, filename = os.path.split(photo_name)
+    stem = os.path.splitext(filename)[0]
+    return f"{directory}/{THUMBNAIL_DIR}/{stem}.{variant}{thumbnail_extension()}"
+
+
+def encode_thumbnail(image, size):
+    """Encode a resized copy of an open image (never upscaled)"""
+    thumb = image.copy()
+    thumb.thumbnail((size, size), Image.LANCZOS)
+    if thumb.mode not in ('RGB', 'RGBA'):
+        thumb = thumb.convert('RGBA' if 'A' in thumb.getbands() or 'transparency' in thumb.info else 'RGB')
+    output = io.BytesIO()
+    if thumbnail_extension() == '.webp':
+        thumb.save(output, 'WEBP', quality=THUMBNAIL_QUALITY, method=4)
+    else:
+        thumb.save(output, 'PNG')
+    return output.getvalue()
+
+
+def render_photo(image_bytes):
+    """
+    Process-pool stage for one unique photo.
+
+    Returns (full-size bytes, extension, {variant: thumbnail bytes}).
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        extension = WEB_FORMATS.get(image.format)
+        if extension:
+            full = image_bytes
+        else:
+            # EMF/TIFF/BMP and the like - convert once for the browser
+            output = io.BytesIO()
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image.convert('RGBA').save(output, 'PNG')
+                extension = '.png'
+            else:
+                image.convert('RGB').save(output, 'JPEG', quality=90)
+                extension = '.jpg'
+            full = output.getvalue()
+        image.load()
+        thumbnails = {variant: encode_thumbnail(image, size) for variant, size in PHOTO_VARIANTS.items()}
+    return full, extension, thumbnails
+
+
+def _render_all(unique):
+    """Run render_photo over {digest: bytes}; yields (digest, result or exception)"""
+    workers = getattr(settings, 'SCREEN_BOM_PHOTO_WORKERS', None) or os.cpu_count() or 1
+    done = set()  # already yielded - a pool that breaks halfway must not repeat them
+    if len(unique) >= POOL_THRESHOLD and workers > 1:
+        try:
+            # spawn: forking a threaded server process is not safe
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=min(workers, len(unique)), mp_context=context) as pool:
+                futures = {digest: pool.submit(render_photo, data) for digest, data in unique.items()}
+                for digest, future in futures.items():
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        result = e
+                    done.add(digest)
+                    yield digest, result
+            return
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning(f"Photo process pool unavailable, processing inline: {e}")
+
+    for digest, data in unique.items():
+        if digest in done:
+            continue
+        try:
+            yield digest, render_photo(data)
+        except Exception as e:
+            yield digest, e
+
+
+def store_bom_photos(images, field):
+    """
+    Store embedded photos for an ImageField.
+
+    images maps any key (e.g. the sheet row) to raw image bytes. Returns
+    (stored, failed): key -> stored photo name, and key -> error message.
+    """
+    digests = {key: hashlib.sha256(data).hexdigest() for key, data in images.items()}
+    unique = {}
+    for key, digest in digests.items():
+        unique.setdefault(digest, images[key])
+
+    storage = field.storage
+    names, errors, writes = {}, {}, []
+    for digest, rendered in _render_all(unique):
+        if isinstance(rendered, Exception):
+            errors[digest] = str(rendered)
+            continue
+        full, extension, thumbnails = rendered
+        name = field.generate_filename(None, fingerprinted_name(f"photo{extension}", digest))
+        names[digest] = name
+        writes.append((name, full))
+        writes.extend((thumbnail_name(name, variant), data) for variant, data in thumbnails.items())
+
+    def write(item):
+        name, data = item
+        if not storage.exists(name):
+            stored_name = storage.save(name, ContentFile(data))
+            if stored_name != name:
+                # Lost a race with an identical write - keep the canonical copy
+                storage.delete(stored_name)
+
+    with ThreadPoolExecutor(max_workers=WRITE_THREADS, thread_name_prefix='bom-photos') as pool:
+        list(pool.map(write, writes))
+
+    stored, failed = {}, {}
+    for key, digest in digests.items():
+        if digest in names:
+            stored[key] = names[digest]
+        else:
+            failed[key] = errors.get(digest, 'could not process image')
+    return stored, failed
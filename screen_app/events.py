@@ -0,0 +1,238 @@
+"""
+In-process publish/subscribe bus for station state changes.
+
+Views that change station or pagination state publish an event here; the SSE
+streams block on the bus between updates. When an event for their station (or
+its product) arrives - or on a short recheck, for changes committed by other
+workers - a stream reads station_state_version() and rebuilds its payload
+only if that moved.
+
+Every publish also bumps shared change counters (see state_versions), which
+polling clients use as a cheap "has anything changed?" check across workers.
+"""
+import asyncio
+import threading
+import time
+from collections import deque, namedtuple
+
+from django.db import transaction
+
+from .state import StateKeys, shared_state
+
+
+StationEvent = namedtuple(
+    'StationEvent',
+    ['seq', 'kind', 'station_ids', 'product_id', 'data', 'timestamp']
+)
+
+
+class StationEventBus:
+    """Thread-safe pub/sub bus keyed by station id and product id"""
+
+    HISTORY_SIZE = 512
+
+    def __init__(self, history_size=None):
+        self._condition = threading.Condition()
+        self._events = deque(maxlen=history_size or self.HISTORY_SIZE)
+        self._seq = 0
+        # (event loop, asyncio.Event) pairs of async subscribers currently waiting
+        self._async_waiters = set()
+
+    @property
+    def last_seq(self):
+        """Sequence number of the most recent event (0 if none yet)"""
+        with self._condition:
+            return self._seq
+
+    def publish(self, kind, station_ids=None, product_id=None, **data):
+        """
+        Publish a state change.
+
+        station_ids and product_id select who is notified; when both are None
+        the event is a broadcast that every subscriber receives.
+        """
+        with self._condition:
+            self._seq += 1
+            event = StationEvent(
+                seq=self._seq,
+                kind=kind,
+                station_ids=frozenset(station_ids) if station_ids is not None else None,
+                product_id=product_id,
+                data=data,
+                timestamp=time.time(),
+            )
+            self._events.append(event)
+            self._condition.notify_all()
+            for loop, wakeup in self._async_waiters:
+                try:
+                    loop.call_soon_threadsafe(wakeup.set)
+                except RuntimeError:
+                    # Event loop already closed - its waiter is going away
+                    pass
+        return event.seq
+
+    def events_since(self, after_seq, station_id=None, product_id=None, all_stations=False):
+        """Return the events after after_seq that concern the given subscriber"""
+        with self._condition:
+            return self._matching(after_seq, station_id, product_id, all_stations)
+
+    def wait(self, after_seq, station_id=None, product_id=None, timeout=None, all_stations=False):
+        """
+        Block until an event for this subscriber is published after after_seq.
+
+        Returns (last_seq, events); events is empty when the timeout expired
+        first. Pass the returned last_seq back in on the next call. A
+        subscriber with all_stations receives every event (supervisor views).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                events = self._matching(after_seq, station_id, product_id, all_stations)
+                if events:
+                    return self._seq, events
+
+                # Nothing relevant so far - skip what we've already scanned
+                after_seq = self._seq
+                if deadline is None:
+                    self._condition.wait()
+                    continue
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return self._seq, []
+                self._condition.wait(remaining)
+
+    async def wait_async(self, after_seq, station_id=None, product_id=None, timeout=None, all_stations=False):
+        """
+        Async version of wait() for ASGI streams.
+
+        Suspends the calling coroutine instead of blocking a thread, so one
+        event loop can hold any number of idle subscribers.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self._condition:
+                events = self._matching(after_seq, station_id, product_id, all_stations)
+                if events:
+                    return self._seq, events
+
+                after_seq = self._seq
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    return self._seq, []
+
+                waiter = (loop, asyncio.Event())
+                self._async_waiters.add(waiter)
+
+            try:
+                await asyncio.wait_for(waiter[1].wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._condition:
+                    self._async_waiters.discard(waiter)
+
+    def _matching(self, after_seq, station_id, product_id, all_stations=False):
+        if after_seq >= self._seq:
+            return []
+
+        # The subscriber fell behind the history window - tell it to resync
+        if self._events and self._events[0].seq > after_seq + 1:
+            return [StationEvent(self._seq, 'resync', None, None, {}, time.time())]
+
+        return [
+            event for event in self._events
+            if event.seq > after_seq and (all_stations or self._concerns(event, station_id, product_id))
+        ]
+
+    @staticmethod
+    def _concerns(event, station_id, product_id):
+        if event.station_ids is None and event.product_id is None:
+            return True
+        if station_id is not None and event.station_ids and station_id in event.station_ids:
+            return True
+        return product_id is not None and event.product_id == product_id
+
+
+# Shared bus for this process
+station_events = StationEventBus()
+
+
+def bump_state_versions(station_ids=None, product_id=None):
+    """
+    Advance the shared change counters a station change touches.
+
+    Unlike the bus sequence these live in shared_state, so every worker sees
+    them: a display snapshot built under versions (v1, v2, v3) is still
+    current as long as state_versions() returns the same tuple.
+    """
+    bump_supervisor_version()
+    if station_ids is None and product_id is None:
+        shared_state.incr(StateKeys.broadcast_version())
+        return
+    for station_id in station_ids or ():
+        shared_state.incr(StateKeys.station_version(station_id))
+    if product_id is not None:
+        shared_state.incr(StateKeys.product_version(product_id))
+
+
+def bump_supervisor_version():
+    """Advance the supervisor counter (every station change and session change)"""
+    shared_state.incr(StateKeys.supervisor_version())
+
+
+def supervisor_version():
+    """Shared change counter of the supervisor channel - no database query"""
+    return shared_state.get(StateKeys.supervisor_version(), 0)
+
+
+def state_versions(station_id, product_id=None):
+    """(broadcast, station, product) change counters of a display"""
+    return (
+        shared_state.get(StateKeys.broadcast_version(), 0),
+        shared_state.get(StateKeys.station_version(station_id), 0),
+        shared_state.get(StateKeys.product_version(product_id), 0) if product_id else 0,
+    )
+
+
+def station_state_version(station_id):
+    """
+    Monotonic version of everything a station's displays show.
+
+    Its state_version (bumped for station and product changes) plus the
+    shared broadcast counter - both only grow, so the sum moves on with
+    every change that concerns the station. Raises Station.DoesNotExist.
+    """
+    from .models import Station
+
+    version = Station.objects.filter(pk=station_id).values_list('state_version', flat=True).first()
+    if version is None:
+        raise Station.DoesNotExist
+    return version + shared_state.get(StateKeys.broadcast_version(), 0)
+
+
+def publish_station_change(kind, station_ids=None, product_id=None, bump_rows=True, **data):
+    """
+    Notify subscribers that station state changed.
+
+    Station.state_version of the addressed stations is bumped at once, in
+    the caller's transaction, so it commits or rolls back together with the
+    change itself; a broadcast only moves the shared broadcast counter
+    instead of writing every station row. Callers whose own write already
+    bumped the rows (Station.save) pass bump_rows=False. The shared counters
+    and the bus follow once the change is visible to other connections - a
+    stream woken earlier would only re-read the old state.
+    """
+    from .models import Station
+
+    if station_ids is not None:
+        station_ids = list(station_ids)
+    if bump_rows:
+        Station.bump_state_version(station_ids=station_ids, product_id=product_id)
+
+    def notify():
+        bump_state_versions(station_ids, product_id)
+        station_events.publish(kind, station_ids=station_ids, product_id=product_id, **data)
+
+    transaction.on_commit(notify)
@@ -0,0 +1,275 @@
+"""
+DB-backed background jobs for ZIP media and Excel BOM imports.
+
+Upload views store the file, create an ImportJob row and return its id
+straight away; `python manage.py run_import_workers` runs a pool of worker
+processes that claim queued jobs with a conditional UPDATE (so two workers
+never run the same job) and process them in chunks. Each chunk's data and
+the job's checkpoint are committed together, so a job interrupted by a
+restart is picked up again - its heartbeat goes stale - and continues from
+the last committed chunk. Progress, errors and an ETA are served by the
+import_job_status view.
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import zipfile
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15
+STALE_AFTER_SECONDS = 120   # a RUNNING job without heartbeat for this long is resumed elsewhere
+MEDIA_CHUNK_SIZE = 10       # ZIP members per committed chunk
+EXCEL_CHUNK_SIZE = 100      # Excel rows per checkpoint
+
+
+class JobLost(Exception):
+    """Another worker took over the job (ours was considered dead)"""
+
+
+def enqueue_job(kind, source_file, **params):
+    """Store the upload and queue a job for the workers; returns the ImportJob"""
+    from .models import ImportJob
+
+    job = ImportJob(kind=kind, params=params)
+    job.source_file.save(source_file.name, source_file, save=False)
+    job.save()
+    return job
+
+
+def _claimable():
+    stale = timezone.now() - timezone.timedelta(seconds=STALE_AFTER_SECONDS)
+    return Q(status='QUEUED') | Q(status='RUNNING', heartbeat_at__lt=stale)
+
+
+def claim_job(worker_name):
+    """Atomically take the oldest queued (or abandoned) job, or return None"""
+    from .models import ImportJob
+
+    for job_id in ImportJob.objects.filter(_claimable()).values_list('pk', flat=True)[:10]:
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(_claimable(), pk=job_id).update(
+            status='RUNNING',
+            worker=worker_name,
+            heartbeat_at=now,
+            started_at=Coalesce(F('started_at'), now),
+        )
+        if claimed:
+            return ImportJob.objects.get(pk=job_id)
+    return None
+
+
+class JobProgress:
+    """Checkpointing and heartbeat for the job a worker is running"""
+
+    def __init__(self, job, worker_name):
+        self.job = job
+        self.worker_name = worker_name
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _beat(self):
+        from .models import ImportJob
+
+        try:
+            while not self._stop.wait(HEARTBEAT_SECONDS):
+                ImportJob.objects.filter(pk=self.job.pk, worker=self.worker_name).update(
+                    heartbeat_at=timezone.now()
+                )
+        finally:
+            connection.close()
+
+    def _owned(self):
+        from .models import ImportJob
+
+        return ImportJob.objects.filter(pk=self.job.pk, worker=self.worker_name, status='RUNNING')
+
+    def set_total(self, total):
+        self.job.total = total
+        self._owned().update(total=total)
+
+    def commit(self, checkpoint, result, done=None):
+        """Record a finished chunk - call inside the chunk's transaction"""
+        done = checkpoint if done is None else done
+        updated = self._owned().update(
+            checkpoint=checkpoint,
+            done=done,
+            result=result,
+            errors=result.get('errors', []),
+            heartbeat_at=timezone.now(),
+        )
+        if not updated:
+            raise JobLost(f"Import job {self.job.pk} was taken over by another worker")
+        self.job.checkpoint = checkpoint
+        self.job.done = done
+
+    def finish(self, status, result=None, error_message=''):
+        fields = {'status': status, 'finished_at': timezone.now(), 'error_message': error_message}
+        if result is not None:
+            fields['result'] = result
+            fields['errors'] = result.get('errors', [])
+        self._owned().update(**fields)
+
+
+def _merge_counts(base, current):
+    """Counters of a resumed run added to those committed before the restart"""
+    merged = dict(current)
+    for key, value in base.items():
+        if isinstance(value, int) and not isinstance(value, bool) and isinstance(current.get(key), int):
+            merged[key] = value + current[key]
+    merged['errors'] = list(base.get('errors', [])) + list(current.get('errors', []))
+    return merged
+
+
+def run_media_zip_job(job, progress):
+    """Import a ZIP of media in committed chunks of MEDIA_CHUNK_SIZE files"""
+    from .events import publish_station_change
+    from .media_import import ZipMediaImporter
+    from .models import AssemblyProcess, BillOfMaterial, Product
+
+    params = job.params
+    product = Product.objects.get(pk=params['product_id'])
+    importer = ZipMediaImporter(
+        product,
+        process=AssemblyProcess.objects.filter(pk=params.get('process_id')).first(),
+        bom=BillOfMaterial.objects.filter(pk=params.get('bom_id')).first(),
+        default_duration=params.get('default_duration', 15),
+        display_screen_1=params.get('display_screen_1', False),
+        display_screen_2=params.get('display_screen_2', False),
+        display_screen_3=params.get('display_screen_3', False),
+    )
+
+    result = job.result or importer.new_result()
+    with job.source_file.open('rb') as source, zipfile.ZipFile(source) as zip_ref:
+        scan = importer.new_result()
+        members = importer.media_members(zip_ref, scan)
+        result['skipped'] = scan['skipped']
+        progress.set_total(len(members))
+
+        for chunk_start in range(job.checkpoint, len(members), MEDIA_CHUNK_SIZE):
+            chunk = members[chunk_start:chunk_start + MEDIA_CHUNK_SIZE]
+            pending = [media for media in (importer.import_member(zip_ref, info, result) for info in chunk) if media]
+            with transaction.atomic():
+                importer.create(pending, result)
+                progress.commit(chunk_start + len(chunk), result)
+
+    result['success'] = True
+    if result['total_files']:
+        publish_station_change('media', product_id=product.pk)
+    return result
+
+
+def run_bom_excel_job(job, progress):
+    """Import an Excel BOM sheet, checkpointing every EXCEL_CHUNK_SIZE rows"""
+    from .bom_import import import_bom_excel
+    from .models import BOMTemplate
+
+    params = job.params
+    template = BOMTemplate.objects.get(pk=params['template_id'])
+    base = job.result or {}
+
+    def report(rows_done, total_rows, current):
+        if progress.job.total != total_rows:
+            progress.set_total(total_rows)
+        with transaction.atomic():
+            progress.commit(rows_done, _merge_counts(base, current))
+
+    with job.source_file.open('rb') as source:
+        result = import_bom_excel(
+            source, template,
+            params.get('unit_of_measure', 'NO.'),
+            params.get('supplier', ''),
+            params.get('overwrite_existing', False),
+            resume_from=job.checkpoint,
+            progress=report,
+            progress_every=EXCEL_CHUNK_SIZE,
+        )
+    if not result.get('success'):
+        raise RuntimeError(result.get('error') or 'Excel import failed')
+    return _merge_counts(base, result)
+
+
+JOB_HANDLERS = {
+    'MEDIA_ZIP': run_media_zip_job,
+    'BOM_EXCEL': run_bom_excel_job,
+}
+
+
+def run_job(job, worker_name):
+    """Run a claimed job to completion, recording the outcome"""
+    with JobProgress(job, worker_name) as progress:
+        try:
+            result = JOB_HANDLERS[job.kind](job, progress)
+        except JobLost as e:
+            logger.warning(str(e))
+            return
+        except Exception as e:
+            logger.exception(f"Import job {job.pk} failed")
+            progress.finish('FAILED', error_message=str(e))
+            return
+        progress.finish('DONE', result)
+
+    # The upload is no longer needed once the job is done
+    if job.source_file:
+        job.source_file.delete(save=False)
+        type(job).objects.filter(pk=job.pk).update(source_file='')
+
+
+def worker_loop(worker_name, poll_interval=2.0, stop_event=None, run_once=False):
+    """Claim and run jobs until stopped (or, with run_once, until the queue is empty)"""
+    while not (stop_event and stop_event.is_set()):
+        job = claim_job(worker_name)
+        if job is None:
+            if run_once:
+                return
+            time.sleep(poll_interval)
+            continue
+        logger.info(f"{worker_name} running import job {job.pk} ({job.kind}) from checkpoint {job.checkpoint}")
+        run_job(job, worker_name)
+
+
+def worker_process_main(settings_module, poll_interval, run_once):
+    """Entry point of a spawned worker process"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+    worker_name = f"{socket.gethostname()}:{os.getpid()}"
+    try:
+        worker_loop(worker_name, poll_interval, stop_event, run_once)
+    except KeyboardInterrupt:
+        pass
+
+
+def start_worker_pool(workers, settings_module, poll_interval=2.0, run_once=False):
+    """Start worker processes (spawned, so it works on Windows too); returns them"""
+    context = multiprocessing.get_context('spawn')
+    processes = []
+    for index in range(workers):
+        process = context.Process(
+            target=worker_process_main,
+            args=(settings_module, poll_interval, run_once),
+            name=f"import-worker-{index + 1}",
+        )
+        process.start()
+        processes.append(process)
+    return processes
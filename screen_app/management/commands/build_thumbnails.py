@@ -0,0 +1,40 @@
+# screen_app/management/commands/build_thumbnails.py
+from django.core.management.base import BaseCommand
+from screen_app.media_store import fingerprint_of
+from screen_app.models import BOMItem
+from screen_app.thumbnails import evict_cache, precompute_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Precompute BOM item photo thumbnails and trim the on-demand thumbnail cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prune-only',
+            action='store_true',
+            help='Only trim the thumbnail cache to its size limit',
+        )
+
+    def handle(self, *args, **options):
+        if not options['prune_only']:
+            photos = BOMItem.objects.exclude(item_photo='').exclude(item_photo__isnull=True)
+            storage = BOMItem._meta.get_field('item_photo').storage
+            written = skipped = 0
+            for name in photos.values_list('item_photo', flat=True).distinct():
+                # Precomputed thumbnails are only served for content-addressed photos
+                if not fingerprint_of(name):
+                    skipped += 1
+                    continue
+                if not storage.exists(name):
+                    self.stdout.write(self.style.WARNING(f'⚠️ Missing photo: {name}'))
+                    continue
+                try:
+                    written += precompute_thumbnails(name, storage)
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f'⚠️ {name}: {e}'))
+            self.stdout.write(self.style.SUCCESS(f'Wrote {written} thumbnails'))
+            if skipped:
+                self.stdout.write(f'Skipped {skipped} photos without a content fingerprint (thumbnailed on demand)')
+
+        freed = evict_cache()
+        self.stdout.write(f'Thumbnail cache trimmed by {freed} bytes')
@@ -0,0 +1,37 @@
+# screen_app/management/commands/fingerprint_media.py
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from screen_app.models import ProductMedia
+
+
+class Command(BaseCommand):
+    help = 'Give existing ProductMedia files content-hashed names (immutable, cacheable URLs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only list the files that would be renamed',
+        )
+
+    def handle(self, *args, **options):
+        pending = ProductMedia.objects.filter(content_hash='').exclude(file='').exclude(file__isnull=True)
+        renamed = 0
+        for media in pending.iterator():
+            if not media.file.storage.exists(media.file.name):
+                self.stdout.write(self.style.WARNING(f'⚠️ Missing file for media {media.id}: {media.file.name}'))
+                continue
+            if options['dry_run']:
+                self.stdout.write(f'Would fingerprint media {media.id}: {media.file.name}')
+                continue
+
+            # The original file is left in place - other rows or cached pages may still use it
+            old_name = media.file.name
+            with media.file.storage.open(old_name, 'rb') as f:
+                # Re-assigning the file marks it uncommitted, so save() stores it under its hash
+                media.file = File(f, name=old_name.rsplit('/', 1)[-1])
+                media.save(update_fields=['file', 'content_hash'])
+            renamed += 1
+            self.stdout.write(f'✅ {old_name} -> {media.file.name}')
+
+        self.stdout.write(self.style.SUCCESS(f'Fingerprinted {renamed} media files'))
@@ -0,0 +1,31 @@
+# screen_app/management/commands/rasterize_media.py
+from django.core.management.base import BaseCommand
+from screen_app.models import ProductMedia
+from screen_app.pdf_raster import rasterize_media
+
+
+class Command(BaseCommand):
+    help = 'Pre-render ProductMedia PDFs into per-page images for the displays'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render PDFs that already have page images',
+        )
+        parser.add_argument('--media-id', type=int, help='Only render this media')
+
+    def handle(self, *args, **options):
+        pdfs = ProductMedia.objects.filter(file__iendswith='.pdf')
+        if options['media_id']:
+            pdfs = pdfs.filter(pk=options['media_id'])
+        elif not options['force']:
+            pdfs = pdfs.exclude(raster_status='READY')
+
+        for media_id in pdfs.values_list('pk', flat=True):
+            page_count = rasterize_media(media_id)
+            status = ProductMedia.objects.filter(pk=media_id).values_list('raster_status', flat=True).first()
+            if status == 'READY':
+                self.stdout.write(f'✅ Media {media_id}: {page_count} pages')
+            else:
+                self.stdout.write(self.style.WARNING(f'⚠️ Media {media_id}: {status}'))
@@ -0,0 +1,13 @@
+# screen_app/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from screen_app.search import search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the BOM item full-text search index'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexed = search_backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} BOM items'))
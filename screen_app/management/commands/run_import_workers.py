@@ -0,0 +1,36 @@
+# screen_app/management/commands/run_import_workers.py
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from screen_app.jobs import start_worker_pool
+
+
+class Command(BaseCommand):
+    help = 'Run background workers for queued ZIP media and Excel BOM imports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of worker processes')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds between queue checks')
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when the queue is empty instead of waiting for new jobs',
+        )
+
+    def handle(self, *args, **options):
+        settings_module = os.environ.get('DJANGO_SETTINGS_MODULE', 'fcc.settings')
+        workers = max(1, options['workers'])
+        processes = start_worker_pool(workers, settings_module, options['poll'], options['once'])
+        self.stdout.write(self.style.SUCCESS(f'Started {workers} import workers'))
+
+        try:
+            while any(process.is_alive() for process in processes):
+                time.sleep(1)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping import workers...')
+            for process in processes:
+                process.terminate()
+        for process in processes:
+            process.join()
+        self.stdout.write('Import workers stopped')
@@ -0,0 +1,244 @@
+"""
+Ranged, conditional delivery of media files (videos, PDFs).
+
+Files are handed to the server as a FileResponse so WSGI servers with a
+file_wrapper (gunicorn, uWSGI) push the bytes with os.sendfile instead of a
+Python read loop. Range requests (single, open-ended and suffix ranges) get a
+206 with the correct Content-Length; ETag/Last-Modified validators give 304s
+and If-Range support.
+
+With SCREEN_MEDIA_OFFLOAD set, the response only carries a header and the
+front proxy sends the file itself:
+
+    SCREEN_MEDIA_OFFLOAD = 'x-accel-redirect'   # nginx
+    SCREEN_MEDIA_OFFLOAD_PREFIX = '/protected-media/'   # internal location
+
+    SCREEN_MEDIA_OFFLOAD = 'x-sendfile'   # Apache mod_xsendfile / lighttpd
+"""
+import mimetypes
+import os
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+from .media_store import fingerprint_of
+
+MAX_RANGES = 16  # more ranges than this are ignored (full response)
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+IMMUTABLE_CACHE_CONTROL = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+
+
+class _FileRange:
+    """
+    File-like view of bytes [start, start + length) of an open file.
+
+    The underlying file is positioned at start and fileno() is exposed, so a
+    server's wsgi.file_wrapper can sendfile() exactly Content-Length bytes;
+    read() stops at the end of the range for servers that iterate instead.
+    """
+
+    def __init__(self, file, start, length):
+        self._file = file
+        self._remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def close(self):
+        self._file.close()
+
+
+def resolve_media_path(media_path):
+    """Absolute path of a file under MEDIA_ROOT, or None if it is missing or outside"""
+    clean_path = media_path.lstrip('/')
+    if clean_path.startswith('media/'):
+        clean_path = clean_path[len('media/'):]
+    try:
+        path = safe_join(settings.MEDIA_ROOT, clean_path)
+    except (SuspiciousFileOperation, ValueError):
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def file_etag(stat_result):
+    """Strong validator from size and modification time"""
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def parse_range_header(header, size):
+    """
+    Parse a Range header against a file size.
+
+    Returns a list of (start, end) inclusive byte ranges, [] when no range is
+    satisfiable (416), or None when the header should be ignored (missing,
+    malformed, not bytes, too many ranges). Overlapping and adjacent ranges
+    are merged.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec:
+        return None
+
+    specs = spec.split(',')
+    if len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for part in specs:
+        first, dash, last = part.strip().partition('-')
+        if not dash:
+            return None
+        first, last = first.strip(), last.strip()
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else None
+                if start < 0 or (end is not None and end < start):
+                    return None
+                if start >= size:
+                    continue  # unsatisfiable, but others may be fine
+                ranges.append((start, size - 1 if end is None else min(end, size - 1)))
+            else:
+                # Suffix range: the last N bytes
+                suffix = int(last)
+                if suffix < 0:
+                    return None
+                if suffix == 0 or size == 0:
+                    continue
+                ranges.append((max(0, size - suffix), size - 1))
+        except ValueError:
+            return None
+
+    ranges.sort()
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _not_modified(request, etag, last_modified):
+    """True if the client's cached copy is still valid"""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        # Weak comparison for If-None-Match
+        return '*' in etags or etag in etags or f'W/{etag}' in etags
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+
+def _if_range_allows(request, etag, last_modified):
+    """True if a Range header may be honored (no If-Range, or it still matches)"""
+    if_range = request.META.get('HTTP_IF_RANGE', '').strip()
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag  # strong comparison only
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _offload_response(path, content_type):
+    """Response that lets the front proxy send the file, or None if offload is off"""
+    mode = (getattr(settings, 'SCREEN_MEDIA_OFFLOAD', None) or '').lower()
+    if not mode:
+        return None
+
+    response = HttpResponse(content_type=content_type)
+    if mode == 'x-accel-redirect':
+        prefix = getattr(settings, 'SCREEN_MEDIA_OFFLOAD_PREFIX', '/protected-media/')
+        relative_path = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(relative_path)
+    elif mode == 'x-sendfile':
+        response['X-Sendfile'] = path
+    else:
+        return None
+    # The proxy sets the real length and handles Range itself
+    return response
+
+
+def serve_media_file(request, media_path, default_content_type='application/octet-stream',
+                     cache_control='no-cache'):
+    """Serve a file under MEDIA_ROOT with Range, validator and offload support"""
+    path = resolve_media_path(media_path)
+    if path is None:
+        return JsonResponse({'error': 'File not found'}, status=404)
+
+    stat_result = os.stat(path)
+    size = stat_result.st_size
+    last_modified = int(stat_result.st_mtime)
+    etag = file_etag(stat_result)
+    content_type = mimetypes.guess_type(path)[0] or default_content_type
+
+    def add_validators(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        if cache_control:
+            response['Cache-Control'] = cache_control
+        return response
+
+    if _not_modified(request, etag, last_modified):
+        return add_validators(HttpResponseNotModified())
+
+    offloaded = _offload_response(path, content_type)
+    if offloaded is not None:
+        return add_validators(offloaded)
+
+    ranges = None
+    if _if_range_allows(request, etag, last_modified):
+        ranges = parse_range_header(request.META.get('HTTP_RANGE', ''), size)
+
+    if ranges == []:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return add_validators(response)
+
+    # Several disjoint ranges: send the whole file (a server may ignore Range)
+    if ranges and len(ranges) == 1:
+        start, end = ranges[0]
+        length = end - start + 1
+        response = FileResponse(_FileRange(open(path, 'rb'), start, length),
+                                status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        length = size
+        response = FileResponse(_FileRange(open(path, 'rb'), 0, size), content_type=content_type)
+
+    response['Content-Length'] = str(length)
+    return add_validators(response)
+
+
+def serve_cached_media(request, media_path, default_content_type='application/octet-stream'):
+    """
+    Serve a content-addressed media file (see media_store).
+
+    The name embeds the content hash, so the response may be cached forever;
+    names without a fingerprint are revalidated like stream_video/stream_pdf.
+    """
+    if not fingerprint_of(media_path):
+        return serve_media_file(request, media_path, default_content_type)
+
+    response = serve_media_file(request, media_path, default_content_type,
+                                cache_control=IMMUTABLE_CACHE_CONTROL)
+    if response.status_code in (200, 206, 304):
+        response['Expires'] = http_date(time.time() + IMMUTABLE_MAX_AGE)
+    return response
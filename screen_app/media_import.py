@@ -0,0 +1,240 @@
+"""
+Streaming ZIP importer for ProductMedia.
+
+Members are read straight out of the archive in bounded chunks - nothing is
+extracted to a temp tree and no file is held in memory. Each member is copied
+once into an upload temp file while its content hash is computed, then moved
+into storage under its content-addressed name (see media_store); entries
+that are not PDFs or videos are skipped before they are decompressed.
+Declared and actual sizes are checked against per-file, per-archive and
+compression-ratio limits to stop zip bombs. All ProductMedia rows are
+created with one bulk_create at the end.
+
+Used by both the nipha-admin upload (process_zip_file_for_media) and the
+Django admin (ProductAdmin.process_zip_file).
+"""
+import hashlib
+import zipfile
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import transaction
+
+from .events import publish_station_change
+from .media_store import fingerprinted_name
+from .pdf_raster import schedule_rasterization
+
+PDF_EXTENSIONS = {'.pdf'}
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv', '.wmv', '.flv', '.webm'}
+
+COPY_BUFFER_SIZE = 1024 * 1024  # bytes decompressed per read
+
+
+def _limit(name, default):
+    return getattr(settings, name, default)
+
+
+class ZipImportError(Exception):
+    """The archive as a whole is rejected (limits exceeded)"""
+
+
+class ZipMediaImporter:
+    """Create ProductMedia for every PDF and video in a ZIP archive"""
+
+    MAX_MEMBER_SIZE = 2 * 1024 ** 3    # SCREEN_ZIP_MAX_MEMBER_SIZE
+    MAX_TOTAL_SIZE = 10 * 1024 ** 3    # SCREEN_ZIP_MAX_TOTAL_SIZE
+    MAX_MEMBERS = 5000                 # SCREEN_ZIP_MAX_MEMBERS
+    MAX_COMPRESSION_RATIO = 200        # SCREEN_ZIP_MAX_COMPRESSION_RATIO
+
+    def __init__(self, product, process=None, bom=None, default_duration=15,
+                 display_screen_1=False, display_screen_2=False, display_screen_3=False):
+        self.product = product
+        self.process = process
+        self.bom = bom
+        self.default_duration = default_duration
+        self.displays = {
+            'display_screen_1': display_screen_1,
+            'display_screen_2': display_screen_2,
+            'display_screen_3': display_screen_3,
+        }
+        self.max_member_size = _limit('SCREEN_ZIP_MAX_MEMBER_SIZE', self.MAX_MEMBER_SIZE)
+        self.max_total_size = _limit('SCREEN_ZIP_MAX_TOTAL_SIZE', self.MAX_TOTAL_SIZE)
+        self.max_members = _limit('SCREEN_ZIP_MAX_MEMBERS', self.MAX_MEMBERS)
+        self.max_ratio = _limit('SCREEN_ZIP_MAX_COMPRESSION_RATIO', self.MAX_COMPRESSION_RATIO)
+
+    @staticmethod
+    def media_type_for(filename):
+        """ProductMedia media_type for a member name, or None to skip it"""
+        ext = PurePosixPath(filename).suffix.lower()
+        if ext in PDF_EXTENSIONS:
+            return 'PROCESS_DOC'
+        if ext in VIDEO_EXTENSIONS:
+            return 'VIDEO'
+        return None
+
+    @staticmethod
+    def is_hidden(info):
+        parts = PurePosixPath(info.filename).parts
+        return any(part.startswith('.') or part.startswith('__MACOSX') for part in parts)
+
+    def media_members(self, zip_ref, result):
+        """Members worth importing; counts everything else as skipped"""
+        infos = zip_ref.infolist()
+        if len(infos) > self.max_members:
+            raise ZipImportError(f"ZIP has {len(infos)} entries (limit {self.max_members})")
+
+        declared_total = 0
+        members = []
+        for info in infos:
+            if info.is_dir() or self.is_hidden(info):
+                continue
+            if self.media_type_for(info.filename) is None:
+                result['skipped'] += 1
+                continue
+            declared_total += info.file_size
+            members.append(info)
+        if declared_total > self.max_total_size:
+            raise ZipImportError(
+                f"ZIP expands to {declared_total} bytes (limit {self.max_total_size})"
+            )
+        return members
+
+    def check_member(self, info):
+        """Reject a member from its header before decompressing it"""
+        if info.flag_bits & 0x1:
+            raise ValueError("encrypted entries are not supported")
+        if info.file_size > self.max_member_size:
+            raise ValueError(f"{info.file_size} bytes exceeds the {self.max_member_size} byte limit")
+        if info.compress_size and info.file_size / info.compress_size > self.max_ratio:
+            raise ValueError("suspicious compression ratio (possible zip bomb)")
+
+    def copy_member(self, zip_ref, info):
+        """Stream a member into an upload temp file; returns (temp file, sha256)"""
+        filename = PurePosixPath(info.filename).name
+        upload = TemporaryUploadedFile(filename, None, info.file_size, None)
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            with zip_ref.open(info) as source:
+                while True:
+                    chunk = source.read(COPY_BUFFER_SIZE)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    # Never trust the header alone
+                    if written > info.file_size or written > self.max_member_size:
+                        raise ValueError("entry is larger than its declared size")
+                    digest.update(chunk)
+                    upload.write(chunk)
+            upload.flush()
+            upload.seek(0)
+            upload.size = written
+        except BaseException:
+            upload.close()
+            raise
+        return upload, digest.hexdigest()
+
+    def store(self, media, upload, content_hash):
+        """Move the temp file into storage under its content-addressed name"""
+        field = media.file.field
+        storage = field.storage
+        name = field.generate_filename(media, fingerprinted_name(upload.name, content_hash))
+        if not storage.exists(name):
+            # FileSystemStorage moves the temp file instead of copying it
+            name = storage.save(name, upload, max_length=field.max_length)
+        return name
+
+    @staticmethod
+    def new_result():
+        return {
+            'success': False,
+            'total_files': 0,
+            'pdfs': 0,
+            'videos': 0,
+            'skipped': 0,
+            'errors': []
+        }
+
+    def import_member(self, zip_ref, info, result):
+        """Store one member and return its unsaved ProductMedia (None on error)"""
+        from .models import ProductMedia
+
+        filename = PurePosixPath(info.filename).name
+        media_type = self.media_type_for(filename)
+        try:
+            self.check_member(info)
+            media = ProductMedia(
+                product=self.product,
+                process=self.process,
+                bom=self.bom,
+                media_type=media_type,
+                **self.displays
+            )
+            if media_type == 'VIDEO' and self.default_duration:
+                media.duration = self.default_duration
+
+            upload, content_hash = self.copy_member(zip_ref, info)
+            try:
+                media.file.name = self.store(media, upload, content_hash)
+            finally:
+                upload.close()
+            media.content_hash = content_hash
+            if media_type == 'PROCESS_DOC':
+                media.raster_status = 'PENDING'
+        except Exception as e:
+            result['errors'].append(f"{filename}: {str(e)}")
+            return None
+
+        if media_type == 'VIDEO':
+            result['videos'] += 1
+        else:
+            result['pdfs'] += 1
+        return media
+
+    def create(self, pending, result):
+        """bulk_create a batch of imported media (call inside a transaction)"""
+        from .models import ProductMedia
+
+        created = ProductMedia.objects.bulk_create(pending)
+        # bulk_create skips signals - do what post_save would have done
+        for media in created:
+            if media.raster_status == 'PENDING' and media.pk:
+                schedule_rasterization(media.pk)
+        result['total_files'] += len(created)
+        return created
+
+    def run(self, zip_file):
+        """Import an archive; returns the upload summary used by the admin pages"""
+        result = self.new_result()
+
+        try:
+            with zipfile.ZipFile(zip_file, 'r') as zip_ref:
+                pending = []
+                for info in self.media_members(zip_ref, result):
+                    media = self.import_member(zip_ref, info, result)
+                    if media is not None:
+                        pending.append(media)
+
+            with transaction.atomic():
+                created = self.create(pending, result)
+            result['success'] = True
+            if created:
+                publish_station_change('media', product_id=self.product.pk)
+
+        except zipfile.BadZipFile:
+            result['error'] = "Invalid ZIP file"
+        except Exception as e:
+            result['error'] = str(e)
+
+        return result
+
+
+def import_media_zip(product, zip_file, process=None, bom=None, default_duration=15,
+                     display_screen_1=False, display_screen_2=False, display_screen_3=False):
+    """Import every PDF/video of a ZIP archive as ProductMedia of a product"""
+    importer = ZipMediaImporter(
+        product, process, bom, default_duration,
+        display_screen_1, display_screen_2, display_screen_3
+    )
+    return importer.run(zip_file)
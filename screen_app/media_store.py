@@ -0,0 +1,74 @@
+"""
+Content-addressed storage names for ProductMedia files.
+
+Uploaded media is renamed to "<stem>.<hash>.<ext>" where <hash> is the start
+of the file's SHA-256, so a URL always refers to the same bytes and can be
+cached by browsers and proxies forever (see stream_cached_media). Uploading
+identical content again reuses the stored file instead of writing a copy.
+"""
+import hashlib
+import os
+import re
+
+HASH_LENGTH = 16  # hex chars of the SHA-256 kept in the file name
+CHUNK_SIZE = 1024 * 1024
+
+_FINGERPRINT_RE = re.compile(r'\.([0-9a-f]{%d})\.[^./]+$' % HASH_LENGTH)
+
+
+def hash_file(fileobj):
+    """SHA-256 hex digest of a file object, read in chunks and rewound"""
+    digest = hashlib.sha256()
+    if hasattr(fileobj, 'seek'):
+        fileobj.seek(0)
+    if hasattr(fileobj, 'chunks'):
+        for chunk in fileobj.chunks(CHUNK_SIZE):
+            digest.update(chunk)
+    else:
+        for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    if hasattr(fileobj, 'seek'):
+        fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def fingerprinted_name(name, content_hash):
+    """'video.mp4' -> 'video.<hash>.mp4' (an existing fingerprint is replaced)"""
+    base = os.path.basename(name)
+    match = _FINGERPRINT_RE.search(base)
+    if match:
+        base = base[:match.start()] + base[match.end(1):]
+    stem, ext = os.path.splitext(base)
+    return f"{stem}.{content_hash[:HASH_LENGTH]}{ext.lower()}"
+
+
+def fingerprint_of(name):
+    """Fingerprint embedded in a stored file name, or None"""
+    match = _FINGERPRINT_RE.search(name or '')
+    return match.group(1) if match else None
+
+
+def fingerprint_media_file(media):
+    """
+    Give a ProductMedia's pending upload its content-addressed name.
+
+    Must be called before the file is committed to storage (ProductMedia.save
+    does this). If the same content is already stored, the row simply points
+    at the existing file and nothing is written.
+    """
+    field_file = media.file
+    if not field_file or getattr(field_file, '_committed', True):
+        return False
+
+    content_hash = hash_file(field_file.file)
+    field = field_file.field
+    name = field.generate_filename(media, fingerprinted_name(field_file.name, content_hash))
+    media.content_hash = content_hash
+
+    if field_file.storage.exists(name):
+        # Same bytes already stored - reuse them
+        field_file.name = name
+        field_file._committed = True
+    else:
+        field_file.name = os.path.basename(name)
+    return True
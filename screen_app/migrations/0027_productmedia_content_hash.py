@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('screen_app', '0026_station_bom_page_updated_at_station_current_bom_page'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productmedia',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='SHA-256 of the file, also embedded in its stored name', max_length=64),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('screen_app', '0027_productmedia_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productmedia',
+            name='page_count',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='productmedia',
+            name='page_images',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='Rendered pages: [{name, width, height}, ...]'),
+        ),
+        migrations.AddField(
+            model_name='productmedia',
+            name='raster_status',
+            field=models.CharField(blank=True, choices=[('PENDING', 'Pending'), ('READY', 'Ready'), ('FAILED', 'Failed'), ('UNAVAILABLE', 'No PDF renderer installed')], editable=False, max_length=20),
+        ),
+    ]
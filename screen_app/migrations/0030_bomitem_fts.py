@@ -0,0 +1,37 @@
+# Full-text index of BOM items (see screen_app/search.py)
+
+from django.db import migrations, models
+
+
+def create_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS screen_app_bomitem_fts USING fts5('
+        'item_code, item_description, part_number, tokenize="unicode61 remove_diacritics 2")'
+    )
+    schema_editor.execute(
+        'INSERT INTO screen_app_bomitem_fts (rowid, item_code, item_description, part_number) '
+        'SELECT id, item_code, item_description, part_number FROM screen_app_bomitem'
+    )
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS screen_app_bomitem_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('screen_app', '0029_importjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bomitem',
+            index=models.Index(fields=['item_description', 'id'], name='bomitem_desc_id_idx'),
+        ),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
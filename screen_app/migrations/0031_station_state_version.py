@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('screen_app', '0030_bomitem_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='station',
+            name='state_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, help_text="Bumped on every change to what this station's displays show"),
+        ),
+    ]
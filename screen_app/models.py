@@ -2,10 +2,15 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import FileExtensionValidator
 from django.urls import reverse
+from django.utils import timezone
 import zipfile
 import os
 from django.core.files.base import ContentFile
 import math
+from .bom_cache import bom_expansion_cache
+from .bom_layout import BOMPageLayout
+from .process_graph import get_process_graph
+from .media_store import fingerprint_media_file, fingerprint_of
 
 class Product(models.Model):
     code = models.CharField(max_length=20, unique=True)
@@ -87,6 +92,10 @@ class BOMItem(models.Model):
     
     class Meta:
         ordering = ['item_description']
+        indexes = [
+            # Keyset pagination of the item list (get_bom_items)
+            models.Index(fields=['item_description', 'id'], name='bomitem_desc_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.item_code} - {self.item_description}"
@@ -161,146 +170,52 @@ class BOMTemplate(models.Model):
             })
         return calculated
 
+    def plan_pages(self, quantity=1, items_per_screen=8):
+        """Expand the BOM once and return its page/display layout"""
+        return BOMPageLayout(self, quantity=quantity, items_per_screen=items_per_screen)
+
     def get_items_for_display(self, display_number, quantity=1, page=1, items_per_screen=8):
-        """Get BOM items specific to a display number with pagination - FIXED WITH STAGE-SPECIFIC PAGINATION"""
-        
-        if not self.should_split_across_displays():
-            # Stage-specific BOMs (SUB_ASSEMBLY_1, SUB_ASSEMBLY_2, FINAL_ASSEMBLY) - pagination on Display 1 only
-            if display_number == 1:
-                all_items = self.generate_bom_for_quantity(quantity)
-                total_items = len(all_items)
-                
-                # Apply pagination on Display 1 for stage-specific BOMs
-                start_idx = (page - 1) * items_per_screen
-                end_idx = min(start_idx + items_per_screen, total_items)
-                
-                if start_idx >= total_items:
-                    result = []
-                else:
-                    result = all_items[start_idx:end_idx]
-                
-                return result
-            else:
-                return []
-        
-        # Split logic for SINGLE_UNIT and BATCH_50 with FIXED 8 items per display per page
-        all_items = self.generate_bom_for_quantity(quantity)
-        total_items = len(all_items)
-        
-        
-        if total_items == 0:
-            return []
-        
-        # FIXED LOGIC: Always 8 items per display, with pagination
-        max_items_per_display = 8
-        items_per_page = max_items_per_display * 3  # 8 items × 3 displays = 24 items per page
-        
-        # Calculate which items belong to this page
-        page_start_idx = (page - 1) * items_per_page
-        page_end_idx = min(page_start_idx + items_per_page, total_items)
-        page_items = all_items[page_start_idx:page_end_idx]
-        
-        
-        if len(page_items) == 0:
-            return []
-        
-        # Calculate which items from this page belong to this display
-        display_start_idx = (display_number - 1) * max_items_per_display
-        display_end_idx = min(display_start_idx + max_items_per_display, len(page_items))
-        
-        if display_start_idx >= len(page_items):
-            result = []
-        else:
-            result = page_items[display_start_idx:display_end_idx]
-            # Calculate actual item numbers for debugging
-            actual_start = page_start_idx + display_start_idx + 1
-            actual_end = page_start_idx + display_end_idx        
-        return result
+        """Get BOM items specific to a display number with pagination"""
+        # Split BOMs (SINGLE_UNIT, BATCH_50): 8 items per display, 3 displays per page.
+        # Stage-specific BOMs: paginated on Display 1 only.
+        layout = self.plan_pages(quantity=quantity, items_per_screen=items_per_screen)
+        return layout.items_for_display(display_number, page=page)
 
     def get_pagination_info_for_split(self, quantity=1, items_per_screen=8):
-        """Get pagination information for split BOMs - UPDATED FOR STAGE-SPECIFIC PAGINATION"""
-        total_items = len(self.generate_bom_for_quantity(quantity))
-        
-        if not self.should_split_across_displays():
-            # Stage-specific BOMs: pagination on Display 1 only
-            total_pages = math.ceil(total_items / items_per_screen) if total_items > 0 else 1
-            return {
-                'total_pages': total_pages,
-                'items_per_page': items_per_screen,  # Items per page on Display 1
-                'items_per_screen': items_per_screen,
-                'total_items': total_items
-            }
-        
-        # BOM Display BOMs: pagination across 3 displays (8 items each = 24 per page)
-        max_items_per_display = 8
-        items_per_page = max_items_per_display * 3  # 24 items per page (8 per display)
-        
-        total_pages = math.ceil(total_items / items_per_page) if total_items > 0 else 1
-        
-        return {
-            'total_pages': total_pages,
-            'items_per_page': items_per_page,
-            'items_per_screen': max_items_per_display,
-            'total_items': total_items
-        }
+        """Get pagination information for split BOMs and stage-specific BOMs"""
+        return self.plan_pages(quantity=quantity, items_per_screen=items_per_screen).pagination_info()
 
     def get_display_info_for_split(self, page=1, quantity=1):
         """Get information about how items are distributed across displays for a specific page"""
         if not self.should_split_across_displays():
             return None
-        
-        all_items = self.generate_bom_for_quantity(quantity)
-        total_items = len(all_items)
-        
-        max_items_per_display = 8
-        items_per_page = max_items_per_display * 3  # 24 items per page
-        
-        # Calculate which items belong to this page
-        page_start_idx = (page - 1) * items_per_page
-        page_end_idx = min(page_start_idx + items_per_page, total_items)
-        page_items_count = page_end_idx - page_start_idx
-        
-        distribution = {}
-        
-        for display in [1, 2, 3]:
-            display_start_idx = (display - 1) * max_items_per_display
-            display_end_idx = min(display_start_idx + max_items_per_display, page_items_count)
-            
-            if display_start_idx < page_items_count:
-                item_count = display_end_idx - display_start_idx
-                # Calculate actual serial numbers
-                actual_start_serial = page_start_idx + display_start_idx + 1
-                actual_end_serial = page_start_idx + display_end_idx
-                
-                distribution[f'display_{display}'] = {
-                    'start_serial': actual_start_serial,
-                    'end_serial': actual_end_serial,
-                    'item_count': item_count
-                }
-            else:
-                distribution[f'display_{display}'] = {
-                    'start_serial': 0,
-                    'end_serial': 0,
-                    'item_count': 0
-                }
-        
-        return distribution
+        return self.plan_pages(quantity=quantity).display_distribution(page)
 
-    def generate_bom_for_quantity(self, quantity=1):
-        """Generate BOM items with calculated quantities"""
-        bom_items = []
-        
+    def get_effective_quantity(self, quantity=1):
+        """Quantity the BOM lines are multiplied by for this template type"""
         # FIXED: For stage-specific BOMs, always use quantity = 1 (don't multiply)
         stage_specific_bom_types = ['SUB_ASSEMBLY_1', 'SUB_ASSEMBLY_2', 'SUB_ASSEMBLY_3','SUB_ASSEMBLY_4','FINAL_ASSEMBLY']
         
         if self.bom_type in stage_specific_bom_types:
             # For stage-specific BOMs, always use base quantity (no multiplication)
-            effective_quantity = 1
-        else:
-            # For unit-based BOMs (SINGLE_UNIT, BATCH_50), use the provided quantity
-            effective_quantity = quantity
+            return 1
+        # For unit-based BOMs (SINGLE_UNIT, BATCH_50), use the provided quantity
+        return quantity
+
+    def generate_bom_for_quantity(self, quantity=1):
+        """Generate BOM items with calculated quantities (cached per template version and quantity)"""
+        effective_quantity = self.get_effective_quantity(quantity)
+        return bom_expansion_cache.get_or_build(
+            self.pk, effective_quantity,
+            lambda: self._expand_bom(effective_quantity)
+        )
+
+    def _expand_bom(self, effective_quantity):
+        """Expand the active template lines for effective_quantity (one query)"""
+        bom_items = []
         
-        for item_line in self.bom_items.filter(is_active=True).order_by('serial_number'):
+        item_lines = self.bom_items.filter(is_active=True).select_related('item').order_by('serial_number')
+        for item_line in item_lines:
             calculated_qty = item_line.base_quantity * effective_quantity
             
             # Handle different unit types
@@ -419,12 +334,63 @@ class ProductMedia(models.Model):
         blank=True, null=True  # Made optional for database BOMs
     )
     duration = models.PositiveIntegerField(default=15, blank=True, help_text="Duration in seconds (for videos)")
+    content_hash = models.CharField(max_length=64, blank=True, editable=False, db_index=True,
+                                    help_text="SHA-256 of the file, also embedded in its stored name")
+    
+    # Pre-rendered PDF pages (see pdf_raster)
+    RASTER_STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('READY', 'Ready'),
+        ('FAILED', 'Failed'),
+        ('UNAVAILABLE', 'No PDF renderer installed'),
+    ]
+    raster_status = models.CharField(max_length=20, choices=RASTER_STATUS_CHOICES, blank=True, editable=False)
+    page_count = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    page_images = models.JSONField(default=list, blank=True, editable=False,
+                                   help_text="Rendered pages: [{name, width, height}, ...]")
     
     # Display assignment
     display_screen_1 = models.BooleanField(default=False, help_text="Show on Display Screen 1")
     display_screen_2 = models.BooleanField(default=False, help_text="Show on Display Screen 2") 
     display_screen_3 = models.BooleanField(default=False, help_text="Show on Display Screen 3")
 
+    def save(self, *args, **kwargs):
+        # New uploads get a content-addressed name (see media_store)
+        if fingerprint_media_file(self) and self.is_pdf():
+            # New PDF content - its pages get rendered after the save commits
+            self.raster_status = 'PENDING'
+            self.page_count = None
+            self.page_images = []
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'raster_status', 'page_count', 'page_images'}
+        super().save(*args, **kwargs)
+
+    def is_pdf(self):
+        return bool(self.file) and self.file.name.lower().endswith('.pdf')
+
+    def get_page_images(self):
+        """Rendered page images (url, width, height) once rasterization is done, else []"""
+        if self.raster_status != 'READY':
+            return []
+        return [
+            {
+                'url': reverse('stream_cached_media', args=[page['name']]),
+                'width': page['width'],
+                'height': page['height'],
+            }
+            for page in self.page_images
+        ]
+
+    @property
+    def cached_url(self):
+        """Immutable, long-cacheable URL for fingerprinted files; plain file URL otherwise"""
+        if not self.file:
+            return None
+        fingerprint = fingerprint_of(self.file.name)
+        if fingerprint and self.content_hash.startswith(fingerprint):
+            return reverse('stream_cached_media', args=[self.file.name])
+        return self.file.url
+
     def __str__(self):
         process_info = f" - {self.process.name}" if self.process else ""
         bom_info = f" - {self.bom.get_bom_type_display()}" if self.bom else ""
@@ -441,7 +407,16 @@ class ProductMedia(models.Model):
 
 
 class Station(models.Model):
-    """Assembly stations with multi-display support"""
+    """
+    Assembly stations with multi-display support.
+
+    state_version is never written from the instance. Saving an existing
+    station bumps it in the same UPDATE (state_version = state_version + 1)
+    and leaves it deferred, to be re-read on access. To that end save()
+    always adds state_version to update_fields - a caller's list included -
+    and without update_fields saves every other concrete field, so an
+    instance loaded before a bump cannot write the old value back.
+    """
     DISPLAY_CHOICES = [
         (1, 'Display Screen 1'),
         (2, 'Display Screen 2'),
@@ -470,84 +445,110 @@ class Station(models.Model):
     clicker_enabled = models.BooleanField(default=True, help_text="Enable clicker support")
     auto_advance = models.BooleanField(default=False, help_text="Auto advance after media duration")
     loop_mode = models.BooleanField(default=False, help_text="Currently in loop mode (for processes 1A, 1B, 1C)")
+    state_version = models.PositiveBigIntegerField(default=0, editable=False, help_text="Bumped on every change to what this station's displays show")
     
     class Meta:
         unique_together = ['name', 'display_number']
     
     def __str__(self):
         return f"{self.name} - Display {self.display_number}"
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding or kwargs.get('force_insert') or (update_fields is not None and not update_fields):
+            super().save(*args, **kwargs)
+            return
+        if update_fields is None:
+            update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+        kwargs['update_fields'] = [name for name in update_fields if name != 'state_version'] + ['state_version']
+        self.state_version = models.F('state_version') + 1
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            # Deferred: the next access reads the bumped value
+            self.__dict__.pop('state_version', None)
+
+    @classmethod
+    def bump_state_version(cls, station_ids=None, product_id=None):
+        """
+        Atomically advance state_version of a station group.
+
+        Bumps the given stations plus every station on product_id, with one
+        UPDATE ... SET state_version = state_version + 1. Broadcasts (neither
+        given) touch no rows - they only move the shared broadcast counter
+        that events.station_state_version adds on.
+        """
+        if station_ids is None and product_id is None:
+            return 0
+        group = models.Q(pk__in=station_ids or [])
+        if product_id is not None:
+            group |= models.Q(current_product_id=product_id)
+        return cls.objects.filter(group).update(state_version=models.F('state_version') + 1)
     
 
-    def get_current_bom_data(self, page=1):
-        if not self.current_product or not self.display_number:
+    def get_current_bom_template(self):
+        """Active BOM template for the current stage, falling back to any active product BOM"""
+        if not self.current_product_id:
             return None
 
-        quantity = 1 if self.show_single_unit_bom else self.product_quantity
-        bom_type = 'SINGLE_UNIT' if self.show_single_unit_bom else 'BATCH_50' if self.show_batch_bom else None
-
         # Try stage-specific BOM first
-        stage_template = None
-        if self.current_stage:
-            stage_template = BOMTemplate.objects.filter(
-                product=self.current_product,
-                stage=self.current_stage,
+        template = None
+        if self.current_stage_id:
+            template = BOMTemplate.objects.filter(
+                product_id=self.current_product_id,
+                stage_id=self.current_stage_id,
                 is_active=True
             ).first()
 
         # Fallback to non-stage BOM
-        if not stage_template:
-            stage_template = BOMTemplate.objects.filter(
-                product=self.current_product,
+        if not template:
+            template = BOMTemplate.objects.filter(
+                product_id=self.current_product_id,
                 is_active=True
             ).first()
 
-        # If still nothing, return None
-        if not stage_template:
+        return template
+
+    def get_current_bom_layout(self, template=None):
+        """Page/display layout of the current BOM (expanded once), or None"""
+        template = template or self.get_current_bom_template()
+        if not template:
             return None
 
-        return stage_template.get_items_for_display(
-            display_number=self.display_number,
-            quantity=quantity,
-            page=page,
-            items_per_screen=8
-        )
+        quantity = 1 if self.show_single_unit_bom else self.product_quantity
+        return template.plan_pages(quantity=quantity, items_per_screen=8)
+
+    def get_current_bom_data(self, page=1):
+        if not self.current_product or not self.display_number:
+            return None
+
+        layout = self.get_current_bom_layout()
+        if not layout:
+            return None
+
+        return layout.items_for_display(self.display_number, page=page)
 
 
     def get_current_bom_info(self, page=1):
         if not self.current_product:
             return None
 
-        quantity = 1 if self.show_single_unit_bom else self.product_quantity
         bom_type = 'SINGLE_UNIT' if self.show_single_unit_bom else 'BATCH_50' if self.show_batch_bom else None
 
-        # Try to get stage-specific BOM
-        template = None
-        if self.current_stage:
-            template = BOMTemplate.objects.filter(
-                product=self.current_product,
-                stage=self.current_stage,
-                is_active=True
-            ).first()
-
-        # Fallback to any BOM for the product
-        if not template:
-            template = BOMTemplate.objects.filter(
-                product=self.current_product,
-                is_active=True
-            ).first()
-
-        if not template:
+        layout = self.get_current_bom_layout()
+        if not layout:
             return None
+        quantity = layout.quantity
 
         # Pagination and split info
-        pagination_info = template.get_pagination_info_for_split(quantity=quantity, items_per_screen=8)
-        split_info = template.get_display_info_for_split(page=page, quantity=quantity)
+        pagination_info = layout.pagination_info()
+        split_info = layout.display_distribution(page)
         current_display_info = split_info.get(f'display_{self.display_number}') if split_info else None
 
         is_split = len(split_info) > 1 if split_info else False
 
         return {
-            'template': template,
+            'template': layout.template,
             'type': bom_type.lower() if bom_type else 'unknown',
             'display_name': f"{quantity} Units BOM" + (" (Split)" if is_split else ""),
             'quantity': quantity,
@@ -566,31 +567,15 @@ class Station(models.Model):
         if not self.current_product:
             return None
 
-        quantity = 1 if self.show_single_unit_bom else self.product_quantity
-        bom_type = 'SINGLE_UNIT' if self.show_single_unit_bom else 'BATCH_50' if self.show_batch_bom else None
-
-        template = None
-        if self.current_stage:
-            template = BOMTemplate.objects.filter(
-                product=self.current_product,
-                stage=self.current_stage,
-                is_active=True
-            ).first()
-
-        if not template:
-            template = BOMTemplate.objects.filter(
-                product=self.current_product,
-                is_active=True
-            ).first()
-
-        if not template:
+        layout = self.get_current_bom_layout()
+        if not layout:
             return {
                 'total_pages': 1,
                 'items_per_page': 0,
                 'supports_pagination': False
             }
 
-        pagination_info = template.get_pagination_info_for_split(quantity=quantity, items_per_screen=8)
+        pagination_info = layout.pagination_info()
         pagination_info['supports_pagination'] = True
         return pagination_info
 
@@ -634,97 +619,44 @@ class Station(models.Model):
             
     def get_next_process(self):
         """Get next process, handling loops and stage transitions"""
-        if not self.current_stage:
+        graph = get_process_graph()
+        if not self.current_stage_id:
             # No current stage, start with first stage of the current product
-            if self.current_product:
-                first_stage = AssemblyStage.objects.filter(product=self.current_product).order_by('order').first()
-                if first_stage:
-                    return first_stage.processes.order_by('order').first()
+            if self.current_product_id:
+                return graph.first_process_of_product(self.current_product_id)
             return None
 
         # If in loop mode and current process has loop_group, stay in loop
-        if self.loop_mode and self.current_process and self.current_process.loop_group:
-            loop_processes = AssemblyProcess.objects.filter(
-                stage=self.current_stage,
-                loop_group=self.current_process.loop_group
-            ).order_by('order')
-
-            if loop_processes.exists():
-                process_list = list(loop_processes)
-                try:
-                    current_index = process_list.index(self.current_process)
-                    next_index = (current_index + 1) % len(process_list)
-                    return process_list[next_index]
-                except ValueError:
-                    # Current process not in loop, return first loop process
-                    return process_list[0]
+        if self.loop_mode and self.current_process_id:
+            loop_process = graph.loop_step(self.current_stage_id, self.current_process_id, 1)
+            if loop_process:
+                return loop_process
 
         # Normal next process logic
-        if self.current_process:
-            # Look for next process in current stage
-            next_process = AssemblyProcess.objects.filter(
-                stage=self.current_stage,
-                order__gt=self.current_process.order
-            ).order_by('order').first()
-
-            if next_process:
-                return next_process
-            else:
-                # Move to next stage of the current product
-                next_stage = AssemblyStage.objects.filter(
-                    product=self.current_product,
-                    order__gt=self.current_stage.order
-                ).order_by('order').first()
-                if next_stage:
-                    return next_stage.processes.order_by('order').first()
-        else:
-            # No current process, return first process of current stage
-            return self.current_stage.processes.order_by('order').first()
+        if self.current_process_id:
+            return graph.next_process(self.current_product_id, self.current_stage_id, self.current_process_id)
 
-        return None
+        # No current process, return first process of current stage
+        processes = graph.stage_processes(self.current_stage_id)
+        return processes[0] if processes else None
 
     
     
     def get_previous_process(self):
         """Get previous process, handling loops and stage transitions"""
-        if not self.current_process:
+        if not self.current_process_id:
             return None
 
+        graph = get_process_graph()
+
         # If in loop mode and current process has loop_group, navigate within loop
-        if self.loop_mode and self.current_process.loop_group:
-            loop_processes = AssemblyProcess.objects.filter(
-                stage=self.current_stage,
-                loop_group=self.current_process.loop_group
-            ).order_by('order')
-
-            if loop_processes.exists():
-                process_list = list(loop_processes)
-                try:
-                    current_index = process_list.index(self.current_process)
-                    prev_index = (current_index - 1) % len(process_list)
-                    return process_list[prev_index]
-                except ValueError:
-                    # Current process not in loop, return last loop process
-                    return process_list[-1]
+        if self.loop_mode:
+            loop_process = graph.loop_step(self.current_stage_id, self.current_process_id, -1)
+            if loop_process:
+                return loop_process
 
         # Normal previous process logic
-        prev_process = AssemblyProcess.objects.filter(
-            stage=self.current_stage,
-            order__lt=self.current_process.order
-        ).order_by('-order').first()
-
-        if prev_process:
-            return prev_process
-        else:
-            # Move to previous stage of the current product
-            prev_stage = AssemblyStage.objects.filter(
-                product=self.current_product,
-                order__lt=self.current_stage.order
-            ).order_by('-order').first()
-            if prev_stage:
-                return prev_stage.processes.order_by('-order').first()
-
-        return None
+        return graph.previous_process(self.current_product_id, self.current_stage_id, self.current_process_id)
 
     
     def advance_to_next_process(self):
@@ -734,7 +666,7 @@ class Station(models.Model):
             self.current_process = next_process
 
             # Update stage if process belongs to a different stage
-            if next_process.stage != self.current_stage:
+            if next_process.stage_id != self.current_stage_id:
                 self.current_stage = next_process.stage
 
                 # Auto-disable loop mode when leaving a loop group
@@ -757,7 +689,7 @@ class Station(models.Model):
             self.current_process = prev_process
 
             # Update stage if process belongs to a different stage
-            if prev_process.stage != self.current_stage:
+            if prev_process.stage_id != self.current_stage_id:
                 self.current_stage = prev_process.stage
 
             # Handle loop mode
@@ -863,13 +795,13 @@ class Station(models.Model):
                 'name': next_process.name,
                 'display_name': next_process.display_name,
                 'stage': next_process.stage.display_name,
-                'is_new_stage': next_process.stage != self.current_stage
+                'is_new_stage': next_process.stage_id != self.current_stage_id
             } if next_process else None,
             'previous_process': {
                 'name': prev_process.name,
                 'display_name': prev_process.display_name,
                 'stage': prev_process.stage.display_name,
-                'is_different_stage': prev_process.stage != self.current_stage
+                'is_different_stage': prev_process.stage_id != self.current_stage_id
             } if prev_process else None,
             'loop_info': {
                 'is_loop_mode': self.loop_mode,
@@ -901,3 +833,65 @@ class AssemblySession(models.Model):
     def __str__(self):
         status = "Completed" if self.completed else "In Progress"
         return f"{self.product.code} - {self.quantity} units - {status}"
+
+
+class ImportJob(models.Model):
+    """Background ZIP media / Excel BOM import, run by the run_import_workers command"""
+    KIND_CHOICES = [
+        ('MEDIA_ZIP', 'Media ZIP'),
+        ('BOM_EXCEL', 'BOM Excel'),
+    ]
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='QUEUED', db_index=True)
+    params = models.JSONField(default=dict, blank=True)
+    source_file = models.FileField(upload_to='import_jobs/', blank=True, null=True)
+
+    # Progress - units are files (ZIP) or rows (Excel)
+    total = models.PositiveIntegerField(default=0)
+    done = models.PositiveIntegerField(default=0)
+    checkpoint = models.PositiveIntegerField(default=0, help_text="Units committed; a resumed job continues here")
+    result = models.JSONField(default=dict, blank=True)
+    errors = models.JSONField(default=list, blank=True)
+    error_message = models.TextField(blank=True)
+
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} - {self.get_status_display()}"
+
+    def get_progress(self):
+        """Progress summary with an ETA extrapolated from the rate so far"""
+        percent = round(self.done * 100 / self.total, 1) if self.total else (100.0 if self.status == 'DONE' else 0.0)
+        eta_seconds = None
+        if self.status == 'RUNNING' and self.started_at and self.done and self.total > self.done:
+            elapsed = (timezone.now() - self.started_at).total_seconds()
+            eta_seconds = round(elapsed / self.done * (self.total - self.done), 1)
+        return {
+            'job_id': self.pk,
+            'kind': self.kind,
+            'status': self.status,
+            'total': self.total,
+            'done': self.done,
+            'percent': percent,
+            'eta_seconds': eta_seconds,
+            'result': self.result,
+            'errors': self.errors,
+            'error': self.error_message or None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
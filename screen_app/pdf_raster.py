@@ -0,0 +1,181 @@
+"""
+Background rendering of ProductMedia PDFs into per-page images.
+
+Kiosk PCs are slow at rendering PDFs in the browser, so every uploaded PDF
+is rendered once, at display width, into one WebP (PNG if Pillow lacks WebP)
+image per page. The images are stored next to the original file under
+content-hashed names, so they are served with the same immutable caching
+(see media_store / stream_cached_media). ProductMedia keeps the page count
+and the size of every page; the slider shows the images when raster_status
+is READY and falls back to the PDF otherwise.
+
+Rendering uses PyMuPDF when installed, else poppler's pdftoppm. Without
+either, PDFs are marked UNAVAILABLE and keep being shown as PDFs.
+
+    SCREEN_PDF_RASTER_WIDTH = 1920   # pixels, width of the rendered pages
+"""
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+
+from .events import publish_station_change
+from .media_store import fingerprint_of, hash_file
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RASTER_WIDTH = 1920
+WEBP_QUALITY = 85
+
+
+class RendererUnavailable(Exception):
+    """No PDF rendering backend is installed"""
+
+
+def raster_width():
+    return getattr(settings, 'SCREEN_PDF_RASTER_WIDTH', DEFAULT_RASTER_WIDTH)
+
+
+def _render_with_pymupdf(pdf_path, width):
+    import fitz
+
+    with fitz.open(pdf_path) as document:
+        for page in document:
+            zoom = width / page.rect.width
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            yield pixmap.tobytes('png')
+
+
+def _render_with_pdftoppm(pdf_path, width):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        subprocess.run(
+            ['pdftoppm', '-png', '-scale-to-x', str(width), '-scale-to-y', '-1',
+             pdf_path, os.path.join(temp_dir, 'page')],
+            check=True, capture_output=True, timeout=300
+        )
+        # pdftoppm zero-pads page numbers to the page count's width, so names sort
+        for filename in sorted(os.listdir(temp_dir)):
+            with open(os.path.join(temp_dir, filename), 'rb') as f:
+                yield f.read()
+
+
+def get_renderer():
+    """Page renderer function (pdf_path, width) -> iterator of PNG bytes"""
+    try:
+        import fitz  # noqa: F401 - PyMuPDF
+        return _render_with_pymupdf
+    except ImportError:
+        pass
+    if shutil.which('pdftoppm'):
+        return _render_with_pdftoppm
+    raise RendererUnavailable("Install PyMuPDF (pip install pymupdf) or poppler-utils to pre-render PDFs")
+
+
+def _encode_page(png_bytes):
+    """Re-encode a rendered page for the displays: (bytes, extension, width, height)"""
+    from PIL import Image, features
+
+    with Image.open(io.BytesIO(png_bytes)) as image:
+        image = image.convert('RGB')
+        output = io.BytesIO()
+        if features.check('webp'):
+            image.save(output, 'WEBP', quality=WEBP_QUALITY, method=4)
+            extension = 'webp'
+        else:
+            image.save(output, 'PNG', optimize=True)
+            extension = 'png'
+        return output.getvalue(), extension, image.width, image.height
+
+
+def page_image_name(media, page_number, width, extension):
+    """Storage name of a rendered page, next to the PDF and keyed by its hash"""
+    directory, filename = os.path.split(media.file.name)
+    stem = filename[:-len('.pdf')]
+    fingerprint = fingerprint_of(filename)
+    if fingerprint:
+        stem = stem[:-(len(fingerprint) + 1)]
+    else:
+        fingerprint = media.content_hash[:16]
+    return f"{directory}/{stem}.page{page_number:03d}-w{width}.{fingerprint}.{extension}"
+
+
+def rasterize_media(media_id):
+    """Render all pages of one PDF ProductMedia and record them; returns the page count"""
+    from .models import ProductMedia
+
+    media = ProductMedia.objects.filter(pk=media_id).first()
+    if media is None or not media.is_pdf():
+        return 0
+    if not media.content_hash:
+        # Not fingerprinted yet - page names need the content hash
+        with media.file.open('rb') as f:
+            media.content_hash = hash_file(f)
+        ProductMedia.objects.filter(pk=media.pk).update(content_hash=media.content_hash)
+
+    width = raster_width()
+    storage = media.file.storage
+    try:
+        renderer = get_renderer()
+        pages = []
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Renderers need a real path; copy out of storage unless it is local
+            try:
+                pdf_path = storage.path(media.file.name)
+            except NotImplementedError:
+                pdf_path = os.path.join(temp_dir, 'source.pdf')
+                with media.file.open('rb') as source, open(pdf_path, 'wb') as target:
+                    shutil.copyfileobj(source, target)
+
+            for page_number, png_bytes in enumerate(renderer(pdf_path, width), start=1):
+                data, extension, page_width, page_height = _encode_page(png_bytes)
+                name = page_image_name(media, page_number, width, extension)
+                if not storage.exists(name):
+                    name = storage.save(name, ContentFile(data))
+                pages.append({'name': name, 'width': page_width, 'height': page_height})
+    except RendererUnavailable as e:
+        logger.warning(f"PDF pre-rendering skipped for media {media_id}: {e}")
+        ProductMedia.objects.filter(pk=media_id).update(raster_status='UNAVAILABLE')
+        return 0
+    except Exception as e:
+        logger.error(f"PDF pre-rendering failed for media {media_id}: {e}")
+        ProductMedia.objects.filter(pk=media_id).update(raster_status='FAILED')
+        return 0
+
+    # Only record the result if the file was not replaced meanwhile
+    updated = ProductMedia.objects.filter(pk=media_id, content_hash=media.content_hash).update(
+        raster_status='READY', page_count=len(pages), page_images=pages
+    )
+    if updated:
+        publish_station_change('media', product_id=media.product_id)
+    return len(pages)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _run_in_background(media_id):
+    try:
+        rasterize_media(media_id)
+    except Exception as e:
+        logger.error(f"PDF pre-rendering crashed for media {media_id}: {e}")
+    finally:
+        # Worker threads own their DB connection
+        connection.close()
+
+
+def schedule_rasterization(media_id):
+    """Render a media's pages on the background thread once the current transaction commits"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pdf-raster')
+    transaction.on_commit(lambda: _executor.submit(_run_in_background, media_id))
@@ -0,0 +1,221 @@
+"""
+Compiled assembly process graph.
+
+Station navigation (next/previous process, loop rings, stage transitions) used
+to walk AssemblyStage/AssemblyProcess ordering with several queries per call.
+The whole graph is tiny, so it is loaded once (two queries) into an immutable
+transition table and every lookup afterwards is a dict access. Each worker
+keeps its table together with the shared process graph version it was built
+under; saving or deleting a stage or process bumps that version in
+shared_state (see signals.py), so every worker rebuilds on its next lookup.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from types import MappingProxyType
+
+from django.db import transaction
+
+from .state import StateKeys, shared_state
+
+
+def _sort_key(obj):
+    return (obj.order, obj.id)
+
+
+class ProcessGraph:
+    """Immutable next/prev transition table for all products"""
+
+    def __init__(self, stages, processes):
+        stages = sorted(stages, key=_sort_key)
+        stages_by_id = {stage.id: stage for stage in stages}
+
+        # Stage boundaries per product (stages of a product in display order)
+        product_stages = {}
+        for stage in stages:
+            product_stages.setdefault(stage.product_id, []).append(stage)
+
+        # Processes per stage, attached to their cached stage so that
+        # process.stage never hits the database
+        stage_processes = {}
+        for process in sorted(processes, key=_sort_key):
+            if process.stage_id is not None:
+                process.stage = stages_by_id[process.stage_id]
+            stage_processes.setdefault(process.stage_id, []).append(process)
+
+        # Loop-group rings per stage
+        loop_rings = {}
+        for stage_id, stage_list in stage_processes.items():
+            for process in stage_list:
+                if process.loop_group:
+                    loop_rings.setdefault((stage_id, process.loop_group), []).append(process)
+
+        self._product_stages = {key: tuple(value) for key, value in product_stages.items()}
+        self._product_stage_orders = {
+            key: tuple(stage.order for stage in value) for key, value in self._product_stages.items()
+        }
+        self._stage_processes = {key: tuple(value) for key, value in stage_processes.items()}
+        self._stage_process_orders = {
+            key: tuple(process.order for process in value) for key, value in self._stage_processes.items()
+        }
+        self._loop_rings = {key: tuple(value) for key, value in loop_rings.items()}
+        self._ring_positions = {
+            key: {process.id: index for index, process in enumerate(ring)}
+            for key, ring in self._loop_rings.items()
+        }
+        self._stages = MappingProxyType(stages_by_id)
+        self._processes = MappingProxyType({process.id: process for process in processes})
+
+        # Precomputed edges for the usual case: the station's stage is the
+        # process's own stage and the station's product owns that stage
+        next_edges = {}
+        prev_edges = {}
+        for stage_id, stage_list in self._stage_processes.items():
+            stage = stages_by_id.get(stage_id)
+            product_id = stage.product_id if stage else None
+            for index, process in enumerate(stage_list):
+                key = (product_id, stage_id, process.id)
+                if index + 1 < len(stage_list):
+                    next_edges[key] = stage_list[index + 1]
+                else:
+                    next_edges[key] = self._first_process_after_stage(product_id, stage)
+                if index > 0:
+                    prev_edges[key] = stage_list[index - 1]
+                else:
+                    prev_edges[key] = self._last_process_before_stage(product_id, stage)
+        self._next_edges = MappingProxyType(next_edges)
+        self._prev_edges = MappingProxyType(prev_edges)
+
+    @classmethod
+    def build(cls):
+        """Load every stage and process (two queries) and compile the graph"""
+        from .models import AssemblyProcess, AssemblyStage
+
+        return cls(list(AssemblyStage.objects.all()), list(AssemblyProcess.objects.all()))
+
+    # ----- lookups -----
+
+    def process(self, process_id):
+        """Process by id (with its stage attached), or None"""
+        return self._processes.get(process_id)
+
+    def stage(self, stage_id):
+        """Stage by id, or None"""
+        return self._stages.get(stage_id)
+
+    def stage_processes(self, stage_id):
+        """Processes of a stage in order"""
+        return self._stage_processes.get(stage_id, ())
+
+    def first_process_of_product(self, product_id):
+        """First process of the first stage of a product"""
+        stages = self._product_stages.get(product_id)
+        if not stages:
+            return None
+        processes = self.stage_processes(stages[0].id)
+        return processes[0] if processes else None
+
+    def loop_ring(self, stage_id, loop_group):
+        """Processes of a loop group within a stage, in order"""
+        if not loop_group:
+            return ()
+        return self._loop_rings.get((stage_id, loop_group), ())
+
+    def loop_step(self, stage_id, process_id, step):
+        """Process step positions away from process_id in its loop ring, or None without a ring"""
+        process = self._processes.get(process_id)
+        if process is None or not process.loop_group:
+            return None
+        key = (stage_id, process.loop_group)
+        ring = self._loop_rings.get(key)
+        if not ring:
+            return None
+        position = self._ring_positions[key].get(process.id)
+        if position is None:
+            # Current process not in loop - enter at the ring's edge
+            return ring[0] if step > 0 else ring[-1]
+        return ring[(position + step) % len(ring)]
+
+    def next_process(self, product_id, stage_id, process_id):
+        """Next process after process_id in stage_id, moving on to the product's next stage"""
+        key = (product_id, stage_id, process_id)
+        if key in self._next_edges:
+            return self._next_edges[key]
+
+        process = self._processes.get(process_id)
+        if process is None:
+            return None
+        orders = self._stage_process_orders.get(stage_id, ())
+        index = bisect_right(orders, process.order)
+        if index < len(orders):
+            return self._stage_processes[stage_id][index]
+        return self._first_process_after_stage(product_id, self._stages.get(stage_id))
+
+    def previous_process(self, product_id, stage_id, process_id):
+        """Process before process_id in stage_id, moving back to the product's previous stage"""
+        key = (product_id, stage_id, process_id)
+        if key in self._prev_edges:
+            return self._prev_edges[key]
+
+        process = self._processes.get(process_id)
+        if process is None:
+            return None
+        stage = self._stages.get(stage_id)
+
+        orders = self._stage_process_orders.get(stage_id, ())
+        index = bisect_left(orders, process.order)
+        if index > 0:
+            return self._stage_processes[stage_id][index - 1]
+        return self._last_process_before_stage(product_id, stage)
+
+    # ----- stage boundaries -----
+
+    def _first_process_after_stage(self, product_id, stage):
+        if stage is None:
+            return None
+        orders = self._product_stage_orders.get(product_id, ())
+        index = bisect_right(orders, stage.order)
+        if index >= len(orders):
+            return None
+        processes = self.stage_processes(self._product_stages[product_id][index].id)
+        return processes[0] if processes else None
+
+    def _last_process_before_stage(self, product_id, stage):
+        if stage is None:
+            return None
+        orders = self._product_stage_orders.get(product_id, ())
+        index = bisect_left(orders, stage.order)
+        if index == 0:
+            return None
+        processes = self.stage_processes(self._product_stages[product_id][index - 1].id)
+        return processes[-1] if processes else None
+
+
+_graph = None  # (shared version, ProcessGraph)
+_graph_lock = threading.Lock()
+
+
+def get_process_graph():
+    """Return the compiled process graph, rebuilding it when the shared version moved"""
+    global _graph
+    version = shared_state.get(StateKeys.process_graph_version(), 0)
+    cached = _graph
+    if cached is None or cached[0] != version:
+        with _graph_lock:
+            if _graph is None or _graph[0] != version:
+                _graph = (version, ProcessGraph.build())
+            cached = _graph
+    return cached[1]
+
+
+def invalidate_process_graph():
+    """
+    Drop the compiled graph in every worker.
+
+    This worker's copy goes at once; the shared version is bumped when the
+    change commits, so no worker can rebuild from the old rows under the
+    new version.
+    """
+    global _graph
+    with _graph_lock:
+        _graph = None
+    transaction.on_commit(lambda: shared_state.incr(StateKeys.process_graph_version()))
@@ -0,0 +1,191 @@
+"""
+Full-text search over BOM items, with keyset pagination.
+
+The backend is chosen by settings.SCREEN_SEARCH_BACKEND (dotted path). By
+default SQLite databases use an FTS5 index and other databases fall back to
+icontains matching:
+
+    SCREEN_SEARCH_BACKEND = 'screen_app.search.SQLiteFTSSearchBackend'
+    SCREEN_SEARCH_BACKEND = 'screen_app.search.ContainsSearchBackend'
+
+Every backend restricts a BOMItem queryset to the items matching a query and
+annotates it with search_rank (lower is better), so callers keep filtering
+and ordering with the ORM. The FTS5 table (screen_app_bomitem_fts, created
+by migration 0030) lives in the same database as the items, so index
+updates from the BOMItem signals and the bulk import commit or roll back
+together with the data.
+
+Queries are split into tokens and every token is matched as a prefix:
+"hex bol" finds "HEX BOLT M8". A query without any token (e.g. only
+punctuation) matches nothing. Results are ranked with bm25, and the item
+code counts more than the part number, which counts more than the
+description.
+"""
+import base64
+import json
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+FTS_TABLE = 'screen_app_bomitem_fts'
+# bm25 column weights: item_code, item_description, part_number
+FTS_WEIGHTS = (10.0, 2.0, 5.0)
+INDEX_BATCH_SIZE = 500
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def query_tokens(query):
+    return _TOKEN_RE.findall(query or '')
+
+
+class BaseSearchBackend:
+    """Search index of BOM items"""
+
+    rank_field = 'search_rank'
+
+    def search(self, queryset, query):
+        """Restrict a BOMItem queryset to matches of query, annotated with search_rank"""
+        raise NotImplementedError
+
+    def index(self, items):
+        """Add or refresh BOMItem instances in the index"""
+
+    def remove(self, item_ids):
+        """Drop items from the index"""
+
+    def rebuild(self):
+        """Re-index every item; returns the number indexed"""
+        return 0
+
+
+class ContainsSearchBackend(BaseSearchBackend):
+    """Unindexed icontains matching (every token must appear in some field)"""
+
+    def search(self, queryset, query):
+        tokens = query_tokens(query)
+        if not tokens:
+            queryset = queryset.none()
+        for token in tokens:
+            queryset = queryset.filter(
+                Q(item_description__icontains=token) |
+                Q(item_code__icontains=token) |
+                Q(part_number__icontains=token)
+            )
+        return queryset.annotate(**{self.rank_field: Value(0.0, output_field=FloatField())})
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    """SQLite FTS5 index with prefix matching and bm25 ranking"""
+
+    @staticmethod
+    def match_expression(query):
+        # Quote every token so FTS5 operators in user input are taken literally
+        return ' '.join(f'"{token}"*' for token in query_tokens(query))
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none().annotate(**{self.rank_field: Value(0.0, output_field=FloatField())})
+
+        item_table = queryset.model._meta.db_table
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        rank = RawSQL(
+            f'SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = "{item_table}"."id"',
+            [match], output_field=FloatField()
+        )
+        matches = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        return queryset.filter(id__in=matches).annotate(**{self.rank_field: rank})
+
+    def index(self, items):
+        rows = [(item.pk, item.item_code, item.item_description, item.part_number)
+                for item in items if item.pk]
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), INDEX_BATCH_SIZE):
+                batch = rows[start:start + INDEX_BATCH_SIZE]
+                cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in batch])
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, item_code, item_description, part_number) '
+                    f'VALUES (%s, %s, %s, %s)', batch
+                )
+
+    def remove(self, item_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in item_ids])
+
+    def rebuild(self):
+        from .models import BOMItem
+
+        item_table = BOMItem._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, item_code, item_description, part_number) '
+                f'SELECT id, item_code, item_description, part_number FROM "{item_table}"'
+            )
+            return cursor.rowcount
+
+
+def get_search_backend():
+    """Instantiate the backend configured in settings.SCREEN_SEARCH_BACKEND"""
+    path = getattr(settings, 'SCREEN_SEARCH_BACKEND', None)
+    if path is None:
+        path = ('screen_app.search.SQLiteFTSSearchBackend' if connection.vendor == 'sqlite'
+                else 'screen_app.search.ContainsSearchBackend')
+    try:
+        return import_string(path)()
+    except ImportError as e:
+        raise ImproperlyConfigured(f"Invalid SCREEN_SEARCH_BACKEND: {e}")
+
+
+search_backend = SimpleLazyObject(get_search_backend)
+
+
+# ----------------------------------------------------------------------
+# Keyset pagination
+# ----------------------------------------------------------------------
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Ordering values of the last row seen, or None for an invalid cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def keyset_page(queryset, ordering, cursor=None, limit=50):
+    """
+    One page of queryset ordered by ascending fields (the last must be unique).
+
+    Returns (rows, next cursor or None). Rows after the cursor are found with
+    an indexed range condition instead of OFFSET, and no count() is needed.
+    """
+    queryset = queryset.order_by(*ordering)
+    values = decode_cursor(cursor) if cursor else None
+    if values is not None and len(values) == len(ordering):
+        after = Q()
+        for position, field in enumerate(ordering):
+            condition = Q(**{f'{field}__gt': values[position]})
+            for previous, value in zip(ordering[:position], values):
+                condition &= Q(**{previous: value})
+            after |= condition
+        queryset = queryset.filter(after)
+
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([getattr(rows[-1], field) for field in ordering])
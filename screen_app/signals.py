@@ -0,0 +1,103 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .bom_cache import bom_expansion_cache
+from .events import bump_supervisor_version, publish_station_change, station_events
+from .models import (AssemblyProcess, AssemblySession, AssemblyStage, BOMItem,
+                     BOMTemplate, BOMTemplateItem, ProductMedia, Station)
+from .pdf_raster import schedule_rasterization
+from .process_graph import invalidate_process_graph
+from .search import search_backend
+from .thumbnails import schedule_thumbnails
+
+
+@receiver([post_save, post_delete], sender=ProductMedia)
+def product_media_changed(sender, instance, **kwargs):
+    """Wake the displays of a product when its media changes"""
+    publish_station_change('media', product_id=instance.product_id)
+
+
+@receiver(post_save, sender=ProductMedia)
+def product_media_saved(sender, instance, **kwargs):
+    """Pre-render the pages of newly uploaded PDFs in the background"""
+    if instance.raster_status == 'PENDING':
+        schedule_rasterization(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=AssemblyStage)
+@receiver([post_save, post_delete], sender=AssemblyProcess)
+def process_graph_changed(sender, instance, **kwargs):
+    """Drop the compiled process graph and wake every display when a stage or process changes"""
+    invalidate_process_graph()
+    # Navigation and process names can change on any station - a broadcast
+    publish_station_change('process_graph')
+
+
+@receiver([post_save, post_delete], sender=BOMTemplateItem)
+def bom_template_item_changed(sender, instance, **kwargs):
+    """Invalidate the cached expansion of the template a line belongs to"""
+    bom_expansion_cache.bump(instance.bom_template_id)
+    product_id = BOMTemplate.objects.filter(pk=instance.bom_template_id).values_list('product_id', flat=True).first()
+    if product_id:
+        publish_station_change('bom', product_id=product_id)
+
+
+@receiver([post_save, post_delete], sender=BOMItem)
+def bom_item_changed(sender, instance, **kwargs):
+    """Invalidate the cached expansions of every template using this item"""
+    templates = set(
+        BOMTemplateItem.objects.filter(item_id=instance.pk).values_list('bom_template_id', 'bom_template__product_id')
+    )
+    bom_expansion_cache.bump(*(template_id for template_id, _ in templates))
+    for product_id in {product_id for _, product_id in templates}:
+        publish_station_change('bom', product_id=product_id)
+
+
+@receiver(post_save, sender=BOMTemplate)
+def bom_template_saved(sender, instance, **kwargs):
+    """Wake the displays of a product when one of its BOM templates changes"""
+    publish_station_change('bom', product_id=instance.product_id)
+
+
+@receiver(post_save, sender=BOMItem)
+def bom_item_saved(sender, instance, **kwargs):
+    """Precompute the thumbnails of a newly uploaded item photo in the background"""
+    schedule_thumbnails(instance.item_photo)
+
+
+@receiver(post_save, sender=BOMItem)
+def bom_item_indexed(sender, instance, **kwargs):
+    """Keep the BOM item search index in step with the item"""
+    search_backend.index([instance])
+
+
+@receiver(post_delete, sender=BOMItem)
+def bom_item_unindexed(sender, instance, **kwargs):
+    search_backend.remove([instance.pk])
+
+
+@receiver(post_delete, sender=BOMTemplate)
+def bom_template_deleted(sender, instance, **kwargs):
+    """Forget the cached expansions of a deleted template"""
+    bom_expansion_cache.bump(instance.pk)
+    publish_station_change('bom', product_id=instance.product_id)
+
+
+@receiver([post_save, post_delete], sender=Station)
+def station_changed(sender, instance, **kwargs):
+    """Wake a station's displays after any save (views, admin) or delete"""
+    # Station.save bumped state_version in its own UPDATE; a deleted row has none
+    publish_station_change(
+        'station', station_ids=[instance.pk], product_id=instance.current_product_id, bump_rows=False
+    )
+
+
+@receiver([post_save, post_delete], sender=AssemblySession)
+def assembly_session_changed(sender, instance, **kwargs):
+    """Wake the supervisor channel; no display shows sessions, so none is addressed"""
+    def notify():
+        bump_supervisor_version()
+        station_events.publish('session', station_ids=())
+
+    transaction.on_commit(notify)
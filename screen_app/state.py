@@ -0,0 +1,374 @@
+"""
+Shared display state (BOM pagination, reload and sync signals, rate limits).
+
+django.core.cache defaults to LocMemCache, which is private to one worker
+process, so pagination and reload signals diverged as soon as more than one
+worker ran. This module keeps that state in a backend every worker shares:
+
+    SCREEN_STATE_BACKEND = {
+        'BACKEND': 'screen_app.state.SQLiteStateBackend',
+        'LOCATION': BASE_DIR / 'screen_state.sqlite3',
+    }
+
+or, for several hosts, a Redis-compatible server:
+
+    SCREEN_STATE_BACKEND = {
+        'BACKEND': 'screen_app.state.RedisStateBackend',
+        'LOCATION': 'redis://localhost:6379/0',
+    }
+
+Every backend offers atomic add / pop / compare_and_set / incr, and all keys
+are built by StateKeys so there is one key scheme for the whole app.
+"""
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+
+def _dumps(value):
+    # Stable encoding so stored values compare equal byte for byte (Redis CAS)
+    return json.dumps(value, sort_keys=True)
+
+
+class StateKeys:
+    """The one key scheme for shared display state"""
+
+    @classmethod
+    def pagination_generation(cls, product_id):
+        """Generation counter of a product's pagination state"""
+        return f"pagination:product:{product_id}:generation"
+
+    @classmethod
+    def pagination_page(cls, product_id, bom_type, generation=0):
+        """
+        Current BOM page shared by all displays of a product.
+
+        The product's pagination generation is part of the key, so bumping the
+        generation invalidates the pages of every BOM type at once.
+        """
+        return f"pagination:product:{product_id}:gen:{generation}:type:{bom_type}"
+
+    @classmethod
+    def station_stage(cls, station_id):
+        """Last stage seen by a station (pagination resets on change)"""
+        return f"pagination:station:{station_id}:stage"
+
+    @classmethod
+    def station_process(cls, station_id):
+        """Last process seen by a station (pagination resets on change)"""
+        return f"pagination:station:{station_id}:process"
+
+    @classmethod
+    def reload_signal(cls, display_number):
+        """One-shot reload request for a display"""
+        return f"reload:display:{display_number}"
+
+    @classmethod
+    def bom_sync(cls, station_id, display_number):
+        """One-shot BOM page sync signal for a display"""
+        return f"bom_sync:station:{station_id}:display:{display_number}"
+
+    @classmethod
+    def broadcast_version(cls):
+        """Change counter bumped by events that concern every display"""
+        return "version:all"
+
+    @classmethod
+    def station_version(cls, station_id):
+        """Change counter of one station's display state"""
+        return f"version:station:{station_id}"
+
+    @classmethod
+    def product_version(cls, product_id):
+        """Change counter of the display state shared by a product's stations"""
+        return f"version:product:{product_id}"
+
+    @classmethod
+    def supervisor_version(cls):
+        """Change counter of everything the supervisor channel shows"""
+        return "version:supervisor"
+
+    @classmethod
+    def station_product(cls, station_id):
+        """Product a station showed when its last snapshot was built (0 = none)"""
+        return f"snapshot:station:{station_id}:product"
+
+    @classmethod
+    def snapshot_digests(cls, station_id, variant, version):
+        """Section digests of the snapshot a display variant was sent at a version"""
+        return f"snapshot:station:{station_id}:{variant}:v{version}"
+
+    @classmethod
+    def stream_replay(cls, station_id):
+        """Replay buffer of a station's typed SSE stream: [[event id, section digests], ...]"""
+        return f"stream:station:{station_id}:replay"
+
+    @classmethod
+    def process_graph_version(cls):
+        """Version of the compiled process graph (bumped on stage / process edits)"""
+        return "process_graph:version"
+
+    @classmethod
+    def bom_template_version(cls, template_id):
+        """Version of a BOM template's cached expansions (bumped on line / item edits)"""
+        return f"bom:template:{template_id}:version"
+
+    @classmethod
+    def auto_loop_bucket(cls, product_id):
+        """Auto loop progression token bucket of a product"""
+        return f"auto_loop:product:{product_id}:bucket"
+
+
+class BaseStateBackend:
+    """
+    Interface of a shared state backend.
+
+    Values must be JSON serializable. timeout is in seconds; None keeps the
+    value until it is changed or deleted.
+    """
+
+    def __init__(self, location, options=None):
+        self.location = location
+        self.options = options or {}
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, timeout=None):
+        raise NotImplementedError
+
+    def add(self, key, value, timeout=None):
+        """Set key only if it is absent; True if it was set"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Delete key; True if it existed"""
+        raise NotImplementedError
+
+    def pop(self, key, default=None):
+        """Atomically read and delete key (one-shot signals)"""
+        raise NotImplementedError
+
+    def compare_and_set(self, key, expected, value, timeout=None):
+        """Set key to value only if it currently holds expected (None = absent)"""
+        raise NotImplementedError
+
+    def incr(self, key, delta=1):
+        """Atomically add delta to an integer key (absent counts as 0); returns the new value"""
+        raise NotImplementedError
+
+
+class SQLiteStateBackend(BaseStateBackend):
+    """
+    Shared state in a local SQLite file.
+
+    Every worker process on the host opens the same file; writes run in
+    BEGIN IMMEDIATE transactions so read-modify-write operations are atomic
+    across processes.
+    """
+
+    PURGE_EVERY = 200  # writes between sweeps of expired rows
+
+    def __init__(self, location, options=None):
+        super().__init__(str(location), options)
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.location, timeout=self.options.get('timeout', 10), isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS screen_state '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)'
+            )
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        else:
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                connection.execute(
+                    'DELETE FROM screen_state WHERE expires_at IS NOT NULL AND expires_at <= ?',
+                    (time.time(),)
+                )
+            connection.execute('COMMIT')
+
+    _MISSING = object()
+
+    def _read(self, connection, key):
+        row = connection.execute(
+            'SELECT value, expires_at FROM screen_state WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return self._MISSING
+        return json.loads(row[0])
+
+    def _write(self, connection, key, value, timeout):
+        expires_at = None if timeout is None else time.time() + timeout
+        connection.execute(
+            'INSERT OR REPLACE INTO screen_state (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value), expires_at)
+        )
+
+    def get(self, key, default=None):
+        value = self._read(self._connection(), key)
+        return default if value is self._MISSING else value
+
+    def set(self, key, value, timeout=None):
+        with self._transaction() as connection:
+            self._write(connection, key, value, timeout)
+
+    def add(self, key, value, timeout=None):
+        with self._transaction() as connection:
+            if self._read(connection, key) is not self._MISSING:
+                return False
+            self._write(connection, key, value, timeout)
+            return True
+
+    def delete(self, key):
+        with self._transaction() as connection:
+            existed = self._read(connection, key) is not self._MISSING
+            connection.execute('DELETE FROM screen_state WHERE key = ?', (key,))
+            return existed
+
+    def pop(self, key, default=None):
+        with self._transaction() as connection:
+            value = self._read(connection, key)
+            connection.execute('DELETE FROM screen_state WHERE key = ?', (key,))
+            return default if value is self._MISSING else value
+
+    def compare_and_set(self, key, expected, value, timeout=None):
+        with self._transaction() as connection:
+            current = self._read(connection, key)
+            current = None if current is self._MISSING else current
+            if current != expected:
+                return False
+            self._write(connection, key, value, timeout)
+            return True
+
+    def incr(self, key, delta=1):
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT expires_at FROM screen_state WHERE key = ?', (key,)
+            ).fetchone()
+            current = self._read(connection, key)
+            value = (0 if current is self._MISSING else int(current)) + delta
+            # Keep the key's remaining lifetime
+            expires_at = row[0] if row and current is not self._MISSING else None
+            connection.execute(
+                'INSERT OR REPLACE INTO screen_state (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value), expires_at)
+            )
+            return value
+
+
+class RedisStateBackend(BaseStateBackend):
+    """Shared state on a Redis-compatible server (requires the redis package)"""
+
+    # KEYS[1]=key, ARGV[1]='1' if key must be absent, ARGV[2]=expected, ARGV[3]=value, ARGV[4]=ttl ms or ''
+    CAS_SCRIPT = """
+    local current = redis.call('GET', KEYS[1])
+    if ARGV[1] == '1' then
+        if current then return 0 end
+    elseif current ~= ARGV[2] then
+        return 0
+    end
+    if ARGV[4] ~= '' then
+        redis.call('SET', KEYS[1], ARGV[3], 'PX', ARGV[4])
+    else
+        redis.call('SET', KEYS[1], ARGV[3])
+    end
+    return 1
+    """
+
+    def __init__(self, location, options=None):
+        super().__init__(location, options)
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured(
+                "RedisStateBackend requires the 'redis' package (pip install redis)"
+            )
+        self.prefix = self.options.get('KEY_PREFIX', 'screen:')
+        self._client = redis.Redis.from_url(location)
+        self._cas = self._client.register_script(self.CAS_SCRIPT)
+
+    def _key(self, key):
+        return f"{self.prefix}{key}"
+
+    @staticmethod
+    def _ttl_ms(timeout):
+        return None if timeout is None else max(1, int(timeout * 1000))
+
+    def get(self, key, default=None):
+        raw = self._client.get(self._key(key))
+        return default if raw is None else json.loads(raw)
+
+    def set(self, key, value, timeout=None):
+        self._client.set(self._key(key), _dumps(value), px=self._ttl_ms(timeout))
+
+    def add(self, key, value, timeout=None):
+        return bool(self._client.set(self._key(key), _dumps(value), px=self._ttl_ms(timeout), nx=True))
+
+    def delete(self, key):
+        return bool(self._client.delete(self._key(key)))
+
+    def pop(self, key, default=None):
+        pipeline = self._client.pipeline(transaction=True)
+        pipeline.get(self._key(key))
+        pipeline.delete(self._key(key))
+        raw, _ = pipeline.execute()
+        return default if raw is None else json.loads(raw)
+
+    def compare_and_set(self, key, expected, value, timeout=None):
+        ttl = self._ttl_ms(timeout)
+        result = self._cas(
+            keys=[self._key(key)],
+            args=[
+                '1' if expected is None else '0',
+                '' if expected is None else _dumps(expected),
+                _dumps(value),
+                '' if ttl is None else ttl,
+            ]
+        )
+        return bool(result)
+
+    def incr(self, key, delta=1):
+        return int(self._client.incrby(self._key(key), delta))
+
+
+def get_state_backend():
+    """Instantiate the backend configured in settings.SCREEN_STATE_BACKEND"""
+    config = getattr(settings, 'SCREEN_STATE_BACKEND', None) or {
+        'BACKEND': 'screen_app.state.SQLiteStateBackend',
+        'LOCATION': settings.BASE_DIR / 'screen_state.sqlite3',
+    }
+    try:
+        backend_class = import_string(config['BACKEND'])
+    except (KeyError, ImportError) as e:
+        raise ImproperlyConfigured(f"Invalid SCREEN_STATE_BACKEND: {e}")
+    return backend_class(config.get('LOCATION'), config.get('OPTIONS'))
+
+
+# Process-wide handle on the configured backend, created on first use
+shared_state = SimpleLazyObject(get_state_backend)
@@ -0,0 +1,11 @@
+from django import template
+
+from screen_app.thumbnails import thumbnail_url
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail(photo, variant='sm'):
+    """{{ item.item_photo|thumbnail:'md' }} - URL of a photo thumbnail size"""
+    return thumbnail_url(photo, variant) or ''
@@ -1,3 +1,444 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from types import SimpleNamespace
 
-# Create your tests here.
+import openpyxl
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+
+from . import jobs
+from .bom_cache import bom_expansion_cache
+from .bom_layout import BOMPageLayout
+from .media_delivery import parse_range_header, serve_media_file
+from .models import BOMItem, BOMTemplate, ImportJob, Product, Station
+from .process_graph import ProcessGraph, invalidate_process_graph
+from .search import ContainsSearchBackend, SQLiteFTSSearchBackend, keyset_page
+from .state import SQLiteStateBackend, shared_state
+
+
+class SharedStateTestMixin:
+    """Run every test against a private SQLite state file instead of SCREEN_STATE_BACKEND"""
+
+    def setUp(self):
+        super().setUp()
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir, ignore_errors=True)
+        saved = shared_state._wrapped
+        shared_state._wrapped = SQLiteStateBackend(os.path.join(state_dir, 'state.sqlite3'))
+        self.addCleanup(setattr, shared_state, '_wrapped', saved)
+        # Versions start again at 0 - drop what earlier tests cached under them
+        invalidate_process_graph()
+        bom_expansion_cache.clear()
+
+
+class MediaRootTestMixin:
+    """Write uploads and media under a temporary MEDIA_ROOT"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+
+# ===== SHARED STATE =====
+
+class SQLiteStateBackendTests(TestCase):
+
+    def setUp(self):
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir, ignore_errors=True)
+        self.state = SQLiteStateBackend(os.path.join(state_dir, 'state.sqlite3'))
+
+    def test_add_only_sets_absent_keys(self):
+        self.assertTrue(self.state.add('k', 1))
+        self.assertFalse(self.state.add('k', 2))
+        self.assertEqual(self.state.get('k'), 1)
+
+    def test_add_replaces_expired_keys(self):
+        self.state.add('k', 1, timeout=0.05)
+        time.sleep(0.1)
+        self.assertTrue(self.state.add('k', 2))
+        self.assertEqual(self.state.get('k'), 2)
+
+    def test_pop_reads_once(self):
+        self.state.set('signal', {'reload': True})
+        self.assertEqual(self.state.pop('signal'), {'reload': True})
+        self.assertIsNone(self.state.pop('signal'))
+        self.assertEqual(self.state.pop('signal', 'gone'), 'gone')
+
+    def test_compare_and_set(self):
+        self.assertTrue(self.state.compare_and_set('page', None, 1))
+        self.assertFalse(self.state.compare_and_set('page', None, 5))
+        self.assertFalse(self.state.compare_and_set('page', 2, 5))
+        self.assertTrue(self.state.compare_and_set('page', 1, 2))
+        self.assertEqual(self.state.get('page'), 2)
+
+    def test_incr_starts_at_zero(self):
+        self.assertEqual(self.state.incr('counter'), 1)
+        self.assertEqual(self.state.incr('counter', 5), 6)
+
+    def test_incr_keeps_ttl(self):
+        self.state.set('counter', 1, timeout=0.2)
+        self.assertEqual(self.state.incr('counter'), 2)
+        time.sleep(0.3)
+        self.assertIsNone(self.state.get('counter'))
+
+    def test_incr_without_ttl_never_expires(self):
+        self.state.incr('counter')
+        connection = self.state._connection()
+        expires_at = connection.execute(
+            'SELECT expires_at FROM screen_state WHERE key = ?', ('counter',)
+        ).fetchone()[0]
+        self.assertIsNone(expires_at)
+
+
+# ===== PROCESS GRAPH =====
+
+class ProcessGraphTests(TestCase):
+
+    def setUp(self):
+        stage_1 = SimpleNamespace(id=1, order=1, product_id=10)
+        stage_2 = SimpleNamespace(id=2, order=2, product_id=10)
+        self.a = SimpleNamespace(id=1, order=1, stage_id=1, loop_group=None)
+        # Same order as a: the id breaks the tie
+        self.b = SimpleNamespace(id=2, order=1, stage_id=1, loop_group=None)
+        self.c = SimpleNamespace(id=3, order=2, stage_id=1, loop_group=None)
+        self.d = SimpleNamespace(id=4, order=1, stage_id=2, loop_group=None)
+        self.graph = ProcessGraph([stage_2, stage_1], [self.d, self.c, self.b, self.a])
+
+    def test_next_within_stage(self):
+        self.assertIs(self.graph.next_process(10, 1, self.a.id), self.b)
+        self.assertIs(self.graph.next_process(10, 1, self.b.id), self.c)
+
+    def test_previous_within_stage(self):
+        self.assertIs(self.graph.previous_process(10, 1, self.c.id), self.b)
+        self.assertIs(self.graph.previous_process(10, 1, self.b.id), self.a)
+
+    def test_edges_cross_stages(self):
+        self.assertIs(self.graph.next_process(10, 1, self.c.id), self.d)
+        self.assertIs(self.graph.previous_process(10, 2, self.d.id), self.c)
+
+    def test_ends_of_product(self):
+        self.assertIsNone(self.graph.previous_process(10, 1, self.a.id))
+        self.assertIsNone(self.graph.next_process(10, 2, self.d.id))
+        self.assertIs(self.graph.first_process_of_product(10), self.a)
+
+    def test_unknown_process(self):
+        self.assertIsNone(self.graph.next_process(10, 1, 999))
+
+    def test_loop_ring(self):
+        processes = [
+            SimpleNamespace(id=pk, order=pk, stage_id=1, loop_group='ring') for pk in (1, 2, 3)
+        ]
+        graph = ProcessGraph([SimpleNamespace(id=1, order=1, product_id=10)], processes)
+        self.assertEqual([p.id for p in graph.loop_ring(1, 'ring')], [1, 2, 3])
+        self.assertEqual(graph.loop_step(1, 3, 1).id, 1)
+        self.assertEqual(graph.loop_step(1, 1, -1).id, 3)
+
+
+# ===== BOM PAGE LAYOUT =====
+
+class FakeTemplate:
+
+    def __init__(self, item_count, split):
+        self.item_count = item_count
+        self.split = split
+
+    def should_split_across_displays(self):
+        return self.split
+
+    def generate_bom_for_quantity(self, quantity):
+        return [{'serial_number': index + 1} for index in range(self.item_count)]
+
+
+class BOMPageLayoutTests(TestCase):
+
+    def test_split_pages(self):
+        layout = BOMPageLayout(FakeTemplate(30, split=True))
+        self.assertEqual(layout.items_per_page, 24)
+        self.assertEqual(layout.total_pages, 2)
+        self.assertEqual(layout.display_bounds(1, 3), (16, 24))
+        # Page 2 holds 6 items, all on display 1
+        self.assertEqual(len(layout.items_for_display(1, page=2)), 6)
+        self.assertEqual(layout.items_for_display(2, page=2), [])
+        self.assertEqual(layout.display_distribution(2)['display_1'],
+                         {'start_serial': 25, 'end_serial': 30, 'item_count': 6})
+        self.assertEqual(layout.display_distribution(2)['display_2']['item_count'], 0)
+
+    def test_non_split_only_display_one(self):
+        layout = BOMPageLayout(FakeTemplate(10, split=False), items_per_screen=4)
+        self.assertEqual(layout.total_pages, 3)
+        self.assertEqual([item['serial_number'] for item in layout.items_for_display(1, page=3)], [9, 10])
+        self.assertEqual(layout.items_for_display(2, page=1), [])
+        self.assertIsNone(layout.display_distribution(1))
+
+    def test_empty_bom_has_one_page(self):
+        layout = BOMPageLayout(FakeTemplate(0, split=True))
+        self.assertEqual(layout.total_pages, 1)
+        self.assertEqual(layout.items_for_display(1), [])
+
+    def test_out_of_range_page(self):
+        layout = BOMPageLayout(FakeTemplate(5, split=True))
+        self.assertEqual(layout.items_for_display(1, page=0), [])
+        self.assertEqual(layout.items_for_display(1, page=3), [])
+
+
+# ===== MEDIA DELIVERY =====
+
+class ParseRangeHeaderTests(TestCase):
+
+    def test_single_and_open_ended(self):
+        self.assertEqual(parse_range_header('bytes=0-99', 1000), [(0, 99)])
+        self.assertEqual(parse_range_header('bytes=900-', 1000), [(900, 999)])
+        self.assertEqual(parse_range_header('bytes=900-5000', 1000), [(900, 999)])
+
+    def test_suffix(self):
+        self.assertEqual(parse_range_header('bytes=-100', 1000), [(900, 999)])
+        self.assertEqual(parse_range_header('bytes=-5000', 1000), [(0, 999)])
+
+    def test_merges_overlapping_and_adjacent(self):
+        self.assertEqual(parse_range_header('bytes=50-99,0-49,90-120', 1000), [(0, 120)])
+
+    def test_multiple_disjoint(self):
+        self.assertEqual(parse_range_header('bytes=500-599, 0-9', 1000), [(0, 9), (500, 599)])
+
+    def test_unsatisfiable(self):
+        self.assertEqual(parse_range_header('bytes=1000-', 1000), [])
+        self.assertEqual(parse_range_header('bytes=-0', 1000), [])
+
+    def test_ignored(self):
+        for header in ('', 'items=0-1', 'bytes=', 'bytes=abc-', 'bytes=5-1', 'bytes=5', 'bytes=-x'):
+            self.assertIsNone(parse_range_header(header, 1000), header)
+        self.assertIsNone(parse_range_header('bytes=' + ','.join(['0-1'] * 17), 1000))
+
+
+class ServeMediaFileTests(MediaRootTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.data = bytes(range(256)) * 4
+        with open(os.path.join(self.media_root, 'clip.mp4'), 'wb') as f:
+            f.write(self.data)
+        self.factory = RequestFactory()
+
+    def serve(self, **headers):
+        return serve_media_file(self.factory.get('/media/clip.mp4', **headers), 'clip.mp4')
+
+    def body(self, response):
+        content = b''.join(response.streaming_content)
+        response.close()
+        return content
+
+    def test_full_response(self):
+        response = self.serve()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], str(len(self.data)))
+        self.assertEqual(self.body(response), self.data)
+
+    def test_range(self):
+        response = self.serve(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.data)}')
+        self.assertEqual(self.body(response), self.data[10:20])
+
+    def test_unsatisfiable_range(self):
+        response = self.serve(HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.data)}')
+
+    def test_not_modified(self):
+        etag = self.serve()['ETag']
+        self.assertEqual(self.serve(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.serve(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_if_range(self):
+        etag = self.serve()['ETag']
+        response = self.serve(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        self.body(response)
+        # A stale validator gets the whole file
+        response = self.serve(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+
+    def test_missing_file(self):
+        self.assertEqual(serve_media_file(self.factory.get('/'), 'missing.mp4').status_code, 404)
+
+
+# ===== DISPLAY SNAPSHOT =====
+
+class DisplaySnapshotTests(SharedStateTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(code='P1', name='Product 1')
+        self.station = Station.objects.create(name='Line 1', display_number=1, current_product=self.product)
+        self.url = f'/station/{self.station.id}/display-snapshot/'
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_page_is_part_of_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, {'page': 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_station_change_invalidates(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.station.loop_mode = True
+            self.station.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_missing_station(self):
+        self.assertEqual(self.client.get('/station/999/display-snapshot/').status_code, 404)
+
+
+# ===== SEARCH =====
+
+class SearchTests(SharedStateTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for index, description in enumerate(['HEX BOLT M8', 'HEX NUT M8', 'WASHER', 'HEX BOLT M10', 'SPRING']):
+            BOMItem.objects.create(item_code=f'C{index}', item_description=description, part_number=f'P{index}')
+
+    def test_keyset_pages_cover_every_row_once(self):
+        queryset = BOMItem.objects.all()
+        ordering = ['item_description', 'id']
+        seen, cursor, pages = [], None, 0
+        while True:
+            rows, cursor = keyset_page(queryset, ordering, cursor, limit=2)
+            seen.extend(row.pk for row in rows)
+            pages += 1
+            if cursor is None:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, list(queryset.order_by(*ordering).values_list('pk', flat=True)))
+
+    def test_keyset_last_full_page_has_no_cursor(self):
+        rows, cursor = keyset_page(BOMItem.objects.all(), ['id'], limit=5)
+        self.assertEqual(len(rows), 5)
+        self.assertIsNone(cursor)
+
+    def test_keyset_invalid_cursor_starts_over(self):
+        rows, _ = keyset_page(BOMItem.objects.all(), ['id'], 'not-a-cursor', limit=2)
+        self.assertEqual([row.pk for row in rows], list(BOMItem.objects.order_by('id').values_list('pk', flat=True)[:2]))
+
+    def test_prefix_search(self):
+        for backend in (SQLiteFTSSearchBackend(), ContainsSearchBackend()):
+            found = backend.search(BOMItem.objects.all(), 'hex bol')
+            self.assertEqual(
+                sorted(found.values_list('item_description', flat=True)), ['HEX BOLT M10', 'HEX BOLT M8'],
+                type(backend).__name__
+            )
+
+    def test_query_without_tokens_matches_nothing(self):
+        for backend in (SQLiteFTSSearchBackend(), ContainsSearchBackend()):
+            found = backend.search(BOMItem.objects.all(), '!! --')
+            self.assertEqual(list(found.order_by(backend.rank_field, 'id')), [], type(backend).__name__)
+
+
+# ===== BULK BOM ITEM UPDATE =====
+
+class BulkUpdateBOMItemsTests(SharedStateTestMixin, TestCase):
+
+    url = '/station/api/bom-items/bulk-update/'
+
+    def post(self, updates):
+        return self.client.post(self.url, json.dumps({'updates': updates}), content_type='application/json')
+
+    def test_failures_reported_per_id(self):
+        good = BOMItem.objects.create(item_code='G', item_description='Good', part_number='P1')
+        bad = BOMItem.objects.create(item_code='B', item_description='Bad', part_number='P2', supplier='Old')
+        response = self.post([
+            {'id': good.pk, 'supplier': 'Acme', 'cost_per_unit': '2.50'},
+            {'id': bad.pk, 'cost_per_unit': 'not a number'},
+            {'id': 999999, 'supplier': 'X'},
+            {'id': good.pk + bad.pk + 1000},
+            {'supplier': 'no id'},
+        ])
+        data = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['updated_count'], 1)
+        errors = {entry['id']: entry['error'] for entry in data['failed']}
+        self.assertIn('cost_per_unit', errors[bad.pk])
+        self.assertEqual(errors[999999], 'Item not found')
+        self.assertIn(None, errors)
+        self.assertEqual(len(data['failed']), 4)
+
+        good.refresh_from_db()
+        bad.refresh_from_db()
+        self.assertEqual(good.supplier, 'Acme')
+        self.assertEqual(good.cost_per_unit, Decimal('2.50'))
+        self.assertEqual(bad.supplier, 'Old')
+
+    def test_updates_must_be_a_list(self):
+        response = self.client.post(self.url, json.dumps({'updates': {}}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+# ===== IMPORT JOBS =====
+
+class RunJobTests(SharedStateTestMixin, MediaRootTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        product = Product.objects.create(code='P1', name='Product 1')
+        self.template = BOMTemplate.objects.create(product=product, bom_type='SINGLE_UNIT', template_name='Main')
+
+    def excel_upload(self, rows):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(['S.NO', 'CODE', 'ITEM DESCRIPTION', 'PART NO', 'QTY', 'UOM'])
+        for index in range(rows):
+            sheet.append([index + 1, f'ITEM{index + 1}', f'Item {index + 1}', f'PN{index + 1}', 1, 'NO.'])
+        output = io.BytesIO()
+        workbook.save(output)
+        return SimpleUploadedFile('bom.xlsx', output.getvalue())
+
+    def test_fresh_job(self):
+        job = jobs.enqueue_job('BOM_EXCEL', self.excel_upload(3), template_id=self.template.pk)
+        jobs.run_job(jobs.claim_job('worker-1'), 'worker-1')
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'DONE')
+        self.assertEqual(job.result['created'], 3)
+        self.assertEqual(self.template.bom_items.count(), 3)
+
+    def test_resumes_from_checkpoint(self):
+        job = jobs.enqueue_job('BOM_EXCEL', self.excel_upload(5), template_id=self.template.pk)
+        # A worker died after committing the first 3 rows
+        ImportJob.objects.filter(pk=job.pk).update(
+            checkpoint=3, done=3, result={'success': True, 'created': 3, 'updated': 0, 'skipped': 0, 'errors': []}
+        )
+
+        claimed = jobs.claim_job('worker-2')
+        self.assertEqual(claimed.pk, job.pk)
+        jobs.run_job(claimed, 'worker-2')
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'DONE')
+        self.assertEqual(job.result['created'], 5)
+        # Only the rows after the checkpoint were imported by this run
+        self.assertEqual(
+            sorted(BOMItem.objects.values_list('item_code', flat=True)), ['ITEM4', 'ITEM5']
+        )
+
+    def test_job_is_claimed_once(self):
+        jobs.enqueue_job('BOM_EXCEL', self.excel_upload(1), template_id=self.template.pk)
+        self.assertIsNotNone(jobs.claim_job('worker-1'))
+        self.assertIsNone(jobs.claim_job('worker-2'))
@@ -0,0 +1,215 @@
+"""
+Thumbnails of BOMItem photos in fixed size variants.
+
+Displays show BOM photos at around 80px, so sending the original upload
+wastes megabytes per page. Every variant in PHOTO_VARIANTS (see bom_photos)
+is served by the bom_photo_thumbnail view:
+
+- thumbnails precomputed next to a content-addressed photo (by the Excel
+  import, or in the background after an item's photo is saved) are served as
+  they are. Their names only carry the photo's stem, so for any other photo
+  they could belong to an earlier file of the same name and are ignored;
+- anything else is rendered on first request into a disk cache under
+  MEDIA_ROOT, keyed by the photo's name, size and mtime. The cache is trimmed
+  back below its size limit by evicting the least recently used entries.
+
+Content-addressed photos get immutable thumbnail URLs; the rest are
+revalidated with their ETag.
+
+    SCREEN_THUMBNAIL_CACHE_DIR = 'thumb_cache'             # under MEDIA_ROOT
+    SCREEN_THUMBNAIL_CACHE_MAX_BYTES = 512 * 1024 * 1024
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.urls import reverse
+from PIL import Image
+
+from .bom_photos import PHOTO_VARIANTS, encode_thumbnail, thumbnail_extension, thumbnail_name
+from .media_delivery import resolve_media_path
+from .media_store import fingerprint_of
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = 'thumb_cache'
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+EVICT_EVERY = 50          # cache writes between size checks
+EVICT_LOW_WATER = 0.8     # trim down to this fraction of the limit
+TOUCH_INTERVAL = 3600     # seconds; hits refresh an entry's mtime at most this often
+
+PHOTO_DIR = 'bom_items/'  # BOMItem.item_photo upload_to
+
+CONTENT_TYPES = {'.webp': 'image/webp', '.png': 'image/png'}
+
+
+def cache_dir():
+    return getattr(settings, 'SCREEN_THUMBNAIL_CACHE_DIR', DEFAULT_CACHE_DIR).strip('/')
+
+
+def cache_max_bytes():
+    return getattr(settings, 'SCREEN_THUMBNAIL_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES)
+
+
+def thumbnail_url(photo, variant='sm'):
+    """URL of a photo's thumbnail (None without a photo)"""
+    if not photo:
+        return None
+    return reverse('bom_photo_thumbnail', args=[variant, photo.name])
+
+
+def thumbnail_content_type(thumb_path):
+    """Content type of a thumbnail file (webp, or png where Pillow lacks webp)"""
+    return CONTENT_TYPES.get(os.path.splitext(thumb_path)[1].lower(), 'application/octet-stream')
+
+
+def cache_entry_name(photo_name, variant, stat_result):
+    """Media-relative path of an on-demand thumbnail in the disk cache"""
+    key = hashlib.sha1(
+        f"{photo_name}:{stat_result.st_size}:{stat_result.st_mtime_ns}:{PHOTO_VARIANTS[variant]}".encode()
+    ).hexdigest()
+    return f"{cache_dir()}/{variant}/{key[:2]}/{key}{thumbnail_extension()}"
+
+
+def render_thumbnail(source_path, variant):
+    with Image.open(source_path) as image:
+        return encode_thumbnail(image, PHOTO_VARIANTS[variant])
+
+
+def get_thumbnail(photo_name, variant):
+    """
+    Media-relative path of a photo's thumbnail, rendering it into the cache if needed.
+
+    Returns None when the photo does not exist (or is not a BOM photo).
+    """
+    if variant not in PHOTO_VARIANTS or not photo_name.startswith(PHOTO_DIR):
+        return None
+
+    if fingerprint_of(photo_name):
+        precomputed = thumbnail_name(photo_name, variant)
+        if resolve_media_path(precomputed):
+            return precomputed
+
+    source_path = resolve_media_path(photo_name)
+    if source_path is None:
+        return None
+
+    entry = cache_entry_name(photo_name, variant, os.stat(source_path))
+    entry_path = os.path.join(settings.MEDIA_ROOT, entry)
+    try:
+        if time.time() - os.stat(entry_path).st_mtime > TOUCH_INTERVAL:
+            os.utime(entry_path)  # mtime is the LRU clock
+        return entry
+    except FileNotFoundError:
+        pass
+
+    data = render_thumbnail(source_path, variant)
+    os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+    # Write then rename, so concurrent requests never see a partial file
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, entry_path)
+    _cache_written()
+    return entry
+
+
+_writes = 0
+_evict_lock = threading.Lock()
+
+
+def _cache_written():
+    global _writes
+    with _evict_lock:
+        _writes += 1
+        if _writes < EVICT_EVERY:
+            return
+        _writes = 0
+    evict_cache()
+
+
+def evict_cache(max_bytes=None):
+    """Delete least recently used cache entries until the cache fits; returns bytes freed"""
+    max_bytes = cache_max_bytes() if max_bytes is None else max_bytes
+    root = os.path.join(settings.MEDIA_ROOT, cache_dir())
+    if not _evict_lock.acquire(blocking=False):
+        return 0  # another thread is already trimming
+    try:
+        entries, total = [], 0
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                try:
+                    stat_result = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat_result.st_mtime, stat_result.st_size, path))
+                total += stat_result.st_size
+        if total <= max_bytes:
+            return 0
+
+        freed, target = 0, total - int(max_bytes * EVICT_LOW_WATER)
+        for _, size, path in sorted(entries):
+            if freed >= target:
+                break
+            try:
+                os.remove(path)
+                freed += size
+            except FileNotFoundError:
+                pass
+        logger.info(f"Thumbnail cache trimmed by {freed} bytes")
+        return freed
+    finally:
+        _evict_lock.release()
+
+
+def precompute_thumbnails(photo_name, storage):
+    """Store every variant next to a photo (skipping existing ones); returns how many were written"""
+    written = 0
+    with storage.open(photo_name, 'rb') as f, Image.open(f) as image:
+        image.load()
+        for variant, size in PHOTO_VARIANTS.items():
+            name = thumbnail_name(photo_name, variant)
+            if not storage.exists(name):
+                storage.save(name, ContentFile(encode_thumbnail(image, size)))
+                written += 1
+    return written
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _run_in_background(photo_name, storage):
+    try:
+        precompute_thumbnails(photo_name, storage)
+    except Exception as e:
+        logger.error(f"Thumbnails failed for {photo_name}: {e}")
+    finally:
+        connection.close()
+
+
+def schedule_thumbnails(photo):
+    """
+    Precompute a photo's thumbnails on a background thread once the transaction commits.
+
+    Only content-addressed photos qualify - get_thumbnail ignores precomputed
+    thumbnails of any other photo.
+    """
+    global _executor
+    if not photo or not fingerprint_of(photo.name):
+        return
+    if all(photo.storage.exists(thumbnail_name(photo.name, variant)) for variant in PHOTO_VARIANTS):
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='thumbnails')
+    name, storage = photo.name, photo.storage
+    transaction.on_commit(lambda: _executor.submit(_run_in_background, name, storage))
@@ -31,6 +31,8 @@ urlpatterns = [
     # File streaming
     path('stream/video/<path:video_path>/', views.stream_video, name='stream_video'),
     path('stream/pdf/<path:pdf_path>/', views.stream_pdf, name='stream_pdf'),
+    path('stream/cached/<path:media_path>', views.stream_cached_media, name='stream_cached_media'),
+    path('thumb/<str:variant>/<path:photo_path>', views.bom_photo_thumbnail, name='bom_photo_thumbnail'),
     
     # BRG Assembly management endpoints
     path('<int:station_id>/clicker/', views.clicker_action, name='clicker_action'),
@@ -41,6 +43,8 @@ urlpatterns = [
     # Workflow management
     path('workflow/status/', views.get_workflow_status, name='workflow_status'),
     path('workflow/sync/', views.sync_all_displays, name='sync_all_displays'),
+    path('supervisor/stream/', views.supervisor_stream, name='supervisor_stream'),
+    path('supervisor/changes/', views.supervisor_changes, name='supervisor_changes'),
     
     # Debug endpoints
     path('<int:station_id>/debug/', views.debug_station, name='debug_station'),
@@ -74,6 +78,7 @@ urlpatterns = [
     
     # Export
     path('api/bom-template/<int:template_id>/export-csv/', views.export_bom_csv, name='export_bom_csv'),
+    path('api/bom-templates/export-xlsx/', views.export_bom_templates_xlsx, name='export_bom_templates_xlsx'),
 
     path('<int:station_id>/auto-loop-progress/', views.auto_loop_progress, name='auto_loop_progress'),
     path('<int:station_id>/auto-loop-config/', views.auto_loop_config, name='auto_loop_config'),
@@ -92,6 +97,8 @@ urlpatterns = [
      
      
     path('<int:station_id>/media-with-bom-pagination/', views.get_station_media_with_bom_pagination, name='station_media_with_bom_pagination'),
+    path('<int:station_id>/display-snapshot/', views.display_snapshot, name='display_snapshot'),
+    path('<int:station_id>/display-changes/', views.display_changes, name='display_changes'),
     
     
     
@@ -159,6 +166,7 @@ path('product/<int:product_id>/', views.get_product_data_api, name='get_product_
     # ==============================================
     path('bom-template/<int:template_id>/upload-excel/', views.upload_bom_items_excel, name='upload_bom_items_excel'),
     path('product-media/upload-zip/', views.upload_product_media_zip, name='upload_product_media_zip'),
+    path('jobs/<int:job_id>/', views.import_job_status, name='import_job_status'),
     
     # ==============================================
     # AJAX HELPER ENDPOINTS
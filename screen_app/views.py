@@ -1,21 +1,42 @@
+import asyncio
+import hashlib
 import math
 import time
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from django.shortcuts import render, get_object_or_404
 from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
-from django.conf import settings
+from django.core.exceptions import ValidationError
 import json
 
 from .models import (Station, Product, ProductMedia, AssemblyStage, 
-                    AssemblyProcess, AssemblySession, BillOfMaterial,BOMTemplate, BOMItem, BOMTemplateItem)
+                    AssemblyProcess, AssemblySession, BillOfMaterial,BOMTemplate, BOMItem, BOMTemplateItem,
+                    ImportJob)
+from .events import (publish_station_change, state_versions, station_events, station_state_version,
+                     supervisor_version)
+from .bom_cache import bom_expansion_cache
+from .process_graph import get_process_graph
+from .media_delivery import serve_media_file, serve_cached_media, IMMUTABLE_CACHE_CONTROL
+from .media_store import fingerprint_of
+from .thumbnails import get_thumbnail, thumbnail_content_type, thumbnail_url
+from .search import search_backend, keyset_page
+from .media_import import import_media_zip
+from .bom_import import import_bom_excel
+from .bom_export import all_items_rows, template_rows, stream_csv, stream_xlsx
+from .jobs import enqueue_job
 
 from django.shortcuts import render, get_object_or_404
 from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
-from django.conf import settings
-from django.core.cache import cache
+from .state import shared_state, StateKeys
 
 
 # Bom with pagination 
@@ -23,7 +44,6 @@ from django.core.cache import cache
 
 import math
 import time
-from django.core.cache import cache
 from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
@@ -113,27 +133,34 @@ class BOMPaginationManager:
     """Enhanced pagination state manager with stage change detection - COMPLETE REPLACEMENT"""
     
     CACHE_TIMEOUT = 3600  # 1 hour
+    PAGE_TIMEOUT = 7 * 24 * 3600  # pages of old generations age out after a week
+    CAS_ATTEMPTS = 10
+    
+    @classmethod
+    def get_generation(cls, product_id):
+        """Current pagination generation of a product"""
+        return shared_state.get(StateKeys.pagination_generation(product_id), 0)
     
     @classmethod
     def _get_cache_key(cls, product_id, bom_type):
-        """Generate cache key for pagination state"""
-        return f"bom_pagination_{product_id}_{bom_type}"
+        """Generate the shared state key for pagination state (in the current generation)"""
+        return StateKeys.pagination_page(product_id, bom_type, cls.get_generation(product_id))
     
     @classmethod
     def _get_stage_cache_key(cls, station_id):
-        """Generate cache key for tracking current stage/process"""
-        return f"station_stage_{station_id}"
+        """Generate the shared state key for tracking current stage"""
+        return StateKeys.station_stage(station_id)
     
     @classmethod
     def _get_process_cache_key(cls, station_id):
-        """Generate cache key for tracking current process"""
-        return f"station_process_{station_id}"
+        """Generate the shared state key for tracking current process"""
+        return StateKeys.station_process(station_id)
     
     @classmethod
     def get_current_page(cls, product_id, bom_type):
         """Get current page for a product/bom_type combination"""
         cache_key = cls._get_cache_key(product_id, bom_type)
-        page = cache.get(cache_key, 1)
+        page = shared_state.get(cache_key, 1)
         return page
     
     @classmethod
@@ -141,28 +168,47 @@ class BOMPaginationManager:
         """Set current page for a product/bom_type combination"""
         cache_key = cls._get_cache_key(product_id, bom_type)
         page = max(1, page)  # Ensure page is at least 1
-        cache.set(cache_key, page, cls.CACHE_TIMEOUT)
+        shared_state.set(cache_key, page, cls.PAGE_TIMEOUT)
+    
+    @classmethod
+    def move_page(cls, product_id, bom_type, transition):
+        """
+        Atomically move the shared page: new_page = transition(current_page).
+
+        Uses compare-and-set, so two displays paging at the same moment never
+        overwrite each other. Returns (old_page, new_page).
+        """
+        cache_key = cls._get_cache_key(product_id, bom_type)
+        for attempt in range(cls.CAS_ATTEMPTS):
+            stored = shared_state.get(cache_key)
+            current_page = stored if stored is not None else 1
+            new_page = max(1, transition(current_page))
+            if stored is not None and new_page == stored:
+                return current_page, new_page
+            if shared_state.compare_and_set(cache_key, stored, new_page, cls.PAGE_TIMEOUT):
+                return current_page, new_page
+        raise RuntimeError(f"Pagination state for product {product_id} kept changing, giving up")
     
     @classmethod
     def reset_pagination(cls, product_id, bom_type):
         """Reset pagination to page 1 for a product/bom_type combination"""
         cache_key = cls._get_cache_key(product_id, bom_type)
-        cache.set(cache_key, 1, cls.CACHE_TIMEOUT)
+        shared_state.set(cache_key, 1, cls.PAGE_TIMEOUT)
     
     @classmethod
-    def clear_product_pagination(cls, product_id):
-        """Clear all pagination state for a product"""
-        bom_types = [
-            'SINGLE_UNIT', 'BATCH_50', 'SUB_ASSEMBLY_1', 'SUB_ASSEMBLY_2', 
-            'SUB_ASSEMBLY_3', 'SUB_ASSEMBLY_4', 'SUB_ASSEMBLY_5', 'SUB_ASSEMBLY_6', 
-            'FINAL_ASSEMBLY', 'BOM_DISPLAY'
-        ]
-        cleared_count = 0
-        for bom_type in bom_types:
-            cache_key = cls._get_cache_key(product_id, bom_type)
-            if cache.delete(cache_key):
-                cleared_count += 1
-        print(f"DEBUG PAGINATION MANAGER: Cleared {cleared_count} pagination states for product {product_id}")
+    def clear_product_pagination(cls, product_id, publish=True):
+        """
+        Clear all pagination state for a product.
+
+        One atomic increment of the product's generation moves every BOM type
+        (including types added later) onto fresh keys that start at page 1;
+        the old keys simply expire. Callers that publish their own change for
+        the product (e.g. a process move) pass publish=False.
+        """
+        generation = shared_state.incr(StateKeys.pagination_generation(product_id))
+        if publish:
+            publish_station_change('bom_page', product_id=product_id, reset=True)
+        logger.debug("Cleared pagination states for product %s (generation %s)", product_id, generation)
     
     @classmethod
     def check_and_reset_on_stage_change(cls, station):
@@ -176,8 +222,8 @@ class BOMPaginationManager:
         current_process_name = current_process.name if current_process else 'None'
         
         # Get cached values
-        cached_stage = cache.get(cls._get_stage_cache_key(station_id))
-        cached_process = cache.get(cls._get_process_cache_key(station_id))
+        cached_stage = shared_state.get(cls._get_stage_cache_key(station_id))
+        cached_process = shared_state.get(cls._get_process_cache_key(station_id))
         
         stage_changed = cached_stage is not None and cached_stage != current_stage
         process_changed = cached_process is not None and cached_process != current_process_name
@@ -189,16 +235,16 @@ class BOMPaginationManager:
                 cls.clear_product_pagination(station.current_product.id)
             
             # Update cached values
-            cache.set(cls._get_stage_cache_key(station_id), current_stage, cls.CACHE_TIMEOUT)
-            cache.set(cls._get_process_cache_key(station_id), current_process_name, cls.CACHE_TIMEOUT)
+            shared_state.set(cls._get_stage_cache_key(station_id), current_stage, cls.CACHE_TIMEOUT)
+            shared_state.set(cls._get_process_cache_key(station_id), current_process_name, cls.CACHE_TIMEOUT)
             
             return True  # Indicates pagination was reset
         else:
             # Update cached values for first-time tracking
             if cached_stage is None:
-                cache.set(cls._get_stage_cache_key(station_id), current_stage, cls.CACHE_TIMEOUT)
+                shared_state.set(cls._get_stage_cache_key(station_id), current_stage, cls.CACHE_TIMEOUT)
             if cached_process is None:
-                cache.set(cls._get_process_cache_key(station_id), current_process_name, cls.CACHE_TIMEOUT)
+                shared_state.set(cls._get_process_cache_key(station_id), current_process_name, cls.CACHE_TIMEOUT)
             
             return False  # No reset needed
     
@@ -214,19 +260,20 @@ class BOMPaginationManager:
         current_process = getattr(station, 'current_process', None)
         current_process_name = current_process.name if current_process else 'None'
         
-        cache.set(cls._get_stage_cache_key(station.id), current_stage, cls.CACHE_TIMEOUT)
-        cache.set(cls._get_process_cache_key(station.id), current_process_name, cls.CACHE_TIMEOUT)
+        shared_state.set(cls._get_stage_cache_key(station.id), current_stage, cls.CACHE_TIMEOUT)
+        shared_state.set(cls._get_process_cache_key(station.id), current_process_name, cls.CACHE_TIMEOUT)
     
     @classmethod
     def get_pagination_status(cls, product_id, bom_type):
         """Get detailed pagination status for debugging"""
         cache_key = cls._get_cache_key(product_id, bom_type)
-        current_page = cache.get(cache_key, 1)
+        current_page = shared_state.get(cache_key, 1)
         
         return {
             'cache_key': cache_key,
+            'generation': cls.get_generation(product_id),
             'current_page': current_page,
-            'cache_exists': cache.get(cache_key) is not None
+            'cache_exists': shared_state.get(cache_key) is not None
         }
     
     @classmethod
@@ -292,14 +339,12 @@ def debug_process_change(request, station_id):
         ]
     }
     
-    # Get cache state
-    from django.core.cache import cache
+    # Get shared pagination state
     cache_states = {}
     if station.current_product:
-        bom_types = ['SINGLE_UNIT', 'BATCH_50', 'SUB_ASSEMBLY_1', 'SUB_ASSEMBLY_2', 'FINAL_ASSEMBLY', 'BOM_DISPLAY']
-        for bom_type in bom_types:
-            cache_key = f"bom_pagination_{station.current_product.id}_{bom_type}"
-            cache_value = cache.get(cache_key, 'NOT_SET')
+        for bom_type, _ in BOMTemplate.BOM_TYPE_CHOICES:
+            cache_key = BOMPaginationManager._get_cache_key(station.current_product.id, bom_type)
+            cache_value = shared_state.get(cache_key, 'NOT_SET')
             cache_states[bom_type] = cache_value
     
     # Test what different processes would show
@@ -504,7 +549,7 @@ def serialize_bom_item(item_data):
         'calculated_quantity': item_data['calculated_quantity'],
         'formatted_quantity': item_data['formatted_quantity'],
         'notes': item_data['notes'],
-        'item_photo_url': item_data['item'].item_photo.url if item_data['item'].item_photo else None,
+        'item_photo_url': thumbnail_url(item_data['item'].item_photo, 'sm'),
         'supplier': item_data['item'].supplier,
         'cost_per_unit': float(item_data['item'].cost_per_unit) if item_data['item'].cost_per_unit else None,
     }
@@ -568,27 +613,23 @@ def get_station_bom_data_paginated(request, station_id):
         bom_type = bom_template.bom_type
         is_stage_specific = not bom_template.should_split_across_displays()
 
-    # ⭐ CRITICAL FIX: Use SHARED product-level cache key (same as pagination control)
-    cache_key_base = f"bom_pagination_product_{station.current_product.id}_type_{bom_type}"
+    # ⭐ CRITICAL FIX: Use SHARED product-level state key (same as pagination control)
+    cache_key_base = BOMPaginationManager._get_cache_key(station.current_product.id, bom_type)
     
-    # If no page specified in URL, get current page from cache
+    # If no page specified in URL, get current page from shared state
     if not page_param:
-        page = cache.get(cache_key_base, 1)
+        page = BOMPaginationManager.get_current_page(station.current_product.id, bom_type)
         print(f"DEBUG BOM DATA: No page in URL, using cache page {page} for product {station.current_product.id}, type {bom_type}")
     else:
         print(f"DEBUG BOM DATA: Using page {page} from URL parameter")
     
-    # If we have a template, generate BOM data from it
+    # If we have a template, expand it once and take this display's page from the layout
+    bom_layout = None
     if bom_template:
-        full_bom = bom_template.generate_bom_for_quantity(quantity)
+        bom_layout = bom_template.plan_pages(quantity=quantity, items_per_screen=items_per_screen)
         
         # Get items for this specific display and page
-        bom_data = bom_template.get_items_for_display(
-            display_number=station.display_number,
-            quantity=quantity,
-            page=page,
-            items_per_screen=items_per_screen
-        )
+        bom_data = bom_layout.items_for_display(station.display_number, page=page)
         
         print(f"DEBUG BOM DATA: Got {len(bom_data)} items for display {station.display_number}, page {page}")
 
@@ -633,8 +674,8 @@ def get_station_bom_data_paginated(request, station_id):
         })
 
     # Calculate pagination info
-    if bom_template:
-        template_pagination_info = bom_template.get_pagination_info_for_split(quantity=quantity, items_per_screen=items_per_screen)
+    if bom_layout:
+        template_pagination_info = bom_layout.pagination_info()
         
         if is_stage_specific and station.display_number != 1:
             # Only Display 1 shows data in stage-specific mode
@@ -716,10 +757,14 @@ def get_station_bom_data_paginated(request, station_id):
 def get_station_media_with_bom_pagination(request, station_id):
     """Get media for a specific station - FIXED TO USE SHARED CACHE KEY"""
     station = get_object_or_404(Station, pk=station_id)
-    
+    return JsonResponse(_media_with_bom_pagination_data(station, request.GET))
+
+
+def _media_with_bom_pagination_data(station, params):
+    """Media list (BOM page first), station info and pagination of a display, as a dict"""
     # Validate pagination parameters
     try:
-        mode = request.GET.get('mode', 'split')
+        mode = params.get('mode', 'split')
         if mode not in ['split', 'single']:
             mode = 'split'
     except:
@@ -728,7 +773,7 @@ def get_station_media_with_bom_pagination(request, station_id):
     # ⭐ CRITICAL FIX: Get current page using SHARED cache key
     try:
         # Check if page is explicitly provided in request
-        page_param = request.GET.get('page')
+        page_param = params.get('page')
         if page_param:
             current_page = int(page_param)
             if current_page < 1:
@@ -766,9 +811,9 @@ def get_station_media_with_bom_pagination(request, station_id):
                     if bom_template:
                         bom_type_key = bom_template.bom_type
                         
-                        # ⭐ CRITICAL FIX: Use SHARED product-level cache key
-                        cache_key_base = f"bom_pagination_product_{station.current_product.id}_type_{bom_type_key}"
-                        current_page = cache.get(cache_key_base, 1)
+                        # ⭐ CRITICAL FIX: Use SHARED product-level state key
+                        cache_key_base = BOMPaginationManager._get_cache_key(station.current_product.id, bom_type_key)
+                        current_page = BOMPaginationManager.get_current_page(station.current_product.id, bom_type_key)
                         
                         print(f"DEBUG MEDIA VIEW: Display {station.display_number}, Cache key: {cache_key_base}, Current page: {current_page}")
                     else:
@@ -781,7 +826,7 @@ def get_station_media_with_bom_pagination(request, station_id):
         current_page = 1
     
     try:
-        items_per_screen_param = request.GET.get('items_per_screen', '8')
+        items_per_screen_param = params.get('items_per_screen', '8')
         if items_per_screen_param in ['undefined', 'null', '', None]:
             items_per_screen = 8
         else:
@@ -851,7 +896,7 @@ def get_station_media_with_bom_pagination(request, station_id):
                 'has_previous': False
             }
             
-            return JsonResponse({
+            return {
                 'media': [],
                 'station_info': {
                     'name': station.name,
@@ -888,7 +933,7 @@ def get_station_media_with_bom_pagination(request, station_id):
                     'display_number': station.display_number,
                     'reason': 'BOM template disabled for this display'
                 }
-            })
+            }
             
         elif not display_bom_data or len(display_bom_data) == 0:
             if bom_template:
@@ -920,7 +965,7 @@ def get_station_media_with_bom_pagination(request, station_id):
                     'has_previous': False
                 }
             
-            return JsonResponse({
+            return {
                 'media': [],
                 'station_info': {
                     'name': station.name,
@@ -957,7 +1002,7 @@ def get_station_media_with_bom_pagination(request, station_id):
                     'display_number': station.display_number,
                     'reason': 'No BOM data for this display in splitting stage'
                 }
-            })
+            }
         else:
             print(f"DEBUG MEDIA VIEW: Display {station.display_number} - Splitting BOM stage with {len(display_bom_data)} items")
     
@@ -967,12 +1012,14 @@ def get_station_media_with_bom_pagination(request, station_id):
         for media in current_media:
             media_info = {
                 'id': media.id,
-                'url': media.file.url,
+                'url': media.cached_url,
                 'type': media.file.name.split('.')[-1].lower(),
                 'duration': media.duration,
                 'media_type': media.get_media_type_display(),
                 'product_name': media.product.name,
                 'product_code': media.product.code,
+                'page_count': media.page_count,
+                'page_images': media.get_page_images(),
             }
             
             if media.process:
@@ -1086,7 +1133,7 @@ def get_station_media_with_bom_pagination(request, station_id):
                     'unit_of_measure': item_data['item'].unit_of_measure,
                     'supplier': item_data['item'].supplier,
                     'cost_per_unit': float(item_data['item'].cost_per_unit) if item_data['item'].cost_per_unit else None,
-                    'item_photo_url': item_data['item'].item_photo.url if item_data['item'].item_photo else None,
+                    'item_photo_url': thumbnail_url(item_data['item'].item_photo, 'sm'),
                 },
                 'base_quantity': item_data['base_quantity'],
                 'calculated_quantity': item_data['calculated_quantity'],
@@ -1128,7 +1175,7 @@ def get_station_media_with_bom_pagination(request, station_id):
                 'has_previous': False
             }
     
-    return JsonResponse({
+    return {
         'media': media_data,
         'station_info': {
             'name': station.name,
@@ -1167,7 +1214,228 @@ def get_station_media_with_bom_pagination(request, station_id):
             'bom_template_found': bom_template is not None,
             'bom_template_type': bom_template.bom_type if bom_template else None
         }
-    })
+    }
+
+
+# ===== DISPLAY SNAPSHOT =====
+
+def _process_summary(process):
+    return {
+        'id': process.id,
+        'name': process.name,
+        'display_name': process.display_name
+    } if process else None
+
+
+def _display_snapshot_etag(station_id, product_id, params):
+    """ETag of a display snapshot - built from shared state only, no ORM queries"""
+    key = json.dumps([
+        station_id,
+        product_id,
+        state_versions(station_id, product_id),
+        params.get('mode', 'split'),
+        params.get('items_per_screen', '8'),
+        params.get('display_number'),
+        params.get('page'),
+    ])
+    return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+
+@require_http_methods(["GET"])
+def display_snapshot(request, station_id):
+    """
+    One-shot state of a display for the slider's poll tick.
+
+    Replaces the media-with-bom-pagination / check-reload-signal /
+    check-bom-sync fan-out: media, the current BOM page and pagination,
+    station info, process navigation and the one-shot reload and sync
+    signals come back in a single response. Its ETag is built from the shared
+    state versions, so a poll with a matching If-None-Match is answered 304
+    without touching the database.
+    """
+    product_id = shared_state.get(StateKeys.station_product(station_id))
+    if product_id is not None:
+        etag = _display_snapshot_etag(station_id, product_id, request.GET)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+    station = get_object_or_404(Station, pk=station_id)
+    product_id = _remember_station_product(station)
+    # Versions are read before building, so a change made meanwhile is never hidden behind this ETag
+    etag = _display_snapshot_etag(station.id, product_id, request.GET)
+
+    response = JsonResponse(_display_snapshot_data(station, request.GET))
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _remember_station_product(station):
+    """Record the station's product for the ORM-free version checks; returns it (0 = none)"""
+    product_id = station.current_product_id or 0
+    shared_state.set(StateKeys.station_product(station.id), product_id)
+    return product_id
+
+
+def _display_snapshot_data(station, params):
+    """Snapshot payload; pops the display's one-shot reload and sync signals"""
+    data = _media_with_bom_pagination_data(station, params)
+    display_number = params.get('display_number') or station.display_number
+    data['navigation'] = {
+        'next_process': _process_summary(station.get_next_process()),
+        'previous_process': _process_summary(station.get_previous_process()),
+    }
+    data['reload'] = shared_state.pop(StateKeys.reload_signal(display_number))
+    data['sync'] = shared_state.pop(StateKeys.bom_sync(station.id, display_number)) if str(display_number) != '1' else None
+    data['timestamp'] = time.time()
+    return data
+
+
+# ===== DISPLAY CHANGE FEED (LONG-POLL) =====
+
+# Seconds a long-poll is held open when nothing changes
+LONG_POLL_TIMEOUT_SECONDS = 25
+# Changes made in other worker processes never reach this process's event bus,
+# so a held request also re-reads the shared version this often
+LONG_POLL_RECHECK_SECONDS = 1
+# Seconds the section digests of a delivered snapshot are kept for computing deltas
+SNAPSHOT_DIGEST_TIMEOUT = 600
+
+DISPLAY_SNAPSHOT_SECTIONS = ('media', 'station_info', 'pagination_info', 'navigation')
+
+
+def _display_product_id(station_id):
+    product_id = shared_state.get(StateKeys.station_product(station_id))
+    if product_id is None:
+        product_id = Station.objects.filter(pk=station_id).values_list('current_product_id', flat=True).first() or 0
+    return product_id
+
+
+def _display_version_now(station_id):
+    """(product id, feed version) of a display; the version is None for a missing station"""
+    product_id = _display_product_id(station_id)
+    try:
+        return product_id, station_state_version(station_id)
+    except Station.DoesNotExist:
+        return product_id, None
+
+
+def _long_poll_params(request):
+    """(since or None, timeout) of a display-changes request"""
+    try:
+        since = int(request.GET['since'])
+    except (KeyError, ValueError):
+        since = None
+    try:
+        timeout = min(max(float(request.GET.get('timeout', LONG_POLL_TIMEOUT_SECONDS)), 0), LONG_POLL_TIMEOUT_SECONDS)
+    except ValueError:
+        timeout = LONG_POLL_TIMEOUT_SECONDS
+    return since, timeout
+
+
+def _wait_for_display_change(station_id, since, timeout):
+    """Block until the display's version moves on from since (or timeout); returns the version"""
+    deadline = time.monotonic() + timeout
+    last_seq = station_events.last_seq
+    while True:
+        product_id, version = _display_version_now(station_id)
+        remaining = deadline - time.monotonic()
+        if since is None or version != since or remaining <= 0:
+            return version
+        last_seq, _ = station_events.wait(
+            last_seq, station_id=station_id, product_id=product_id,
+            timeout=min(remaining, LONG_POLL_RECHECK_SECONDS)
+        )
+
+
+async def _wait_for_display_change_async(station_id, since, timeout):
+    """_wait_for_display_change for ASGI - suspends instead of holding a thread"""
+    version_now = sync_to_async(_display_version_now)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    last_seq = station_events.last_seq
+    while True:
+        product_id, version = await version_now(station_id)
+        remaining = deadline - loop.time()
+        if since is None or version != since or remaining <= 0:
+            return version
+        last_seq, _ = await station_events.wait_async(
+            last_seq, station_id=station_id, product_id=product_id,
+            timeout=min(remaining, LONG_POLL_RECHECK_SECONDS)
+        )
+
+
+def _display_changes_data(station_id, since, params):
+    """
+    Delta of a display since the snapshot it was sent at version since.
+
+    The section digests of every delivered snapshot are kept in shared state
+    by version, so only sections whose digest moved are sent. A client whose
+    version is unknown (first call, expired digests) gets the full snapshot.
+    """
+    station = get_object_or_404(Station, pk=station_id)
+    _remember_station_product(station)
+    version = station_state_version(station.id)
+    if version == since:
+        return {'version': version, 'changed': False, 'full': False, 'sections': {}, 'timestamp': time.time()}
+
+    data = _display_snapshot_data(station, params)
+    digests = {
+        section: hashlib.md5(json.dumps(data.get(section), sort_keys=True, default=str).encode()).hexdigest()
+        for section in DISPLAY_SNAPSHOT_SECTIONS
+    }
+    variant = hashlib.md5(json.dumps([
+        params.get('mode', 'split'), params.get('items_per_screen', '8'), params.get('display_number')
+    ]).encode()).hexdigest()[:12]
+    shared_state.set(StateKeys.snapshot_digests(station.id, variant, version), digests, SNAPSHOT_DIGEST_TIMEOUT)
+
+    previous = shared_state.get(StateKeys.snapshot_digests(station.id, variant, since)) if since is not None else None
+    if previous is None:
+        sections = {section: data.get(section) for section in DISPLAY_SNAPSHOT_SECTIONS}
+    else:
+        sections = {
+            section: data.get(section) for section in DISPLAY_SNAPSHOT_SECTIONS
+            if previous.get(section) != digests[section]
+        }
+    # One-shot signals are only ever in the response that popped them
+    for signal in ('reload', 'sync'):
+        if data.get(signal):
+            sections[signal] = data[signal]
+
+    return {
+        'version': version,
+        'changed': bool(sections),
+        'full': previous is None,
+        'sections': sections,
+        'timestamp': data['timestamp'],
+    }
+
+
+@require_http_methods(["GET"])
+async def display_changes(request, station_id):
+    """
+    Long-poll change feed for displays that cannot hold an SSE connection.
+
+    GET ?since=<version> is held until the display's version (see
+    events.station_state_version) moves on from since, or for up to `timeout`
+    seconds, and then returns only the snapshot sections that changed, plus
+    the new version to pass as since on the next call. Without since the
+    full snapshot is returned at once.
+
+    On ASGI servers the held poll suspends on the event loop; on WSGI it
+    blocks the request's own worker thread, as a sync view would.
+    """
+    since, timeout = _long_poll_params(request)
+    if isinstance(request, ASGIRequest):
+        await _wait_for_display_change_async(station_id, since, timeout)
+    else:
+        await sync_to_async(_wait_for_display_change)(station_id, since, timeout)
+    data = await sync_to_async(_display_changes_data)(station_id, since, request.GET)
+    response = JsonResponse(data)
+    response['Cache-Control'] = 'no-cache'
+    return response
    
    
    
@@ -1265,72 +1533,67 @@ def bom_pagination_control(request, station_id):
                 'total_pages': 1
             }, status=400)
         
-        # Get pagination info from template
-        template_pagination_info = bom_template.get_pagination_info_for_split(quantity=quantity, items_per_screen=8)
+        # Expand the BOM once - pagination info and page items both come from the layout
+        bom_layout = bom_template.plan_pages(quantity=quantity, items_per_screen=8)
+        template_pagination_info = bom_layout.pagination_info()
         total_pages = template_pagination_info['total_pages']
         total_items = template_pagination_info['total_items']
         
-        # ⭐ CRITICAL FIX: Use PRODUCT-level cache key, not station-specific
+        # ⭐ CRITICAL FIX: Use PRODUCT-level state key, not station-specific
         # This ensures ALL displays share the same pagination state
-        cache_key_base = f"bom_pagination_product_{station.current_product.id}_type_{bom_type_key}"
-        
-        # Get current page from cache
-        current_page = cache.get(cache_key_base, 1)
-        
-        print(f"DEBUG PAGINATION: Station {station_id}, Display {station.display_number}, Current page from cache: {current_page}, Total pages: {total_pages}")
+        cache_key_base = BOMPaginationManager._get_cache_key(station.current_product.id, bom_type_key)
         
         # ⭐ CRITICAL FIX: Handle pagination actions WITHOUT wrap-around
         if action == 'next_page':
             # Don't wrap - if at last page, stay at last page
-            if current_page < total_pages:
-                new_page = current_page + 1
-            else:
-                new_page = total_pages  # Stay at last page
-                print(f"DEBUG PAGINATION: Already at last page ({total_pages}), staying there")
+            transition = lambda page: min(page + 1, total_pages)
                 
         elif action == 'previous_page':
             # Don't wrap - if at first page, stay at first page
-            if current_page > 1:
-                new_page = current_page - 1
-            else:
-                new_page = 1  # Stay at first page
-                print(f"DEBUG PAGINATION: Already at first page (1), staying there")
+            transition = lambda page: max(page - 1, 1)
                 
         elif action == 'set_page':
             try:
                 target_page = int(data.get('page', 1))
                 # Clamp to valid range
-                new_page = max(1, min(target_page, total_pages))
-                print(f"DEBUG PAGINATION: Set page to {new_page} (requested: {target_page}, max: {total_pages})")
+                target_page = max(1, min(target_page, total_pages))
             except (ValueError, TypeError):
-                new_page = 1
+                target_page = 1
                 print(f"DEBUG PAGINATION: Invalid page number, defaulting to 1")
+            transition = lambda page: target_page
                 
         elif action == 'first_page':
-            new_page = 1
+            transition = lambda page: 1
             
         elif action == 'last_page':
-            new_page = total_pages
+            transition = lambda page: total_pages
             
         else:
             return JsonResponse({'error': 'Invalid action'}, status=400)
         
-        # ⭐ CRITICAL FIX: Update pagination state with SHARED cache key
-        cache.set(cache_key_base, new_page, timeout=None)  # No timeout - persist until changed
+        # ⭐ CRITICAL FIX: Update the SHARED page with compare-and-set so that
+        # concurrent presses on different displays/workers never lose a step
+        current_page, new_page = BOMPaginationManager.move_page(
+            station.current_product.id, bom_type_key, transition
+        )
+        
+        # Verify state update
+        verify_page = shared_state.get(cache_key_base)
         
-        # Verify cache update
-        verify_page = cache.get(cache_key_base)
+        print(f"DEBUG PAGINATION: Station {station_id}, Display {station.display_number}, Total pages: {total_pages}")
+        print(f"DEBUG PAGINATION: Updated shared page from {current_page} to {new_page}, verified: {verify_page}")
         
-        print(f"DEBUG PAGINATION: Updated cache from {current_page} to {new_page}, verified: {verify_page}")
+        if new_page != current_page:
+            publish_station_change(
+                'bom_page',
+                product_id=station.current_product.id,
+                bom_type=bom_type_key,
+                page=new_page
+            )
         
-        # Get the updated BOM data directly from template
+        # Get the updated BOM data directly from the layout
         try:
-            updated_bom_data = bom_template.get_items_for_display(
-                display_number=station.display_number,
-                quantity=quantity,
-                page=new_page,
-                items_per_screen=8
-            )
+            updated_bom_data = bom_layout.items_for_display(station.display_number, page=new_page)
             
             # Debug: Show which items we got
             if updated_bom_data:
@@ -1359,7 +1622,7 @@ def bom_pagination_control(request, station_id):
                             'unit_of_measure': getattr(item_obj, 'unit_of_measure', ''),
                             'supplier': getattr(item_obj, 'supplier', ''),
                             'cost_per_unit': float(item_obj.cost_per_unit) if hasattr(item_obj, 'cost_per_unit') and item_obj.cost_per_unit else None,
-                            'item_photo_url': item_obj.item_photo.url if hasattr(item_obj, 'item_photo') and item_obj.item_photo else None,
+                            'item_photo_url': thumbnail_url(getattr(item_obj, 'item_photo', None), 'sm'),
                         },
                         'base_quantity': item_data.get('base_quantity', 1),
                         'calculated_quantity': item_data.get('calculated_quantity', 1),
@@ -1474,8 +1737,10 @@ def render_bom_fragment_paginated(request, station_id):
     except (ValueError, TypeError):
         items_per_screen = 8
     
+    # Without an explicit page the fragment follows the shared product page
+    page_param = request.GET.get('page')
     try:
-        current_page = int(request.GET.get('page', '1'))
+        current_page = int(page_param or '1')
         if current_page < 1:
             current_page = 1
     except (ValueError, TypeError):
@@ -1521,9 +1786,6 @@ def render_bom_fragment_paginated(request, station_id):
         BOMPaginationManager.force_reset_station_pagination(station)
         current_page = 1
     
-    # USING MEDIA VIEW LOGIC: Get BOM data from station method with current page
-    display_bom_data = station.get_current_bom_data(page=current_page) or []
-    
     
     # USING MEDIA VIEW LOGIC: Find BOM template using same logic as media view
     bom_template = None
@@ -1584,8 +1846,17 @@ def render_bom_fragment_paginated(request, station_id):
         except Exception as e:
             print(f"DEBUG RENDER FRAGMENT: Error finding BOM template: {e}")
     
-    # Update pagination cache with current page for this BOM type
-    BOMPaginationManager.set_current_page(station.current_product.id, bom_type_key, current_page)
+    # Expand the template once; every pagination branch below reads this layout
+    bom_layout = bom_template.plan_pages(quantity=quantity, items_per_screen=8) if bom_template else None
+    
+    # Explicit page requests move the shared page; otherwise follow it
+    if page_param is not None:
+        BOMPaginationManager.set_current_page(station.current_product.id, bom_type_key, current_page)
+    elif not (pagination_was_reset or should_reset_pagination):
+        current_page = BOMPaginationManager.get_current_page(station.current_product.id, bom_type_key)
+    
+    # USING MEDIA VIEW LOGIC: Get BOM data from station method with current page
+    display_bom_data = station.get_current_bom_data(page=current_page) or []
     
     # USING MEDIA VIEW LOGIC: Handle splitting BOM stages where this display shouldn't show BOM
     if is_splitting_bom_stage and not should_show_on_this_display:
@@ -1627,10 +1898,7 @@ def render_bom_fragment_paginated(request, station_id):
         
         # Get pagination info for consistency
         if bom_template:
-            template_pagination_info = bom_template.get_pagination_info_for_split(
-                quantity=quantity, 
-                items_per_screen=8
-            )
+            template_pagination_info = bom_layout.pagination_info()
             pagination_info = {
                 'current_page': current_page,
                 'total_pages': template_pagination_info['total_pages'],
@@ -1696,10 +1964,7 @@ def render_bom_fragment_paginated(request, station_id):
     if bom_template and is_stage_specific:
         # Stage-specific BOMs: Pagination on Display 1 only (8 items per page)
         if station.display_number == 1:
-            template_pagination_info = bom_template.get_pagination_info_for_split(
-                quantity=quantity, 
-                items_per_screen=8
-            )
+            template_pagination_info = bom_layout.pagination_info()
             pagination_info = {
                 'current_page': current_page,
                 'total_pages': template_pagination_info['total_pages'],
@@ -1726,10 +1991,7 @@ def render_bom_fragment_paginated(request, station_id):
             }
     elif bom_template:
         # Splitting BOMs: 8 items per display, multiple displays per page
-        template_pagination_info = bom_template.get_pagination_info_for_split(
-            quantity=quantity, 
-            items_per_screen=8
-        )
+        template_pagination_info = bom_layout.pagination_info()
         pagination_info = {
             'current_page': current_page,
             'total_pages': template_pagination_info['total_pages'],
@@ -1853,7 +2115,7 @@ def get_station_bom_data(request, station_id):
             'calculated_quantity': item_data['calculated_quantity'],
             'formatted_quantity': item_data['formatted_quantity'],
             'notes': item_data['notes'],
-            'item_photo_url': item_data['item'].item_photo.url if item_data['item'].item_photo else None,
+            'item_photo_url': thumbnail_url(item_data['item'].item_photo, 'sm'),
             'supplier': item_data['item'].supplier,
             'cost_per_unit': float(item_data['item'].cost_per_unit) if item_data['item'].cost_per_unit else None,
         }
@@ -2090,7 +2352,7 @@ def preview_bom_template(request, template_id):
             'cost_per_unit': float(item_data['item'].cost_per_unit) if item_data['item'].cost_per_unit else None,
             'line_cost': float(item_cost),
             'supplier': item_data['item'].supplier,
-            'item_photo_url': item_data['item'].item_photo.url if item_data['item'].item_photo else None,
+            'item_photo_url': thumbnail_url(item_data['item'].item_photo, 'sm'),
         }
         formatted_bom.append(item_info)
     
@@ -2122,16 +2384,13 @@ def get_bom_items(request):
     """Get all BOM items with search and filtering"""
     items = BOMItem.objects.filter(is_active=True)
     
-    # Search functionality
+    # Search functionality - indexed prefix search ranked by relevance (see search.py)
     search = request.GET.get('search', '').strip()
     if search:
-        items = items.filter(
-            item_description__icontains=search
-        ) | items.filter(
-            item_code__icontains=search
-        ) | items.filter(
-            part_number__icontains=search
-        )
+        items = search_backend.search(items, search)
+        ordering = [search_backend.rank_field, 'id']
+    else:
+        ordering = ['item_description', 'id']
     
     # Filter by unit
     unit_filter = request.GET.get('unit')
@@ -2143,14 +2402,10 @@ def get_bom_items(request):
     if supplier_filter:
         items = items.filter(supplier__icontains=supplier_filter)
     
-    # Pagination
-    page = int(request.GET.get('page', 1))
-    per_page = int(request.GET.get('per_page', 50))
-    start = (page - 1) * per_page
-    end = start + per_page
-    
-    total_count = items.count()
-    items_page = items[start:end]
+    # Keyset pagination: pass back next_cursor as ?cursor= for the next page
+    per_page = max(1, min(int(request.GET.get('per_page', 50)), 500))
+    cursor = request.GET.get('cursor')
+    items_page, next_cursor = keyset_page(items, ordering, cursor, per_page)
     
     items_data = []
     for item in items_page:
@@ -2163,7 +2418,8 @@ def get_bom_items(request):
             'supplier': item.supplier,
             'cost_per_unit': float(item.cost_per_unit) if item.cost_per_unit else None,
             'weight_per_unit': float(item.weight_per_unit) if item.weight_per_unit else None,
-            'item_photo_url': item.item_photo.url if item.item_photo else None,
+            'item_photo_url': thumbnail_url(item.item_photo, 'sm'),
+            'item_photo_medium_url': thumbnail_url(item.item_photo, 'md'),
             'created_date': item.created_date.isoformat(),
             'is_active': item.is_active,
         }
@@ -2172,12 +2428,10 @@ def get_bom_items(request):
     return JsonResponse({
         'items': items_data,
         'pagination': {
-            'page': page,
             'per_page': per_page,
-            'total_count': total_count,
-            'total_pages': (total_count + per_page - 1) // per_page,
-            'has_next': end < total_count,
-            'has_prev': page > 1,
+            'cursor': cursor,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None,
         },
         'filters': {
             'search': search,
@@ -2201,12 +2455,14 @@ def get_station_media(request, station_id):
     for media in current_media:
         media_info = {
             'id': media.id,
-            'url': media.file.url,
+            'url': media.cached_url,
             'type': media.file.name.split('.')[-1].lower(),
             'duration': media.duration,
             'media_type': media.get_media_type_display(),
             'product_name': media.product.name,
             'product_code': media.product.code,
+            'page_count': media.page_count,
+            'page_images': media.get_page_images(),
         }
         
         # Add process info if available
@@ -2286,138 +2542,219 @@ def station_media_slider(request, station_id):
 
 
 
-def station_media_stream(request, station_id):
-    """Real-time streaming for BRG assembly workflow"""
-    def event_stream():
-        last_update = None
-        while True:
-            try:
-                station = get_object_or_404(Station, pk=station_id)
-                current_media = station.get_current_media()
-                
-                # Create comprehensive comparison data
-                media_comparison = []
-                for media in current_media:
-                    comparison_item = {
-                        'id': media.id,
-                        'file_url': media.file.url,
-                        'media_type': media.media_type,
-                        'process_id': media.process.id if media.process else None,
-                        'bom_id': media.bom.id if media.bom else None
-                    }
-                    media_comparison.append(comparison_item)
-                
-                # Include assembly state in comparison
-                assembly_state = {
-                    'current_product_id': station.current_product.id if station.current_product else None,
-                    'current_stage_id': station.current_stage.id if station.current_stage else None,
-                    'current_process_id': station.current_process.id if station.current_process else None,
-                    'product_quantity': station.product_quantity,
-                    'loop_mode': station.loop_mode,
-                    'display_number': station.display_number,
-                }
-                
-                current_state = {
-                    'media': media_comparison,
-                    'assembly': assembly_state
-                }
-                
-                # Only send update if something changed
-                if current_state != last_update:
-                    # Prepare detailed media data for frontend
-                    media_data = []
-                    for media in current_media:
-                        media_info = {
-                            'id': media.id,
-                            'url': media.file.url,
-                            'type': media.file.name.split('.')[-1].lower(),
-                            'duration': media.duration,
-                            'media_type': media.get_media_type_display(),
-                            'product_name': media.product.name,
-                            'product_code': media.product.code,
-                        }
-                        
-                        if media.process:
-                            media_info['process'] = {
-                                'id': media.process.id,
-                                'name': media.process.name,
-                                'display_name': media.process.display_name,
-                                'stage': media.process.stage.display_name,
-                                'order': media.process.order,
-                                'is_looped': media.process.is_looped,
-                                'loop_group': media.process.loop_group
-                            }
-                        
-                        if media.bom:
-                            media_info['bom'] = {
-                                'id': media.bom.id,
-                                'type': media.bom.get_bom_type_display(),
-                                'stage': media.bom.stage.display_name if media.bom.stage else None
-                            }
-                        
-                        media_data.append(media_info)
-                    
-                    # Prepare assembly info
-                    assembly_info = {
-                        'current_product': {
-                            'id': station.current_product.id,
-                            'code': station.current_product.code,
-                            'name': station.current_product.name
-                        } if station.current_product else None,
-                        'current_stage': {
-                            'id': station.current_stage.id,
-                            'name': station.current_stage.display_name,
-                            'order': station.current_stage.order
-                        } if station.current_stage else None,
-                        'current_process': {
-                            'id': station.current_process.id,
-                            'name': station.current_process.name,
-                            'display_name': station.current_process.display_name,
-                            'order': station.current_process.order,
-                            'is_looped': station.current_process.is_looped,
-                            'loop_group': station.current_process.loop_group
-                        } if station.current_process else None,
-                        'quantity': station.product_quantity,
-                        'loop_mode': station.loop_mode,
-                        'clicker_enabled': station.clicker_enabled,
-                        'display_number': station.display_number,
-                        'next_process': {
-                            'id': station.get_next_process().id,
-                            'name': station.get_next_process().name,
-                            'display_name': station.get_next_process().display_name
-                        } if station.get_next_process() else None,
-                        'previous_process': {
-                            'id': station.get_previous_process().id,  
-                            'name': station.get_previous_process().name,
-                            'display_name': station.get_previous_process().display_name
-                        } if station.get_previous_process() else None,
-                    }
-                    
-                    response_data = {
-                        'media': media_data,
-                        'station_name': station.name,
-                        'assembly': assembly_info,
-                        'timestamp': time.time()
-                    }
-                    
-                    last_update = current_state
-                    yield f"data: {json.dumps(response_data)}\n\n"
-                
-                time.sleep(1)  # Check every 3 seconds for BRG workflow
-                
-            except Station.DoesNotExist:
-                yield f"data: {json.dumps({'error': 'Station not found'})}\n\n"
-                break
-            except Exception as e:
-                yield f"data: {json.dumps({'error': str(e)})}\n\n"
-                time.sleep(10)
+# Seconds of silence after which an SSE connection sends a keep-alive comment
+STREAM_HEARTBEAT_SECONDS = 15
+# Changes committed by other worker processes never reach this process's event
+# bus, so an SSE stream also re-reads its version this often
+STREAM_RECHECK_SECONDS = 1
 
-    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+
+def _station_event_stream(station_id, build_update):
+    """Blocking SSE generator for WSGI servers - sleeps on the event bus between updates"""
+    last_version = None
+    last_seq = station_events.last_seq
+    product_id = None
+    refresh = True
+    last_write = time.monotonic()
+    while True:
+        try:
+            if not refresh:
+                # Block until something changes for this station (or the recheck is due)
+                last_seq, events = station_events.wait(
+                    last_seq, station_id=station_id, product_id=product_id,
+                    timeout=STREAM_RECHECK_SECONDS
+                )
+            refresh = False
+
+            # Rebuild only if the station's version moved (the event may not change what it shows)
+            version = station_state_version(station_id)
+            if version == last_version:
+                if time.monotonic() - last_write >= STREAM_HEARTBEAT_SECONDS:
+                    last_write = time.monotonic()
+                    yield ": keep-alive\n\n"
+                continue
+            product_id, response_data = build_update(station_id)
+            last_version = version
+            last_write = time.monotonic()
+            yield f"data: {json.dumps(response_data)}\n\n"
+
+        except Station.DoesNotExist:
+            yield f"data: {json.dumps({'error': 'Station not found'})}\n\n"
+            break
+        except Exception as e:
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+            refresh = True
+            time.sleep(10)
+
+
+async def _station_event_stream_async(station_id, build_update):
+    """Async SSE generator for ASGI servers - waits on the event bus without holding a thread"""
+    build_update = sync_to_async(build_update)
+    state_version = sync_to_async(station_state_version)
+    last_version = None
+    last_seq = station_events.last_seq
+    product_id = None
+    refresh = True
+    last_write = time.monotonic()
+    while True:
+        try:
+            if not refresh:
+                last_seq, events = await station_events.wait_async(
+                    last_seq, station_id=station_id, product_id=product_id,
+                    timeout=STREAM_RECHECK_SECONDS
+                )
+            refresh = False
+
+            version = await state_version(station_id)
+            if version == last_version:
+                if time.monotonic() - last_write >= STREAM_HEARTBEAT_SECONDS:
+                    last_write = time.monotonic()
+                    yield ": keep-alive\n\n"
+                continue
+            product_id, response_data = await build_update(station_id)
+            last_version = version
+            last_write = time.monotonic()
+            yield f"data: {json.dumps(response_data)}\n\n"
+
+        except Station.DoesNotExist:
+            yield f"data: {json.dumps({'error': 'Station not found'})}\n\n"
+            break
+        except Exception as e:
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+            refresh = True
+            await asyncio.sleep(10)
+
+
+def _sse_response(request, stream, stream_async, *args):
+    """Serve stream(*args) or, on ASGI servers, stream_async(*args) as text/event-stream"""
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(stream_async(*args), content_type='text/event-stream')
+    else:
+        response = StreamingHttpResponse(stream(*args), content_type='text/event-stream')
+        # Hop-by-hop header - ASGI servers manage the connection themselves
+        response['Connection'] = 'keep-alive'
     response['Cache-Control'] = 'no-cache'
-    response['Connection'] = 'keep-alive'
     response['X-Accel-Buffering'] = 'no'
     return response
 
+
+def _station_stream_response(request, station_id, build_update):
+    """Serve a station SSE stream with the generator that suits the server (ASGI or WSGI)"""
+    return _sse_response(request, _station_event_stream, _station_event_stream_async, station_id, build_update)
+
+
+def _station_stream_update(station_id):
+    """Build the station_media_stream payload; returns (product id, payload)"""
+    station = get_object_or_404(Station, pk=station_id)
+    current_media = station.get_current_media()
+
+    # Prepare detailed media data for frontend
+    media_data = []
+    for media in current_media:
+        media_info = {
+            'id': media.id,
+            'url': media.cached_url,
+            'type': media.file.name.split('.')[-1].lower(),
+            'duration': media.duration,
+            'media_type': media.get_media_type_display(),
+            'product_name': media.product.name,
+            'product_code': media.product.code,
+            'page_count': media.page_count,
+            'page_images': media.get_page_images(),
+        }
+        
+        if media.process:
+            media_info['process'] = {
+                'id': media.process.id,
+                'name': media.process.name,
+                'display_name': media.process.display_name,
+                'stage': media.process.stage.display_name,
+                'order': media.process.order,
+                'is_looped': media.process.is_looped,
+                'loop_group': media.process.loop_group
+            }
+        
+        if media.bom:
+            media_info['bom'] = {
+                'id': media.bom.id,
+                'type': media.bom.get_bom_type_display(),
+                'stage': media.bom.stage.display_name if media.bom.stage else None
+            }
+        
+        media_data.append(media_info)
+
+    # Prepare assembly info
+    assembly_info = {
+        'current_product': {
+            'id': station.current_product.id,
+            'code': station.current_product.code,
+            'name': station.current_product.name
+        } if station.current_product else None,
+        'current_stage': {
+            'id': station.current_stage.id,
+            'name': station.current_stage.display_name,
+            'order': station.current_stage.order
+        } if station.current_stage else None,
+        'current_process': {
+            'id': station.current_process.id,
+            'name': station.current_process.name,
+            'display_name': station.current_process.display_name,
+            'order': station.current_process.order,
+            'is_looped': station.current_process.is_looped,
+            'loop_group': station.current_process.loop_group
+        } if station.current_process else None,
+        'quantity': station.product_quantity,
+        'loop_mode': station.loop_mode,
+        'clicker_enabled': station.clicker_enabled,
+        'display_number': station.display_number,
+        'next_process': {
+            'id': station.get_next_process().id,
+            'name': station.get_next_process().name,
+            'display_name': station.get_next_process().display_name
+        } if station.get_next_process() else None,
+        'previous_process': {
+            'id': station.get_previous_process().id,  
+            'name': station.get_previous_process().name,
+            'display_name': station.get_previous_process().display_name
+        } if station.get_previous_process() else None,
+    }
+
+    response_data = {
+        'media': media_data,
+        'station_name': station.name,
+        'assembly': assembly_info,
+        'timestamp': time.time()
+    }
+    
+    return station.current_product_id, response_data
+
+
+def station_media_stream(request, station_id):
+    """Real-time streaming for BRG assembly workflow - woken by the station event bus"""
+    return _station_stream_response(request, station_id, _station_stream_update)
+
+def _update_station_group(stations, **changes):
+    """
+    Apply changes to a group of stations with a single UPDATE.
+
+    The group is locked and read once (for the response summary) inside the
+    same transaction, so a button press costs two queries however many
+    displays the line has. Returns the rows as they were before the update.
+    """
+    with transaction.atomic():
+        rows = list(
+            stations.select_for_update(of=('self',)).order_by('pk').values(
+                'id', 'name', 'display_number', 'current_process__name'
+            )
+        )
+        if rows:
+            # update() skips auto_now, so stamp bom_page_updated_at like save() did
+            Station.objects.filter(pk__in=[row['id'] for row in rows]).update(
+                bom_page_updated_at=timezone.now(), **changes
+            )
+    return rows
+
+
 # UPDATED: Add pagination reset to your clicker_action function
 
 @csrf_exempt
@@ -2468,36 +2805,43 @@ def clicker_action(request, station_id):
                 print(f"AUTO-ENTER LOOP MODE: Entering loop at {next_process.name}")
 
             if next_process:
-                all_stations = Station.objects.all()
-                updated_stations = []
-
-                for st in all_stations:
-                    if st.current_product == station.current_product:
-                        old_process_name = st.current_process.name if st.current_process else None
-                        st.current_process = next_process
-
-                        if next_process.stage != st.current_stage:
-                            st.current_stage = next_process.stage
-
-                        if exit_loop_mode:
-                            st.loop_mode = False
-                        if enter_loop_mode:
-                            st.loop_mode = True
-
-                        st.save()
-                        updated_stations.append({
-                            'id': st.id,
-                            'name': st.name,
-                            'display_number': st.display_number,
-                            'old_process': old_process_name,
-                            'new_process': next_process.name,
-                            'loop_mode_changed': exit_loop_mode or enter_loop_mode
-                        })
+                # Move every station on the same product in one UPDATE
+                changes = {
+                    'current_process': next_process,
+                    'current_stage_id': next_process.stage_id,
+                }
+                if exit_loop_mode:
+                    changes['loop_mode'] = False
+                if enter_loop_mode:
+                    changes['loop_mode'] = True
+
+                rows = _update_station_group(
+                    Station.objects.filter(current_product_id=station.current_product_id),
+                    **changes
+                )
+                updated_stations = [
+                    {
+                        'id': row['id'],
+                        'name': row['name'],
+                        'display_number': row['display_number'],
+                        'old_process': row['current_process__name'],
+                        'new_process': next_process.name,
+                        'loop_mode_changed': exit_loop_mode or enter_loop_mode
+                    }
+                    for row in rows
+                ]
 
                 # NEW: Reset BOM pagination when process changes
                 if station.current_product:
                     print(f"PAGINATION RESET: Process changed from {current_proc.name if current_proc else 'None'} to {next_process.name}")
-                    BOMPaginationManager.clear_product_pagination(station.current_product.id)
+                    BOMPaginationManager.clear_product_pagination(station.current_product.id, publish=False)
+
+                publish_station_change(
+                    'process',
+                    station_ids=[st['id'] for st in updated_stations],
+                    product_id=station.current_product_id,
+                    process_id=next_process.id
+                )
 
                 response_data = {
                     'success': True,
@@ -2573,37 +2917,43 @@ def clicker_action(request, station_id):
             if previous_process is None:
                 return JsonResponse({'error': 'No previous process available'}, status=400)
 
-            # 🔁 Update all stations with same product
-            all_stations = Station.objects.all()
-            updated_stations = []
-
-            for st in all_stations:
-                if st.current_product == station.current_product:
-                    old_process_name = st.current_process.name if st.current_process else None
-                    st.current_process = previous_process
-
-                    if previous_process.stage != st.current_stage:
-                        st.current_stage = previous_process.stage
-
-                    if exit_loop_mode:
-                        st.loop_mode = False
-                    if enter_loop_mode:
-                        st.loop_mode = True
-
-                    st.save()
-                    updated_stations.append({
-                        'id': st.id,
-                        'name': st.name,
-                        'display_number': st.display_number,
-                        'old_process': old_process_name,
-                        'new_process': previous_process.name,
-                        'loop_mode_changed': exit_loop_mode or enter_loop_mode
-                    })
-
+            # 🔁 Update all stations with same product in one UPDATE
+            changes = {
+                'current_process': previous_process,
+                'current_stage_id': previous_process.stage_id,
+            }
+            if exit_loop_mode:
+                changes['loop_mode'] = False
+            if enter_loop_mode:
+                changes['loop_mode'] = True
+
+            rows = _update_station_group(
+                Station.objects.filter(current_product_id=station.current_product_id),
+                **changes
+            )
+            updated_stations = [
+                {
+                    'id': row['id'],
+                    'name': row['name'],
+                    'display_number': row['display_number'],
+                    'old_process': row['current_process__name'],
+                    'new_process': previous_process.name,
+                    'loop_mode_changed': exit_loop_mode or enter_loop_mode
+                }
+                for row in rows
+            ]
+
             # NEW: Reset BOM pagination when process changes
             if station.current_product:
                 print(f"PAGINATION RESET: Process changed from {current_proc.name if current_proc else 'None'} to {previous_process.name}")
-                BOMPaginationManager.clear_product_pagination(station.current_product.id)
+                BOMPaginationManager.clear_product_pagination(station.current_product.id, publish=False)
+
+            publish_station_change(
+                'process',
+                station_ids=[st['id'] for st in updated_stations],
+                product_id=station.current_product_id,
+                process_id=previous_process.id
+            )
 
             return JsonResponse({
                 'success': True,
@@ -2633,21 +2983,29 @@ def clicker_action(request, station_id):
                 station.current_process.loop_group == 'final_assembly_1abc'):
 
                 new_loop_mode = not station.loop_mode
-                all_stations = Station.objects.all()
-                updated_stations = []
-
-                for st in all_stations:
-                    if (st.current_product == station.current_product and
-                        st.current_process and 
-                        st.current_process.loop_group == 'final_assembly_1abc'):
-                        st.loop_mode = new_loop_mode
-                        st.save()
-                        updated_stations.append({
-                            'id': st.id,
-                            'name': st.name,
-                            'display_number': st.display_number,
-                            'loop_mode': new_loop_mode
-                        })
+                rows = _update_station_group(
+                    Station.objects.filter(
+                        current_product_id=station.current_product_id,
+                        current_process__loop_group='final_assembly_1abc'
+                    ),
+                    loop_mode=new_loop_mode
+                )
+                updated_stations = [
+                    {
+                        'id': row['id'],
+                        'name': row['name'],
+                        'display_number': row['display_number'],
+                        'loop_mode': new_loop_mode
+                    }
+                    for row in rows
+                ]
+
+                publish_station_change(
+                    'loop_mode',
+                    station_ids=[st['id'] for st in updated_stations],
+                    product_id=station.current_product_id,
+                    loop_mode=new_loop_mode
+                )
 
                 return JsonResponse({
                     'success': True,
@@ -2790,26 +3148,24 @@ def sync_all_displays(request):
         target_stage = get_object_or_404(AssemblyStage, id=target_stage_id)
         target_process = get_object_or_404(AssemblyProcess, id=target_process_id)
         
-        # Update all stations
-        stations = Station.objects.all()
-        updated_stations = []
+        # Update all stations in one UPDATE (loop mode on for processes 1A, 1B, 1C)
+        rows = _update_station_group(
+            Station.objects.all(),
+            current_stage=target_stage,
+            current_process=target_process,
+            loop_mode=target_process.loop_group == 'final_assembly_1abc'
+        )
+        updated_stations = [
+            {
+                'id': row['id'],
+                'name': row['name'],
+                'display_number': row['display_number']
+            }
+            for row in rows
+        ]
         
-        for station in stations:
-            station.current_stage = target_stage
-            station.current_process = target_process
-            
-            # Handle loop mode for processes 1A, 1B, 1C
-            if target_process.loop_group == 'final_assembly_1abc':
-                station.loop_mode = True
-            else:
-                station.loop_mode = False
-                
-            station.save()
-            updated_stations.append({
-                'id': station.id,
-                'name': station.name,
-                'display_number': station.display_number
-            })
+        # Every display changed - broadcast to all subscribers
+        publish_station_change('process', process_id=target_process.id)
         
         return JsonResponse({
             'success': True,
@@ -2872,77 +3228,28 @@ def get_bom_files(request, station_id):
 
 # File streaming views
 def stream_video(request, video_path):
-    """Stream video files with range support"""
-    clean_path = video_path.lstrip('/').replace('media/', '', 1)
-    path = os.path.join(settings.MEDIA_ROOT, clean_path)
-    
-    if not os.path.exists(path):
-        return JsonResponse({'error': 'File not found'}, status=404)
-    
-    range_header = request.META.get('HTTP_RANGE', '').strip()
-    size = os.path.getsize(path)
-    
-    def file_iterator(path, chunk_size=8192, offset=0, length=None):
-        with open(path, 'rb') as f:
-            if offset:
-                f.seek(offset)
-            remaining = length if length is not None else None
-            while True:
-                if remaining is not None:
-                    chunk_size = min(chunk_size, remaining)
-                data = f.read(chunk_size)
-                if not data:
-                    break
-                if remaining is not None:
-                    remaining -= len(data)
-                yield data
-                if remaining == 0:
-                    break
-    
-    if range_header:
-        range_s, range_e = range_header.split('=')[-1].split('-')
-        range_start = int(range_s)
-        range_end = int(range_e) if range_e else size - 1
-        length = range_end - range_start + 1
-
-        response = StreamingHttpResponse(
-            file_iterator(path, offset=range_start, length=length),
-            status=206,
-            content_type='video/mp4'
-        )
-        response['Content-Range'] = f'bytes {range_start}-{range_end}/{size}'
-    else:
-        response = StreamingHttpResponse(
-            file_iterator(path),
-            content_type='video/mp4'
-        )
-    
-    response['Accept-Ranges'] = 'bytes'
-    response['Content-Length'] = str(size)
-    return response
+    """Stream video files with range support (sendfile / proxy offload, see media_delivery)"""
+    return serve_media_file(request, video_path, default_content_type='video/mp4')
 
 def stream_pdf(request, pdf_path):
-    """Stream PDF files"""
-    clean_path = pdf_path.lstrip('/').replace('media/', '', 1)
-    path = os.path.join(settings.MEDIA_ROOT, clean_path)
-    
-    if not os.path.exists(path):
+    """Stream PDF files (sendfile / proxy offload, see media_delivery)"""
+    return serve_media_file(request, pdf_path, default_content_type='application/pdf')
+
+def stream_cached_media(request, media_path):
+    """Serve content-hashed ProductMedia files with immutable caching"""
+    return serve_cached_media(request, media_path)
+
+def bom_photo_thumbnail(request, variant, photo_path):
+    """Serve a BOM item photo in one of the fixed thumbnail sizes (see thumbnails)"""
+    try:
+        thumb_path = get_thumbnail(photo_path, variant)
+    except OSError as e:
+        return JsonResponse({'error': f'Could not render thumbnail: {e}'}, status=500)
+    if thumb_path is None:
         return JsonResponse({'error': 'File not found'}, status=404)
-    
-    def file_iterator(path, chunk_size=8192):
-        with open(path, 'rb') as f:
-            while True:
-                data = f.read(chunk_size)
-                if not data:
-                    break
-                yield data
-    
-    response = StreamingHttpResponse(
-        file_iterator(path),
-        content_type='application/pdf'
-    )
-    response['Content-Length'] = os.path.getsize(path)
-    return response
+    # Content-addressed photos never change under the same URL
+    cache_control = IMMUTABLE_CACHE_CONTROL if fingerprint_of(photo_path) else 'no-cache'
+    return serve_media_file(request, thumb_path, thumbnail_content_type(thumb_path), cache_control=cache_control)
         
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -3096,139 +3403,195 @@ def update_assembly_config(request, station_id):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+# Minimum time between two auto loop progressions of the same product
+AUTO_LOOP_MIN_INTERVAL_MS = 5000
+
+
+def _take_auto_loop_token(product_id, now_ms):
+    """
+    Per-product token bucket (capacity 1, refilled after AUTO_LOOP_MIN_INTERVAL_MS).
+
+    shared_state.add is atomic across workers, so when several displays
+    trigger the same step at once exactly one of them gets the token.
+    Returns (granted, ms since the last progression).
+    """
+    cache_key = StateKeys.auto_loop_bucket(product_id)
+    if shared_state.add(cache_key, now_ms, timeout=AUTO_LOOP_MIN_INTERVAL_MS / 1000):
+        return True, None
+    last_ms = shared_state.get(cache_key)
+    return False, (now_ms - last_ms) if last_ms is not None else None
+
+
 # NEW: Auto loop 
 @csrf_exempt
 @require_http_methods(["POST"])
 def auto_loop_progress(request, station_id):
-    """Handle automatic progression in loop mode - ENHANCED VERSION"""
-    station = get_object_or_404(Station, pk=station_id)
+    """Handle automatic progression in loop mode - loop ring from the process graph, one conditional UPDATE"""
+    station = get_object_or_404(Station.objects.select_related('current_process'), pk=station_id)
     
     try:
         data = json.loads(request.body)
         client_timestamp = data.get('timestamp')
         expected_process = data.get('expectedProcess')
-        
-        # FIXED: Validate that enough time has passed since last auto progression
         current_time = time.time() * 1000  # Convert to milliseconds
-        if hasattr(station, 'last_auto_progress_time'):
-            time_since_last = current_time - station.last_auto_progress_time
-            if time_since_last < 5000:  # Prevent progressions within 5 seconds
-                return JsonResponse({
-                    'error': f'Auto progression too frequent. Last: {time_since_last}ms ago',
-                    'time_since_last': time_since_last,
-                    'minimum_interval': 5000
-                }, status=429)
+        current_process = station.current_process
         
         # FIXED: Validate that we're still in the expected process
-        if expected_process and station.current_process:
-            if station.current_process.name != expected_process:
+        if expected_process and current_process:
+            if current_process.name != expected_process:
                 return JsonResponse({
-                    'error': f'Process changed. Expected: {expected_process}, Current: {station.current_process.name}',
+                    'error': f'Process changed. Expected: {expected_process}, Current: {current_process.name}',
                     'expected': expected_process,
-                    'current': station.current_process.name if station.current_process else None
+                    'current': current_process.name
                 }, status=409)
         
-        # Existing validation logic
-        if not (station.loop_mode and 
-                station.current_process and 
-                station.current_process.loop_group == 'final_assembly_1abc'):
+        # Resolve the loop ring (e.g. 1A → 1B → 1C) from the compiled process graph
+        loop_ring = ()
+        if current_process and current_process.is_looped:
+            loop_ring = get_process_graph().loop_ring(current_process.stage_id, current_process.loop_group)
+        
+        if not (station.loop_mode and len(loop_ring) > 1):
             return JsonResponse({
                 'error': 'Auto progression not allowed',
                 'details': {
                     'loop_mode': station.loop_mode,
-                    'current_process': station.current_process.name if station.current_process else None,
-                    'loop_group': station.current_process.loop_group if station.current_process else None
+                    'current_process': current_process.name if current_process else None,
+                    'loop_group': current_process.loop_group if current_process else None
                 }
             }, status=400)
         
-        # Determine next process in loop
-        current_name = station.current_process.name
-        next_process = None
-        loop_sequence = ['PROCESS 1A OF 6', 'PROCESS 1B OF 6', 'PROCESS 1C OF 6']
-        
-        try:
-            current_index = loop_sequence.index(current_name)
-            next_index = (current_index + 1) % len(loop_sequence)
-            next_process_name = loop_sequence[next_index]
-            
-            next_process = AssemblyProcess.objects.filter(
-                name=next_process_name,
-                loop_group='final_assembly_1abc'
-            ).first()
-            
-        except ValueError:
+        loop_ids = [process.id for process in loop_ring]
+        loop_sequence = [process.name for process in loop_ring]
+        current_name = current_process.name
+        if current_process.id not in loop_ids:
             return JsonResponse({
                 'error': f'Current process {current_name} not in loop sequence',
                 'loop_sequence': loop_sequence
             }, status=400)
+        current_index = loop_ids.index(current_process.id)
+        next_process = loop_ring[(current_index + 1) % len(loop_ring)]
         
-        if not next_process:
+        def coalesced_response(reason, time_since_last=None):
+            """Another display already advanced this step - report the shared state"""
+            group_process = Station.objects.filter(pk=station.pk).values_list(
+                'current_process_id', flat=True
+            ).first()
+            group_process = get_process_graph().process(group_process) or current_process
             return JsonResponse({
-                'error': f'Next process {next_process_name} not found in database',
-                'searched_for': next_process_name
-            }, status=404)
+                'success': True,
+                'advanced': False,
+                'coalesced': True,
+                'reason': reason,
+                'message': f'Auto progression already handled - current process {group_process.display_name}',
+                'current_process': {
+                    'id': group_process.id,
+                    'name': group_process.name,
+                    'display_name': group_process.display_name,
+                    'loop_group': group_process.loop_group,
+                },
+                'time_since_last': time_since_last,
+                'minimum_interval': AUTO_LOOP_MIN_INTERVAL_MS,
+                'loop_sequence': loop_sequence,
+                'server_time': time.time() * 1000,
+                'client_timestamp': client_timestamp
+            })
+        
+        # Persistent per-product limiter: concurrent triggers from all displays collapse into one
+        granted, time_since_last = _take_auto_loop_token(station.current_product_id, current_time)
+        if not granted:
+            print(f"AUTO LOOP THROTTLED: product {station.current_product_id}, last progression {time_since_last}ms ago")
+            return coalesced_response('rate_limited', time_since_last)
         
         # Log the auto progression
         print(f"AUTO LOOP PROGRESSION: {current_name} → {next_process.name} (Client: {client_timestamp})")
         
-        # FIXED: Update timestamp tracking
-        station.last_auto_progress_time = current_time
+        with transaction.atomic():
+            # Lock only the product's stations on the loop ring - other lines keep saving
+            in_group = list(
+                Station.objects.select_for_update(of=('self',)).filter(
+                    current_product_id=station.current_product_id,
+                    loop_mode=True,
+                    current_process_id__in=loop_ids
+                ).order_by('pk').values(
+                    'id', 'name', 'display_number', 'current_process_id', 'current_process__name'
+                )
+            )
+            
+            # Conditional: only applies while the triggering station is still on the step it saw.
+            # Checked on the locked rows rather than with a subquery on the updated table,
+            # which MySQL rejects (error 1093).
+            still_on_step = any(
+                row['id'] == station.pk and row['current_process_id'] == current_process.id
+                for row in in_group
+            )
+            updated_count = 0
+            if still_on_step:
+                updated_count = Station.objects.filter(
+                    pk__in=[row['id'] for row in in_group],
+                    loop_mode=True,
+                    current_process_id__in=loop_ids
+                ).update(
+                    current_process=next_process,
+                    current_stage_id=next_process.stage_id,
+                    bom_page_updated_at=timezone.now()
+                )
+        
+        if not updated_count:
+            return coalesced_response('already_advanced')
+        
+        updated_stations = [
+            {
+                'id': row['id'],
+                'name': row['name'],
+                'display_number': row['display_number'],
+                'old_process': row['current_process__name'],
+                'new_process': next_process.name
+            }
+            for row in in_group
+        ]
         
-        # Update ALL stations with the same product
-        all_stations = Station.objects.all()
-        updated_stations = []
+        # Report only - an unlocked read is enough
+        other_rows = Station.objects.exclude(
+            pk__in=[row['id'] for row in in_group]
+        ).order_by('pk').values(
+            'id', 'name', 'display_number', 'current_product_id', 'loop_mode', 'current_process_id'
+        )
         skipped_stations = []
+        for row in other_rows:
+            skip_reason = []
+            if row['current_product_id'] != station.current_product_id:
+                skip_reason.append('different_product')
+            if not row['loop_mode']:
+                skip_reason.append('not_in_loop_mode')
+            if not row['current_process_id']:
+                skip_reason.append('no_current_process')
+            elif row['current_process_id'] not in loop_ids:
+                skip_reason.append('not_in_loop_group')
+            
+            skipped_stations.append({
+                'id': row['id'],
+                'name': row['name'],
+                'display_number': row['display_number'],
+                'skip_reasons': skip_reason
+            })
         
-        for st in all_stations:
-            if (st.current_product == station.current_product and
-                st.loop_mode and
-                st.current_process and 
-                st.current_process.loop_group == 'final_assembly_1abc'):
-                
-                old_process = st.current_process.name
-                st.current_process = next_process
-                
-                if next_process.stage != st.current_stage:
-                    st.current_stage = next_process.stage
-                
-                # FIXED: Update timestamp on all affected stations
-                st.last_auto_progress_time = current_time
-                st.save()
-                
-                updated_stations.append({
-                    'id': st.id,
-                    'name': st.name,
-                    'display_number': st.display_number,
-                    'old_process': old_process,
-                    'new_process': next_process.name
-                })
-                
-            else:
-                skip_reason = []
-                if st.current_product != station.current_product:
-                    skip_reason.append('different_product')
-                if not st.loop_mode:
-                    skip_reason.append('not_in_loop_mode')
-                if not st.current_process:
-                    skip_reason.append('no_current_process')
-                elif st.current_process.loop_group != 'final_assembly_1abc':
-                    skip_reason.append('not_in_loop_group')
-                
-                skipped_stations.append({
-                    'id': st.id,
-                    'name': st.name,
-                    'display_number': st.display_number,
-                    'skip_reasons': skip_reason
-                })
+        publish_station_change(
+            'process',
+            station_ids=[row['id'] for row in updated_stations],
+            product_id=station.current_product_id,
+            process_id=next_process.id
+        )
         
         # Enhanced response data
+        next_index = (current_index + 2) % len(loop_ring)
         response_data = {
             'success': True,
+            'advanced': True,
             'message': f'Auto-progressed from {current_name} to {next_process.display_name}',
             'progression': {
                 'from': {
                     'name': current_name,
-                    'display_name': station.current_process.display_name if station.current_process else current_name
+                    'display_name': current_process.display_name
                 },
                 'to': {
                     'name': next_process.name,
@@ -3250,24 +3613,17 @@ def auto_loop_progress(request, station_id):
             'skipped_stations': skipped_stations,
             'loop_continues': True,
             'loop_sequence': loop_sequence,
-            'current_position': loop_sequence.index(next_process.name),
+            'current_position': (current_index + 1) % len(loop_ring),
+            'next_progression': {
+                'will_go_to': loop_sequence[next_index],
+                'is_cycle_complete': next_index == 0
+            },
             'timestamp': current_time,
             'server_time': time.time() * 1000,
             'client_timestamp': client_timestamp,
             'progression_id': f"{station_id}_{current_time}"  # Unique ID for this progression
         }
         
-        # Add next progression info
-        try:
-            current_index = loop_sequence.index(next_process.name)
-            next_index = (current_index + 1) % len(loop_sequence)
-            response_data['next_progression'] = {
-                'will_go_to': loop_sequence[next_index],
-                'is_cycle_complete': next_index == 0
-            }
-        except ValueError:
-            pass
-        
         print(f"AUTO LOOP SUCCESS: Updated {len(updated_stations)} stations, skipped {len(skipped_stations)}")
         
         return JsonResponse(response_data)
@@ -3393,51 +3749,297 @@ def auto_loop_config(request, station_id):
             return JsonResponse({'error': str(e)}, status=500)
 
 
+LOOP_GROUP_PROCESSES = ['PROCESS 1A OF 6', 'PROCESS 1B OF 6', 'PROCESS 1C OF 6']
+
+
+def _auto_loop_station_status(station):
+    """Auto loop status of one station, as listed by auto_loop_status_all"""
+    is_in_loop_group = bool(station.current_process and
+                            station.current_process.loop_group == 'final_assembly_1abc')
+
+    return {
+        'id': station.id,
+        'name': station.name,
+        'display_number': station.display_number,
+        'loop_mode': station.loop_mode,
+        'current_process': {
+            'name': station.current_process.name if station.current_process else None,
+            'display_name': station.current_process.display_name if station.current_process else None,
+            'loop_group': station.current_process.loop_group if station.current_process else None,
+        } if station.current_process else None,
+        'is_in_loop_group': is_in_loop_group,
+        'auto_loop_eligible': is_in_loop_group and station.loop_mode,
+        'current_product': {
+            'code': station.current_product.code,
+            'name': station.current_product.name
+        } if station.current_product else None
+    }
+
+
+def _auto_loop_summary(stations_status):
+    """Summary statistics over auto loop station statuses"""
+    return {
+        'total_stations': len(stations_status),
+        'auto_loop_active': len([s for s in stations_status if s['auto_loop_eligible']]),
+        'in_loop_group': len([s for s in stations_status if s['is_in_loop_group']]),
+        'loop_processes': LOOP_GROUP_PROCESSES
+    }
+
+
 def auto_loop_status_all(request):
     """Get auto loop status for all stations"""
     stations = Station.objects.all().select_related('current_process', 'current_stage', 'current_product')
-    
-    stations_status = []
-    for station in stations:
-        is_in_loop_group = (station.current_process and 
-                           station.current_process.loop_group == 'final_assembly_1abc')
-        
-        station_info = {
-            'id': station.id,
-            'name': station.name,
-            'display_number': station.display_number,
-            'loop_mode': station.loop_mode,
-            'current_process': {
-                'name': station.current_process.name if station.current_process else None,
-                'display_name': station.current_process.display_name if station.current_process else None,
-                'loop_group': station.current_process.loop_group if station.current_process else None,
-            } if station.current_process else None,
-            'is_in_loop_group': is_in_loop_group,
-            'auto_loop_eligible': is_in_loop_group and station.loop_mode,
-            'current_product': {
-                'code': station.current_product.code,
-                'name': station.current_product.name
-            } if station.current_product else None
-        }
-        stations_status.append(station_info)
-    
-    # Summary statistics
-    total_stations = len(stations_status)
-    auto_loop_active = len([s for s in stations_status if s['auto_loop_eligible']])
-    in_loop_group = len([s for s in stations_status if s['is_in_loop_group']])
+    stations_status = [_auto_loop_station_status(station) for station in stations]
     
     return JsonResponse({
         'stations': stations_status,
-        'summary': {
-            'total_stations': total_stations,
-            'auto_loop_active': auto_loop_active,
-            'in_loop_group': in_loop_group,
-            'loop_processes': ['PROCESS 1A OF 6', 'PROCESS 1B OF 6', 'PROCESS 1C OF 6']
-        },
+        'summary': _auto_loop_summary(stations_status),
         'timestamp': time.time()
     })
 
 
+# ===== SUPERVISOR CHANNEL =====
+
+def _supervisor_version():
+    """
+    Opaque token of everything the supervisor channel shows.
+
+    The shared supervisor counter moves with every station publish (so with
+    stations being added or removed) and every session save, from any
+    worker; reading it is a shared-state lookup, so the once-a-second
+    rechecks only query the database when it moved.
+    """
+    return str(supervisor_version())
+
+
+def _supervisor_station_state(station):
+    """One station as the supervisor dashboard shows it (workflow, loop and BOM status)"""
+    pagination_info, bom_data = _current_bom_page(station)
+    state = _auto_loop_station_status(station)
+    state.update({
+        'current_product': {
+            'id': station.current_product.id,
+            'code': station.current_product.code,
+            'name': station.current_product.name
+        } if station.current_product else None,
+        'current_stage': {
+            'id': station.current_stage.id,
+            'name': station.current_stage.display_name,
+        } if station.current_stage else None,
+        'current_process': {
+            'id': station.current_process.id,
+            'name': station.current_process.name,
+            'display_name': station.current_process.display_name,
+            'loop_group': station.current_process.loop_group,
+            'is_looped': station.current_process.is_looped,
+        } if station.current_process else None,
+        'quantity': station.product_quantity,
+        'clicker_enabled': station.clicker_enabled,
+        'media_count': station.get_current_media().count(),
+        'bom': dict(pagination_info, items_on_screen=len(bom_data)) if pagination_info else None,
+    })
+    return state
+
+
+def _supervisor_state():
+    """Every station's state plus the auto loop summary and the active session count"""
+    version = _supervisor_version()
+    stations = Station.objects.select_related(
+        'current_product', 'current_stage', 'current_process'
+    ).order_by('display_number', 'id')
+    stations_state = [_supervisor_station_state(station) for station in stations]
+    return {
+        'version': version,
+        'stations': stations_state,
+        'summary': _auto_loop_summary(stations_state),
+        'active_sessions': AssemblySession.objects.filter(completed=False).count(),
+        'timestamp': time.time(),
+    }
+
+
+def _supervisor_update(sent_digests):
+    """
+    SSE events for what changed since sent_digests (station id / 'summary' -> digest).
+
+    A `station` event per changed station, `station_removed` for stations
+    that are gone and `summary` for the loop summary and active sessions.
+    Returns (new digests, SSE text).
+    """
+    state = _supervisor_state()
+    digests = {}
+    events = []
+    for station_state in state['stations']:
+        digest = hashlib.md5(json.dumps(station_state, sort_keys=True, default=str).encode()).hexdigest()
+        digests[station_state['id']] = digest
+        if sent_digests.get(station_state['id']) != digest:
+            events.append(_sse_event('station', station_state))
+    for station_id in sent_digests:
+        if station_id != 'summary' and station_id not in digests:
+            events.append(_sse_event('station_removed', {'id': station_id}))
+
+    summary = {'summary': state['summary'], 'active_sessions': state['active_sessions'], 'version': state['version']}
+    digests['summary'] = hashlib.md5(json.dumps(
+        [state['summary'], state['active_sessions']], sort_keys=True
+    ).encode()).hexdigest()
+    if sent_digests.get('summary') != digests['summary']:
+        events.append(_sse_event('summary', summary))
+    return digests, ''.join(events)
+
+
+def _supervisor_stream():
+    """
+    Blocking supervisor SSE generator for WSGI servers.
+
+    Wakes on every station event of this process and, for changes made in
+    other workers, re-reads the supervisor version every
+    LONG_POLL_RECHECK_SECONDS.
+    """
+    yield f"retry: {STREAM_RETRY_MS}\n\n"
+    sent_digests = {}
+    last_version = None
+    last_seq = station_events.last_seq
+    refresh = True
+    last_write = time.monotonic()
+    while True:
+        try:
+            if not refresh:
+                idle = time.monotonic() - last_write
+                if idle >= STREAM_HEARTBEAT_SECONDS:
+                    last_write = time.monotonic()
+                    yield ": heartbeat\n\n"
+                    continue
+                last_seq, _ = station_events.wait(
+                    last_seq, all_stations=True,
+                    timeout=min(STREAM_HEARTBEAT_SECONDS - idle, LONG_POLL_RECHECK_SECONDS)
+                )
+            refresh = False
+
+            version = _supervisor_version()
+            if version == last_version:
+                continue
+            sent_digests, text = _supervisor_update(sent_digests)
+            last_version = version
+            if text:
+                last_write = time.monotonic()
+                yield text
+
+        except Exception as e:
+            yield _sse_event('error', {'error': str(e)})
+            refresh = True
+            time.sleep(10)
+
+
+async def _supervisor_stream_async():
+    """Async supervisor SSE generator for ASGI servers"""
+    supervisor_update = sync_to_async(_supervisor_update)
+    supervisor_version = sync_to_async(_supervisor_version)
+    yield f"retry: {STREAM_RETRY_MS}\n\n"
+    sent_digests = {}
+    last_version = None
+    last_seq = station_events.last_seq
+    refresh = True
+    last_write = time.monotonic()
+    while True:
+        try:
+            if not refresh:
+                idle = time.monotonic() - last_write
+                if idle >= STREAM_HEARTBEAT_SECONDS:
+                    last_write = time.monotonic()
+                    yield ": heartbeat\n\n"
+                    continue
+                last_seq, _ = await station_events.wait_async(
+                    last_seq, all_stations=True,
+                    timeout=min(STREAM_HEARTBEAT_SECONDS - idle, LONG_POLL_RECHECK_SECONDS)
+                )
+            refresh = False
+
+            version = await supervisor_version()
+            if version == last_version:
+                continue
+            sent_digests, text = await supervisor_update(sent_digests)
+            last_version = version
+            if text:
+                last_write = time.monotonic()
+                yield text
+
+        except Exception as e:
+            yield _sse_event('error', {'error': str(e)})
+            refresh = True
+            await asyncio.sleep(10)
+
+
+def supervisor_stream(request):
+    """
+    One SSE connection carrying the state of every station to the supervisor dashboard.
+
+    Fed by the same station events as the displays. The first events hold
+    every station and the summary; after that only stations whose state
+    changed are sent, so the dashboard costs one connection whatever the
+    number of stations.
+    """
+    return _sse_response(request, _supervisor_stream, _supervisor_stream_async)
+
+
+def _wait_for_supervisor_change(since, timeout):
+    """Block until the supervisor version moves on from since (or timeout)"""
+    deadline = time.monotonic() + timeout
+    last_seq = station_events.last_seq
+    while True:
+        version = _supervisor_version()
+        remaining = deadline - time.monotonic()
+        if since is None or version != since or remaining <= 0:
+            return version
+        last_seq, _ = station_events.wait(
+            last_seq, all_stations=True, timeout=min(remaining, LONG_POLL_RECHECK_SECONDS)
+        )
+
+
+async def _wait_for_supervisor_change_async(since, timeout):
+    """_wait_for_supervisor_change for ASGI - suspends instead of holding a thread"""
+    supervisor_version = sync_to_async(_supervisor_version)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    last_seq = station_events.last_seq
+    while True:
+        version = await supervisor_version()
+        remaining = deadline - loop.time()
+        if since is None or version != since or remaining <= 0:
+            return version
+        last_seq, _ = await station_events.wait_async(
+            last_seq, all_stations=True, timeout=min(remaining, LONG_POLL_RECHECK_SECONDS)
+        )
+
+
+def _supervisor_changes_data(since):
+    version = _supervisor_version()
+    if version == since:
+        return {'version': version, 'changed': False, 'timestamp': time.time()}
+    return dict(_supervisor_state(), changed=True)
+
+
+@require_http_methods(["GET"])
+async def supervisor_changes(request):
+    """
+    Long-poll version of supervisor_stream.
+
+    GET ?since=<version> is held until the supervisor version moves on from
+    since, or for up to `timeout` seconds, and then returns every station's
+    state plus the new version to pass as since on the next call. Waits like
+    display_changes: on the event loop under ASGI, in the request's thread
+    under WSGI.
+    """
+    since = request.GET.get('since') or None
+    _, timeout = _long_poll_params(request)
+    if isinstance(request, ASGIRequest):
+        await _wait_for_supervisor_change_async(since, timeout)
+    else:
+        await sync_to_async(_wait_for_supervisor_change)(since, timeout)
+    data = await sync_to_async(_supervisor_changes_data)(since)
+    response = JsonResponse(data)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
 def get_next_process(self):
     """Get the next process in sequence - ENHANCED for loop exit logic"""
     if not self.current_process:
@@ -3529,171 +4131,315 @@ def debug_process_sequence(request, station_id):
         return JsonResponse({'error': str(e)}, status=500)
 
     
-def station_media_stream_enhanced(request, station_id):
-    """Enhanced streaming with BOM data support"""
-    def event_stream():
-        last_update = None
-        while True:
-            try:
-                station = get_object_or_404(Station, pk=station_id)
-                current_media = station.get_current_media()
-                bom_data = station.get_current_bom_data()
-                
-                # Create comprehensive comparison data including BOM
-                media_comparison = []
-                for media in current_media:
-                    comparison_item = {
-                        'id': media.id,
-                        'file_url': media.file.url if media.file else None,
-                        'media_type': media.media_type,
-                        'process_id': media.process.id if media.process else None,
-                        'bom_id': media.bom.id if media.bom else None
-                    }
-                    media_comparison.append(comparison_item)
-                
-                # Include BOM data in comparison
-                bom_comparison = []
-                if bom_data:
-                    for item_data in bom_data:
-                        bom_comparison.append({
-                            'item_code': item_data['item'].item_code,
-                            'calculated_quantity': item_data['calculated_quantity'],
-                            'serial_number': item_data['serial_number']
-                        })
-                
-                # Include assembly state in comparison
-                assembly_state = {
-                    'current_product_id': station.current_product.id if station.current_product else None,
-                    'current_stage_id': station.current_stage.id if station.current_stage else None,
-                    'current_process_id': station.current_process.id if station.current_process else None,
-                    'product_quantity': station.product_quantity,
-                    'loop_mode': station.loop_mode,
-                    'display_number': station.display_number,
-                    'show_single_unit_bom': station.show_single_unit_bom,
-                    'show_batch_bom': station.show_batch_bom,
-                }
-                
-                current_state = {
-                    'media': media_comparison,
-                    'bom': bom_comparison,
-                    'assembly': assembly_state
-                }
-                
-                # Only send update if something changed
-                if current_state != last_update:
-                    # Prepare detailed media data for frontend
-                    media_data = []
-                    for media in current_media:
-                        media_info = {
-                            'id': media.id,
-                            'url': media.file.url if media.file else None,
-                            'type': media.file.name.split('.')[-1].lower() if media.file else 'bom',
-                            'duration': media.duration,
-                            'media_type': media.get_media_type_display(),
-                            'product_name': media.product.name,
-                            'product_code': media.product.code,
-                        }
-                        
-                        if media.process:
-                            media_info['process'] = {
-                                'id': media.process.id,
-                                'name': media.process.name,
-                                'display_name': media.process.display_name,
-                                'stage': media.process.stage.display_name,
-                                'order': media.process.order,
-                                'is_looped': media.process.is_looped,
-                                'loop_group': media.process.loop_group
-                            }
-                        
-                        if media.bom:
-                            media_info['bom'] = {
-                                'id': media.bom.id,
-                                'type': media.bom.get_bom_type_display(),
-                                'stage': media.bom.stage.display_name if media.bom.stage else None
-                            }
-                        
-                        media_data.append(media_info)
-                    
-                    # Prepare BOM data for frontend
-                    formatted_bom = []
-                    if bom_data:
-                        for item_data in bom_data:
-                            formatted_bom.append({
-                                'serial_number': item_data['serial_number'],
-                                'item_code': item_data['item'].item_code,
-                                'item_description': item_data['item'].item_description,
-                                'part_number': item_data['item'].part_number,
-                                'formatted_quantity': item_data['formatted_quantity'],
-                                'notes': item_data['notes'],
-                                'item_photo_url': item_data['item'].item_photo.url if item_data['item'].item_photo else None,
-                                'supplier': item_data['item'].supplier,
-                            })
-                    
-                    # Prepare assembly info
-                    assembly_info = {
-                        'current_product': {
-                            'id': station.current_product.id,
-                            'code': station.current_product.code,
-                            'name': station.current_product.name
-                        } if station.current_product else None,
-                        'current_stage': {
-                            'id': station.current_stage.id,
-                            'name': station.current_stage.display_name,
-                            'order': station.current_stage.order
-                        } if station.current_stage else None,
-                        'current_process': {
-                            'id': station.current_process.id,
-                            'name': station.current_process.name,
-                            'display_name': station.current_process.display_name,
-                            'order': station.current_process.order,
-                            'is_looped': station.current_process.is_looped,
-                            'loop_group': station.current_process.loop_group
-                        } if station.current_process else None,
-                        'quantity': station.product_quantity,
-                        'loop_mode': station.loop_mode,
-                        'clicker_enabled': station.clicker_enabled,
-                        'display_number': station.display_number,
-                        'bom_settings': {
-                            'show_single_unit': station.show_single_unit_bom,
-                            'show_batch': station.show_batch_bom,
-                        },
-                        'next_process': {
-                            'id': station.get_next_process().id,
-                            'name': station.get_next_process().name,
-                            'display_name': station.get_next_process().display_name
-                        } if station.get_next_process() else None,
-                        'previous_process': {
-                            'id': station.get_previous_process().id,  
-                            'name': station.get_previous_process().name,
-                            'display_name': station.get_previous_process().display_name
-                        } if station.get_previous_process() else None,
-                    }
-                    
-                    response_data = {
-                        'media': media_data,
-                        'bom_data': formatted_bom,
-                        'station_name': station.name,
-                        'assembly': assembly_info,
-                        'timestamp': time.time()
-                    }
-                    
-                    last_update = current_state
-                    yield f"data: {json.dumps(response_data)}\n\n"
-                
-                time.sleep(1)  # Check every 3 seconds
-                
-            except Station.DoesNotExist:
-                yield f"data: {json.dumps({'error': 'Station not found'})}\n\n"
-                break
-            except Exception as e:
-                yield f"data: {json.dumps({'error': str(e)})}\n\n"
-                time.sleep(10)
+# ===== TYPED SSE STREAM (SECTION DELTAS, EVENT IDS, RESUME) =====
 
-    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
-    response['Cache-Control'] = 'no-cache'
-    response['Connection'] = 'keep-alive'
-    response['X-Accel-Buffering'] = 'no'
-    return response
+# Sections of station_media_stream_enhanced; each goes out as an SSE event of that type
+STREAM_SECTIONS = ('media', 'bom_page', 'assembly', 'pagination', 'reload')
+# Event ids per station remembered for Last-Event-ID resume
+STREAM_REPLAY_SIZE = 64
+STREAM_REPLAY_TIMEOUT = 24 * 3600
+# Reconnect delay suggested to EventSource clients (ms)
+STREAM_RETRY_MS = 3000
+
+
+def _current_bom_page(station):
+    """
+    (pagination info, BOM lines) of the shared page a station's display is on.
+
+    The page is the product's shared pagination state, clamped to the BOM's
+    page count; (None, []) when the station has no BOM.
+    """
+    layout = station.get_current_bom_layout()
+    if not layout:
+        return None, []
+    bom_type = layout.template.bom_type
+    page = BOMPaginationManager.get_current_page(station.current_product_id, bom_type)
+    page = max(1, min(page, layout.total_pages))
+    bom_data = layout.items_for_display(station.display_number, page=page) if station.display_number else []
+    pagination_info = dict(
+        layout.pagination_info(),
+        bom_type=bom_type,
+        current_page=page,
+        has_next=page < layout.total_pages,
+        has_previous=page > 1,
+    )
+    return pagination_info, bom_data
+
+
+def _station_stream_sections(station_id):
+    """Sections of the station_media_stream_enhanced payload; returns (product id, sections)"""
+    station = get_object_or_404(Station, pk=station_id)
+    current_media = station.get_current_media()
+
+    # Prepare detailed media data for frontend
+    media_data = []
+    for media in current_media:
+        media_info = {
+            'id': media.id,
+            'url': media.cached_url,
+            'type': media.file.name.split('.')[-1].lower() if media.file else 'bom',
+            'duration': media.duration,
+            'media_type': media.get_media_type_display(),
+            'product_name': media.product.name,
+            'product_code': media.product.code,
+            'page_count': media.page_count,
+            'page_images': media.get_page_images(),
+        }
+        
+        if media.process:
+            media_info['process'] = {
+                'id': media.process.id,
+                'name': media.process.name,
+                'display_name': media.process.display_name,
+                'stage': media.process.stage.display_name,
+                'order': media.process.order,
+                'is_looped': media.process.is_looped,
+                'loop_group': media.process.loop_group
+            }
+        
+        if media.bom:
+            media_info['bom'] = {
+                'id': media.bom.id,
+                'type': media.bom.get_bom_type_display(),
+                'stage': media.bom.stage.display_name if media.bom.stage else None
+            }
+        
+        media_data.append(media_info)
+
+    pagination_info, bom_data = _current_bom_page(station)
+
+    # Prepare BOM data for frontend
+    formatted_bom = []
+    if bom_data:
+        for item_data in bom_data:
+            formatted_bom.append({
+                'serial_number': item_data['serial_number'],
+                'item_code': item_data['item'].item_code,
+                'item_description': item_data['item'].item_description,
+                'part_number': item_data['item'].part_number,
+                'formatted_quantity': item_data['formatted_quantity'],
+                'notes': item_data['notes'],
+                'item_photo_url': thumbnail_url(item_data['item'].item_photo, 'sm'),
+                'supplier': item_data['item'].supplier,
+            })
+
+    # Prepare assembly info
+    assembly_info = {
+        'station_name': station.name,
+        'current_product': {
+            'id': station.current_product.id,
+            'code': station.current_product.code,
+            'name': station.current_product.name
+        } if station.current_product else None,
+        'current_stage': {
+            'id': station.current_stage.id,
+            'name': station.current_stage.display_name,
+            'order': station.current_stage.order
+        } if station.current_stage else None,
+        'current_process': {
+            'id': station.current_process.id,
+            'name': station.current_process.name,
+            'display_name': station.current_process.display_name,
+            'order': station.current_process.order,
+            'is_looped': station.current_process.is_looped,
+            'loop_group': station.current_process.loop_group
+        } if station.current_process else None,
+        'quantity': station.product_quantity,
+        'loop_mode': station.loop_mode,
+        'clicker_enabled': station.clicker_enabled,
+        'display_number': station.display_number,
+        'bom_settings': {
+            'show_single_unit': station.show_single_unit_bom,
+            'show_batch': station.show_batch_bom,
+        },
+        'next_process': {
+            'id': station.get_next_process().id,
+            'name': station.get_next_process().name,
+            'display_name': station.get_next_process().display_name
+        } if station.get_next_process() else None,
+        'previous_process': {
+            'id': station.get_previous_process().id,  
+            'name': station.get_previous_process().name,
+            'display_name': station.get_previous_process().display_name
+        } if station.get_previous_process() else None,
+    }
+
+    sections = {
+        'media': media_data,
+        'bom_page': formatted_bom,
+        'assembly': assembly_info,
+        'pagination': pagination_info,
+        # Peeked, not popped - the display's slider page consumes the signal itself
+        'reload': shared_state.get(StateKeys.reload_signal(station.display_number)) if station.display_number else None,
+    }
+
+    return station.current_product_id, sections
+
+
+def _sse_event(event_type, data, event_id=None):
+    """One SSE event; with an id, EventSource reports it as Last-Event-ID on reconnect"""
+    event_id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"event: {event_type}\n{event_id_line}data: {json.dumps(data, default=str)}\n\n"
+
+
+def _last_event_id(request):
+    """Event id a reconnecting client saw last (header, or ?last_event_id= for a fresh page)"""
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _replayed_digests(station_id, event_id):
+    """Section digests a client held at event_id, or None if it left the replay buffer"""
+    if event_id is None:
+        return None
+    for entry_id, digests in shared_state.get(StateKeys.stream_replay(station_id)) or []:
+        if entry_id == event_id:
+            return digests
+    return None
+
+
+def _remember_stream_event(station_id, event_id, digests):
+    """Append an event id to the station's bounded replay buffer (no-op if a newer one is there)"""
+    key = StateKeys.stream_replay(station_id)
+    for attempt in range(BOMPaginationManager.CAS_ATTEMPTS):
+        stored = shared_state.get(key)
+        entries = stored or []
+        if entries and entries[-1][0] >= event_id:
+            return
+        entries = (entries + [[event_id, digests]])[-STREAM_REPLAY_SIZE:]
+        if shared_state.compare_and_set(key, stored, entries, STREAM_REPLAY_TIMEOUT):
+            return
+
+
+def _station_section_update(station_id, version, known_digests):
+    """
+    SSE events for the sections that differ from known_digests.
+
+    The events are tagged with station_state_version() as event id (only
+    the last one carries it, so a connection dropped mid-batch resumes from
+    the previous id). Returns (product id, section digests, SSE text).
+    Without known digests every section is sent except a pending reload
+    signal, which predates the connection.
+    """
+    product_id, sections = _station_stream_sections(station_id)
+    digests = {
+        section: hashlib.md5(json.dumps(sections[section], sort_keys=True, default=str).encode()).hexdigest()
+        for section in STREAM_SECTIONS
+    }
+    # Only remember the id if nothing changed while the sections were built
+    if station_state_version(station_id) == version:
+        _remember_stream_event(station_id, version, digests)
+
+    changed = [
+        section for section in STREAM_SECTIONS
+        if (known_digests.get(section) != digests[section] if known_digests is not None else section != 'reload')
+        and (section != 'reload' or sections['reload'])
+    ]
+    if not changed:
+        # A bare id still moves the client's Last-Event-ID forward
+        return product_id, digests, f"id: {version}\n\n"
+    return product_id, digests, ''.join(
+        _sse_event(section, sections[section], version if section == changed[-1] else None)
+        for section in changed
+    )
+
+
+def _station_section_stream(station_id, last_event_id=None):
+    """Blocking typed-event SSE generator for WSGI servers"""
+    yield f"retry: {STREAM_RETRY_MS}\n\n"
+    known_digests = _replayed_digests(station_id, last_event_id)
+    last_version = last_event_id if known_digests is not None else None
+    last_seq = station_events.last_seq
+    product_id = None
+    refresh = True
+    last_write = time.monotonic()
+    while True:
+        try:
+            if not refresh:
+                # Woken by the bus, or after STREAM_RECHECK_SECONDS for changes made by other workers
+                last_seq, events = station_events.wait(
+                    last_seq, station_id=station_id, product_id=product_id,
+                    timeout=STREAM_RECHECK_SECONDS
+                )
+            refresh = False
+
+            version = station_state_version(station_id)
+            if version == last_version:
+                if time.monotonic() - last_write >= STREAM_HEARTBEAT_SECONDS:
+                    last_write = time.monotonic()
+                    yield ": heartbeat\n\n"
+                continue
+            product_id, known_digests, text = _station_section_update(station_id, version, known_digests)
+            last_version = version
+            last_write = time.monotonic()
+            yield text
+
+        except Station.DoesNotExist:
+            yield _sse_event('error', {'error': 'Station not found'})
+            break
+        except Exception as e:
+            yield _sse_event('error', {'error': str(e)})
+            refresh = True
+            time.sleep(10)
+
+
+async def _station_section_stream_async(station_id, last_event_id=None):
+    """Async typed-event SSE generator for ASGI servers"""
+    section_update = sync_to_async(_station_section_update)
+    state_version = sync_to_async(station_state_version)
+    yield f"retry: {STREAM_RETRY_MS}\n\n"
+    known_digests = await sync_to_async(_replayed_digests)(station_id, last_event_id)
+    last_version = last_event_id if known_digests is not None else None
+    last_seq = station_events.last_seq
+    product_id = None
+    refresh = True
+    last_write = time.monotonic()
+    while True:
+        try:
+            if not refresh:
+                last_seq, events = await station_events.wait_async(
+                    last_seq, station_id=station_id, product_id=product_id,
+                    timeout=STREAM_RECHECK_SECONDS
+                )
+            refresh = False
+
+            version = await state_version(station_id)
+            if version == last_version:
+                if time.monotonic() - last_write >= STREAM_HEARTBEAT_SECONDS:
+                    last_write = time.monotonic()
+                    yield ": heartbeat\n\n"
+                continue
+            product_id, known_digests, text = await section_update(station_id, version, known_digests)
+            last_version = version
+            last_write = time.monotonic()
+            yield text
+
+        except Station.DoesNotExist:
+            yield _sse_event('error', {'error': 'Station not found'})
+            break
+        except Exception as e:
+            yield _sse_event('error', {'error': str(e)})
+            refresh = True
+            await asyncio.sleep(10)
+
+
+def station_media_stream_enhanced(request, station_id):
+    """
+    Typed SSE stream of a station's display state - woken by the station event bus.
+
+    Events are `media`, `bom_page`, `assembly`, `pagination` and `reload`,
+    each carrying only its own section and only when that section changed.
+    Event ids are events.station_state_version(); a client reconnecting
+    with Last-Event-ID still in the replay buffer is sent just the sections
+    that changed since, anyone else gets every section. Idle connections get
+    a comment heartbeat every STREAM_HEARTBEAT_SECONDS.
+    """
+    return _sse_response(
+        request, _station_section_stream, _station_section_stream_async, station_id, _last_event_id(request)
+    )
 
 
 
@@ -3768,7 +4514,7 @@ def get_station_media_with_bom(request, station_id):
         for media in filtered_media:
             media_info = {
                 'id': media.id,
-                'url': media.file.url if media.file else None,
+                'url': media.cached_url,
                 'type': media.file.name.split('.')[-1].lower() if media.file else 'unknown',
                 'duration': media.duration,
                 'media_type': media.get_media_type_display(),
@@ -3797,7 +4543,7 @@ def get_station_media_with_bom(request, station_id):
         for media in current_media:
             media_info = {
                 'id': media.id,
-                'url': media.file.url if media.file else None,
+                'url': media.cached_url,
                 'type': media.file.name.split('.')[-1].lower() if media.file else 'unknown',
                 'duration': media.duration,
                 'media_type': media.get_media_type_display(),
@@ -4042,41 +4788,93 @@ def bom_template_management(request):
     
     return render(request, 'bom_template_management.html', context)
 
+BULK_UPDATABLE_BOM_ITEM_FIELDS = ['cost_per_unit', 'supplier', 'is_active']
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def bulk_update_bom_items(request):
-    """Bulk update BOM items via AJAX"""
+    """
+    Bulk update BOM items via AJAX.
+
+    Body: {"updates": [{"id": 1, "cost_per_unit": "2.5", "supplier": "X", "is_active": true}, ...]}.
+    All rows are fetched with one in_bulk and validated in memory; valid
+    changes are written with bulk_update (only the fields each item touches)
+    in one transaction. Invalid entries are reported per id in 'failed'.
+    """
     try:
         data = json.loads(request.body)
         updates = data.get('updates', [])
+        if not isinstance(updates, list):
+            return JsonResponse({'error': 'updates must be a list'}, status=400)
         
-        updated_count = 0
+        failed = []
+        requested = {}
         for update in updates:
-            item_id = update.get('id')
-            if not item_id:
-                continue
-                
+            item_id = update.get('id') if isinstance(update, dict) else None
             try:
-                item = BOMItem.objects.get(id=item_id)
-                
-                # Update fields if provided
-                if 'cost_per_unit' in update:
-                    item.cost_per_unit = update['cost_per_unit']
-                if 'supplier' in update:
-                    item.supplier = update['supplier']
-                if 'is_active' in update:
-                    item.is_active = update['is_active']
-                    
-                item.save()
-                updated_count += 1
-                
-            except BOMItem.DoesNotExist:
+                item_id = int(item_id)
+            except (TypeError, ValueError):
+                failed.append({'id': item_id, 'error': 'Missing or invalid id'})
+                continue
+            # Several entries for one id are merged, later ones win
+            requested.setdefault(item_id, {}).update(
+                {field: update[field] for field in BULK_UPDATABLE_BOM_ITEM_FIELDS if field in update}
+            )
+        
+        items = BOMItem.objects.in_bulk(list(requested))
+        
+        # Validate everything before writing anything
+        by_fields = {}
+        for item_id, changes in requested.items():
+            item = items.get(item_id)
+            if item is None:
+                failed.append({'id': item_id, 'error': 'Item not found'})
+                continue
+            if not changes:
+                failed.append({'id': item_id, 'error': f'Nothing to update (allowed: {", ".join(BULK_UPDATABLE_BOM_ITEM_FIELDS)})'})
+                continue
+            
+            cleaned = {}
+            errors = []
+            for field_name, value in changes.items():
+                field = BOMItem._meta.get_field(field_name)
+                if value == '' and field.null:
+                    value = None
+                try:
+                    cleaned[field_name] = field.clean(value, item)
+                except ValidationError as e:
+                    errors.append(f"{field_name}: {' '.join(e.messages)}")
+            if errors:
+                failed.append({'id': item_id, 'error': '; '.join(errors)})
                 continue
+            
+            for field_name, value in cleaned.items():
+                setattr(item, field_name, value)
+            by_fields.setdefault(tuple(sorted(cleaned)), []).append(item)
+        
+        updated = [item for group in by_fields.values() for item in group]
+        if updated:
+            now = timezone.now()
+            with transaction.atomic():
+                for fields, group in by_fields.items():
+                    for item in group:
+                        item.updated_date = now
+                    BOMItem.objects.bulk_update(group, list(fields) + ['updated_date'], batch_size=500)
+                
+                # bulk_update skips post_save - invalidate the cached BOM expansions here
+                templates = set(
+                    BOMTemplateItem.objects.filter(item_id__in=[item.pk for item in updated])
+                    .values_list('bom_template_id', 'bom_template__product_id')
+                )
+                transaction.on_commit(lambda: bom_expansion_cache.bump(*(template_id for template_id, _ in templates)))
+                for product_id in {product_id for _, product_id in templates}:
+                    publish_station_change('bom', product_id=product_id)
         
         return JsonResponse({
             'success': True,
-            'message': f'Updated {updated_count} items successfully',
-            'updated_count': updated_count
+            'message': f'Updated {len(updated)} items successfully' + (f', {len(failed)} failed' if failed else ''),
+            'updated_count': len(updated),
+            'failed': failed,
         })
         
     except json.JSONDecodeError:
@@ -4085,33 +4883,10 @@ def bulk_update_bom_items(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 def export_all_bom_items_csv(request):
-    """Export all BOM items to CSV"""
-    import csv
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="all_bom_items.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Item Code', 'Description', 'Part Number', 'Unit', 
-        'Supplier', 'Cost per Unit', 'Weight per Unit', 'Active', 'Created Date'
-    ])
-    
-    items = BOMItem.objects.all().order_by('item_code')
-    for item in items:
-        writer.writerow([
-            item.item_code,
-            item.item_description,
-            item.part_number,
-            item.unit_of_measure,
-            item.supplier or '',
-            item.cost_per_unit or '',
-            item.weight_per_unit or '',
-            'Yes' if item.is_active else 'No',
-            item.created_date.strftime('%Y-%m-%d %H:%M:%S')
-        ])
-    
-    return response
+    """Export all BOM items to CSV, or XLSX with ?format=xlsx (streamed, see bom_export)"""
+    if request.GET.get('format') == 'xlsx':
+        return stream_xlsx([('BOM Items', all_items_rows())], 'all_bom_items.xlsx')
+    return stream_csv(all_items_rows(), 'all_bom_items.csv')
 
 
 from django.template import loader
@@ -4198,57 +4973,43 @@ def quick_add_bom_item(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 def export_bom_csv(request, template_id):
-    """Export BOM template to CSV"""
-    import csv
-    from django.http import HttpResponse
-    
-    template = get_object_or_404(BOMTemplate, pk=template_id)
+    """Export BOM template to CSV, or XLSX with ?format=xlsx (streamed, see bom_export)"""
+    template = get_object_or_404(BOMTemplate.objects.select_related('product'), pk=template_id)
     quantity = int(request.GET.get('quantity', 1))
+    filename = f"{template.template_name}_qty_{quantity}"
     
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{template.template_name}_qty_{quantity}.csv"'
-    
-    writer = csv.writer(response)
-    
-    # Write header
-    writer.writerow([
-        'S.NO', 'Item Code', 'Item Description', 'Part Number', 
-        'Quantity', 'Unit', 'Supplier', 'Cost per Unit', 'Line Cost', 'Notes'
-    ])
-    
-    # Write BOM data
-    bom_data = template.generate_bom_for_quantity(quantity)
-    total_cost = 0
+    if request.GET.get('format') == 'xlsx':
+        return stream_xlsx([(template.template_name, template_rows(template, quantity))], f"{filename}.xlsx")
+    return stream_csv(template_rows(template, quantity), f"{filename}.csv")
+
+def export_bom_templates_xlsx(request):
+    """
+    Export several BOM templates into one XLSX workbook, one sheet per template.
+
+    Templates are chosen with ?template_ids=1,2,3 or ?product_id=<id>
+    (all active templates of the product); ?quantity applies to all sheets.
+    """
+    templates = BOMTemplate.objects.select_related('product').order_by('product__code', 'bom_type', 'id')
+    template_ids = [int(pk) for pk in request.GET.get('template_ids', '').split(',') if pk.strip().isdigit()]
+    product_id = request.GET.get('product_id')
+    if template_ids:
+        templates = templates.filter(pk__in=template_ids)
+    elif product_id:
+        templates = templates.filter(product_id=product_id, is_active=True)
+    else:
+        return JsonResponse({'error': 'Pass template_ids or product_id'}, status=400)
     
-    for item_data in bom_data:
-        line_cost = (item_data['calculated_quantity'] * 
-                    (item_data['item'].cost_per_unit or 0))
-        total_cost += line_cost
-        
-        writer.writerow([
-            item_data['serial_number'],
-            item_data['item'].item_code,
-            item_data['item'].item_description,
-            item_data['item'].part_number,
-            item_data['calculated_quantity'],
-            item_data['item'].unit_of_measure,
-            item_data['item'].supplier or '',
-            item_data['item'].cost_per_unit or '',
-            f"{line_cost:.2f}" if line_cost > 0 else '',
-            item_data['notes'] or '',
-        ])
-    
-    # Write summary
-    writer.writerow([])
-    writer.writerow(['Summary'])
-    writer.writerow(['Total Items:', len(bom_data)])
-    writer.writerow(['Total Cost:', f"{total_cost:.2f}"])
-    writer.writerow(['Quantity:', quantity])
-    writer.writerow(['Template:', template.template_name])
-    writer.writerow(['Product:', f"{template.product.code} - {template.product.name}"])
-    writer.writerow(['Generated:', time.strftime('%Y-%m-%d %H:%M:%S')])
+    templates = list(templates)
+    if not templates:
+        return JsonResponse({'error': 'No BOM templates found'}, status=404)
     
-    return response
+    quantity = int(request.GET.get('quantity', 1))
+    sheets = [
+        (f"{template.product.code} {template.get_bom_type_display()}", template_rows(template, quantity))
+        for template in templates
+    ]
+    filename = f"{templates[0].product.code}_bom_templates.xlsx" if product_id and not template_ids else 'bom_templates.xlsx'
+    return stream_xlsx(sheets, filename)
 
 
 
@@ -4583,17 +5344,9 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 import json
-import openpyxl
-from openpyxl_image_loader import SheetImageLoader
 from PIL import Image
-import io
-import os
-import zipfile
-import tempfile
-from pathlib import Path
 from .models import (
     Product, Station, ProductMedia, BOMTemplate, BOMTemplateItem, 
     AssemblyProcess, AssemblyStage, BillOfMaterial, BOMItem
@@ -5281,7 +6034,8 @@ def get_bom_template_items(request, template_id):
             'base_quantity': float(item.base_quantity),
             'unit_of_measure': item.item.unit_of_measure,
             'notes': item.notes,
-            'item_photo_url': item.item.item_photo.url if item.item.item_photo else None,
+            'item_photo_url': thumbnail_url(item.item.item_photo, 'sm'),
+            'item_photo_full_url': item.item.item_photo.url if item.item.item_photo else None,
             'has_photo': bool(item.item.item_photo)
         } for item in items]
         
@@ -5531,18 +6285,15 @@ def upload_bom_items_excel(request, template_id):
         supplier = request.POST.get('supplier', '')
         overwrite_existing = request.POST.get('overwrite_existing') == 'true'
         
-        result = process_excel_file_for_template(
-            excel_file, template, unit_of_measure, supplier, overwrite_existing
+        # Large sheets take minutes - the import runs on the job workers
+        job = enqueue_job(
+            'BOM_EXCEL', excel_file,
+            template_id=template.id,
+            unit_of_measure=unit_of_measure,
+            supplier=supplier,
+            overwrite_existing=overwrite_existing,
         )
-        
-        if result['success']:
-            return JsonResponse({
-                'success': True,
-                'message': f"Successfully processed {result['created']} new items and {result['updated']} updated items. Skipped {result['skipped']} items.",
-                'errors': result['errors'] if result['errors'] else None
-            })
-        else:
-            return JsonResponse({'success': False, 'error': result['error']})
+        return JsonResponse(import_job_accepted(job, f"Excel import queued for {template}"))
             
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
@@ -5575,23 +6326,56 @@ def upload_product_media_zip(request):
         display_screen_2 = request.POST.get('display_screen_2') == 'true'
         display_screen_3 = request.POST.get('display_screen_3') == 'true'
         
-        result = process_zip_file_for_media(
-            product, zip_file, process, bom, default_duration,
-            display_screen_1, display_screen_2, display_screen_3
+        job = enqueue_job(
+            'MEDIA_ZIP', zip_file,
+            product_id=product.id,
+            process_id=process.id if process else None,
+            bom_id=bom.id if bom else None,
+            default_duration=default_duration,
+            display_screen_1=display_screen_1,
+            display_screen_2=display_screen_2,
+            display_screen_3=display_screen_3,
         )
-        
-        if result['success']:
-            return JsonResponse({
-                'success': True,
-                'message': f"Successfully processed {result['total_files']} files: {result['pdfs']} PDFs, {result['videos']} videos. Skipped {result['skipped']} files.",
-                'errors': result['errors'] if result['errors'] else None
-            })
-        else:
-            return JsonResponse({'success': False, 'error': result['error']})
+        return JsonResponse(import_job_accepted(job, f"ZIP import queued for {product.code}"))
             
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
+def import_job_accepted(job, message):
+    """Response of an upload view that handed its file to the import workers"""
+    return {
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': reverse('import_job_status', args=[job.id]),
+        'message': message,
+    }
+
+@require_http_methods(["GET"])
+def import_job_status(request, job_id):
+    """Progress of a background import job (polled by the upload dialogs)"""
+    job = get_object_or_404(ImportJob, id=job_id)
+    progress = job.get_progress()
+    data = {
+        'success': True,
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'total': job.total,
+        'done': job.done,
+        'percent': progress['percent'],
+        'eta_seconds': progress['eta_seconds'],
+        'errors': job.errors or None,
+        'error': job.error_message or None,
+    }
+    if job.status == 'DONE':
+        result = job.result
+        if job.kind == 'MEDIA_ZIP':
+            data['message'] = f"Successfully processed {result.get('total_files', 0)} files: {result.get('pdfs', 0)} PDFs, {result.get('videos', 0)} videos. Skipped {result.get('skipped', 0)} files."
+        else:
+            data['message'] = f"Successfully processed {result.get('created', 0)} new items and {result.get('updated', 0)} updated items. Skipped {result.get('skipped', 0)} items."
+    return JsonResponse(data)
+
 # ==============================================
 # UTILITY FUNCTIONS
 # ==============================================
@@ -5620,320 +6404,28 @@ def get_available_serial_numbers(request, template_id):
 # BULK UPLOAD PROCESSING FUNCTIONS
 # ==============================================
 
-def process_excel_file_for_template(excel_file, bom_template, default_unit, default_supplier, overwrite_existing):
-    """Process Excel file and create BOM items and template items"""
-    result = {
-        'success': False,
-        'created': 0,
-        'updated': 0,
-        'skipped': 0,
-        'errors': []
-    }
-    
-    try:
-        # Load workbook
-        workbook = openpyxl.load_workbook(excel_file, data_only=True)
-        sheet = workbook.active
-        
-        # Load images from the sheet
-        image_loader = SheetImageLoader(sheet)
-        
-        # Find header row
-        header_row = None
-        for row_num in range(1, 6):
-            row_values = [str(cell.value).strip().upper() if cell.value else '' for cell in sheet[row_num]]
-            if any('ITEM DESCRIPTION' in val or 'DESCRIPTION' in val for val in row_values):
-                header_row = row_num
-                break
-        
-        if header_row is None:
-            result['error'] = "Could not find header row with 'ITEM DESCRIPTION' column"
-            return result
-        
-        # Map column indices
-        headers = [str(cell.value).strip().upper() if cell.value else '' for cell in sheet[header_row]]
-        
-        col_mapping = {}
-        for idx, header in enumerate(headers):
-            if 'S.' in header and 'NO' in header:
-                col_mapping['s_no'] = idx
-            elif 'CODE' in header and 'ITEM' not in header:  # Just "Code" column, not "Item Code"
-                col_mapping['code'] = idx
-            elif 'ITEM DESCRIPTION' in header or 'DESCRIPTION' in header:
-                col_mapping['description'] = idx
-            elif 'PART NO' in header or 'PART_NO' in header:
-                col_mapping['part_no'] = idx
-            elif 'QTY' in header or 'QUANTITY' in header:
-                col_mapping['qty'] = idx
-            elif 'UOM' in header or ('UNIT' in header and 'MEASURE' in header):
-                col_mapping['uom'] = idx
-            elif 'PHOTO' in header or 'IMAGE' in header:
-                col_mapping['photo'] = idx
-        
-        # Validate required columns
-        required_cols = ['description', 'part_no']
-        missing_cols = [col for col in required_cols if col not in col_mapping]
-        if missing_cols:
-            result['error'] = f"Missing required columns: {missing_cols}"
-            return result
-        
-        # Process data rows
-        for row_num in range(header_row + 1, sheet.max_row + 1):
-            row = sheet[row_num]
-            
-            # Skip empty rows
-            if all(cell.value is None or str(cell.value).strip() == '' for cell in row):
-                continue
-            
-            try:
-                # Extract data
-                s_no = str(row[col_mapping.get('s_no', 0)].value).strip() if col_mapping.get('s_no') is not None else str(row_num - header_row)
-                code = str(row[col_mapping.get('code', 0)].value).strip() if col_mapping.get('code') is not None and row[col_mapping.get('code', 0)].value else ''
-                description = str(row[col_mapping['description']].value).strip() if row[col_mapping['description']].value else ''
-                part_no = str(row[col_mapping['part_no']].value).strip() if row[col_mapping['part_no']].value else ''
-                qty = str(row[col_mapping.get('qty', 0)].value).strip() if col_mapping.get('qty') is not None and row[col_mapping.get('qty', 0)].value else '1'
-                
-                # Extract UOM - use from Excel if available, otherwise use default
-                uom = ''
-                if 'uom' in col_mapping and col_mapping['uom'] is not None:
-                    uom_cell_value = row[col_mapping['uom']].value
-                    if uom_cell_value:
-                        uom = str(uom_cell_value).strip()
-                
-                # Use extracted UOM if available, otherwise fall back to default_unit
-                unit_of_measure = uom if uom else default_unit
-                
-                # Skip if essential data is missing
-                if not description or not part_no:
-                    result['skipped'] += 1
-                    continue
-                
-                # Use the Code column if provided, otherwise generate from description
-                if code:
-                    item_code = code.upper().replace(' ', '_').replace('-', '_')
-                    item_code = ''.join(c for c in item_code if c.isalnum() or c == '_')
-                else:
-                    item_code = description.upper().replace(' ', '_').replace('-', '_')
-                    item_code = ''.join(c for c in item_code if c.isalnum() or c == '_')
-                
-                # Ensure item_code is not empty
-                if not item_code:
-                    item_code = f"ITEM_{row_num - header_row}"
-                
-                # Check if BOM item exists
-                bom_item = None
-                try:
-                    bom_item = BOMItem.objects.get(item_code=item_code)
-                    if overwrite_existing:
-                        # Update existing item
-                        bom_item.item_description = description
-                        bom_item.part_number = part_no
-                        bom_item.unit_of_measure = unit_of_measure  # Use extracted or default UOM
-                        if default_supplier:
-                            bom_item.supplier = default_supplier
-                        
-                        # Handle image extraction for existing item
-                        if 'photo' in col_mapping:
-                            photo_cell = f"{openpyxl.utils.get_column_letter(col_mapping['photo'] + 1)}{row_num}"
-                            if image_loader.image_in(photo_cell):
-                                try:
-                                    image = image_loader.get(photo_cell)
-                                    if image:
-                                        # Delete old image if exists
-                                        if bom_item.item_photo:
-                                            bom_item.item_photo.delete(save=False)
-                                        
-                                        img_io = io.BytesIO()
-                                        if image.mode == 'RGBA':
-                                            image.save(img_io, format='PNG', optimize=True)
-                                            filename = f"{item_code.lower()}.png"
-                                        else:
-                                            if image.mode not in ['RGB', 'L']:
-                                                image = image.convert('RGB')
-                                            image.save(img_io, format='JPEG', quality=95, optimize=True)
-                                            filename = f"{item_code.lower()}.jpg"
-                                        
-                                        img_io.seek(0)
-                                        image_file = ContentFile(img_io.getvalue(), name=filename)
-                                        bom_item.item_photo = image_file
-                                except Exception as e:
-                                    result['errors'].append(f"Row {row_num}: Could not extract image - {str(e)}")
-                        
-                        bom_item.save()
-                        result['updated'] += 1
-                    # If not overwriting, just use the existing item
-                except BOMItem.DoesNotExist:
-                    # Create new BOM item
-                    bom_item_data = {
-                        'item_code': item_code,
-                        'item_description': description,
-                        'part_number': part_no,
-                        'unit_of_measure': unit_of_measure,  # Use extracted or default UOM
-                        'supplier': default_supplier or '',
-                        'is_active': True
-                    }
-                    
-                    # Handle image extraction for new item
-                    if 'photo' in col_mapping:
-                        photo_cell = f"{openpyxl.utils.get_column_letter(col_mapping['photo'] + 1)}{row_num}"
-                        if image_loader.image_in(photo_cell):
-                            try:
-                                image = image_loader.get(photo_cell)
-                                if image:
-                                    img_io = io.BytesIO()
-                                    if image.mode == 'RGBA':
-                                        image.save(img_io, format='PNG', optimize=True)
-                                        filename = f"{item_code.lower()}.png"
-                                    else:
-                                        if image.mode not in ['RGB', 'L']:
-                                            image = image.convert('RGB')
-                                        image.save(img_io, format='JPEG', quality=95, optimize=True)
-                                        filename = f"{item_code.lower()}.jpg"
-                                    
-                                    img_io.seek(0)
-                                    image_file = ContentFile(img_io.getvalue(), name=filename)
-                                    bom_item_data['item_photo'] = image_file
-                            except Exception as e:
-                                result['errors'].append(f"Row {row_num}: Could not extract image - {str(e)}")
-                    
-                    bom_item = BOMItem.objects.create(**bom_item_data)
-                    result['created'] += 1
-                
-                # Create or update BOM Template Item
-                try:
-                    serial_number = int(s_no) if s_no.isdigit() else row_num - header_row
-                    
-                    # Parse quantity - handle different formats
-                    try:
-                        base_quantity = float(qty) if qty.replace('.', '').replace(',', '').isdigit() else 1.0
-                    except (ValueError, AttributeError):
-                        base_quantity = 1.0
-                    
-                    # Check if template item already exists with this serial number
-                    try:
-                        template_item = BOMTemplateItem.objects.get(
-                            bom_template=bom_template,
-                            serial_number=serial_number
-                        )
-                        
-                        if overwrite_existing:
-                            template_item.item = bom_item
-                            template_item.base_quantity = base_quantity
-                            template_item.save()
-                        
-                    except BOMTemplateItem.DoesNotExist:
-                        # Create new template item
-                        BOMTemplateItem.objects.create(
-                            bom_template=bom_template,
-                            item=bom_item,
-                            serial_number=serial_number,
-                            base_quantity=base_quantity,
-                            is_active=True
-                        )
-                        
-                except Exception as e:
-                    result['errors'].append(f"Row {row_num}: Error creating template item - {str(e)}")
-                    
-            except Exception as e:
-                result['errors'].append(f"Row {row_num}: {str(e)}")
-                continue
-        
-        result['success'] = True
-        
-    except Exception as e:
-        result['error'] = str(e)
-    
-    return result
+def process_excel_file_for_template(excel_file, bom_template, default_unit, default_supplier, overwrite_existing,
+                                    resume_from=0, progress=None, progress_every=100):
+    """
+    Process Excel file and create BOM items and template items (streaming, see bom_import).
+
+    Background jobs pass resume_from (data rows already committed) and a
+    progress(rows_done, total_rows, result) callback; rows are then written
+    in committed batches of progress_every rows.
+    """
+    return import_bom_excel(
+        excel_file, bom_template, default_unit, default_supplier, overwrite_existing,
+        resume_from=resume_from, progress=progress, progress_every=progress_every
+    )
 
 def process_zip_file_for_media(product, zip_file, process, bom, default_duration, 
                               display_screen_1, display_screen_2, display_screen_3):
-    """Process uploaded ZIP file and create ProductMedia objects"""
-    result = {
-        'success': False,
-        'total_files': 0,
-        'pdfs': 0,
-        'videos': 0,
-        'skipped': 0,
-        'errors': []
-    }
-    
-    # Supported file extensions
-    PDF_EXTENSIONS = {'.pdf'}
-    VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv', '.wmv', '.flv', '.webm'}
-    
-    try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Extract zip file
-            with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            # Process all files in the extracted directory
-            for root, dirs, files in os.walk(temp_dir):
-                for filename in files:
-                    file_path = os.path.join(root, filename)
-                    file_ext = Path(filename).suffix.lower()
-                    
-                    # Skip hidden files and system files
-                    if filename.startswith('.') or filename.startswith('__MACOSX'):
-                        continue
-                    
-                    try:
-                        # Determine media type based on extension
-                        media_type = None
-                        duration = None
-                        
-                        if file_ext in PDF_EXTENSIONS:
-                            media_type = 'PROCESS_DOCUMENT'
-                            result['pdfs'] += 1
-                        elif file_ext in VIDEO_EXTENSIONS:
-                            media_type = 'VIDEO'
-                            duration = default_duration
-                            result['videos'] += 1
-                        else:
-                            result['skipped'] += 1
-                            continue
-                        
-                        # Read file content
-                        with open(file_path, 'rb') as f:
-                            file_content = f.read()
-                        
-                        # Create ContentFile
-                        django_file = ContentFile(file_content, name=filename)
-                        
-                        # Create ProductMedia object
-                        media_data = {
-                            'product': product,
-                            'media_type': media_type,
-                            'file': django_file,
-                            'display_screen_1': display_screen_1,
-                            'display_screen_2': display_screen_2,
-                            'display_screen_3': display_screen_3,
-                        }
-                        
-                        # Add optional fields
-                        if process:
-                            media_data['process'] = process
-                        if bom:
-                            media_data['bom'] = bom
-                        if duration:
-                            media_data['duration'] = duration
-                        
-                        # Create the ProductMedia object
-                        ProductMedia.objects.create(**media_data)
-                        result['total_files'] += 1
-                        
-                    except Exception as e:
-                        result['errors'].append(f"{filename}: {str(e)}")
-                        continue
-        
-        result['success'] = True
-        
-    except zipfile.BadZipFile:
-        result['error'] = "Invalid ZIP file"
-    except Exception as e:
-        result['error'] = str(e)
-    
-    return result
+    """Process uploaded ZIP file and create ProductMedia objects (streaming, see media_import)"""
+    return import_media_zip(
+        product, zip_file, process=process, bom=bom, default_duration=default_duration,
+        display_screen_1=display_screen_1, display_screen_2=display_screen_2,
+        display_screen_3=display_screen_3
+    )
 
 
 
@@ -5953,7 +6445,6 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views import View
-from django.core.cache import cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -5977,7 +6468,7 @@ class TriggerStationsReloadView(View):
             timestamp = int(time.time() * 1000)  # Current timestamp in milliseconds
             
             for target_station in target_stations:
-                signal_key = f"station_{target_station}_reload_signal"
+                signal_key = StateKeys.reload_signal(target_station)
                 signal_data = {
                     'triggered_by': source_station,
                     'timestamp': timestamp,
@@ -5985,12 +6476,15 @@ class TriggerStationsReloadView(View):
                     'reason': 'triggered_by_station_1_left_arrow'
                 }
                 
-                # Store in cache with 30 second expiration
-                cache.set(signal_key, signal_data, 30)
+                # Store in shared state with 30 second expiration
+                shared_state.set(signal_key, signal_data, 30)
                 reload_signals[target_station] = signal_data
                 
                 logger.info(f"Created reload signal for station {target_station}: {signal_data}")
             
+            # Reload signals are keyed by display number - wake every display
+            publish_station_change('reload', target_stations=target_stations)
+            
             return JsonResponse({
                 'success': True,
                 'message': f'Reload triggered for stations {target_stations}',
@@ -6032,12 +6526,11 @@ class CheckReloadSignalView(View):
                     'error': 'Display number required'
                 }, status=400)
             
-            signal_key = f"station_{display_number}_reload_signal"
-            signal_data = cache.get(signal_key)
+            # Read and clear in one step so the signal only triggers once
+            signal_key = StateKeys.reload_signal(display_number)
+            signal_data = shared_state.pop(signal_key)
             
             if signal_data:
-                # Signal found - clear it so it only triggers once
-                cache.delete(signal_key)
                 
                 logger.info(f"Station {display_number} found reload signal: {signal_data}")
                 
@@ -6068,7 +6561,6 @@ class CheckReloadSignalView(View):
 
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
-from django.core.cache import cache
 import json
 import time
 
@@ -6092,9 +6584,9 @@ def sync_bom_pagination(request, station_id):
                 'error': 'Missing required parameters'
             }, status=400)
         
-        # Store sync signal in cache for Display 2
-        cache_key_display2 = f'bom_sync_station_{station_id}_display_2'
-        cache.set(cache_key_display2, {
+        # Store sync signal in shared state for Display 2
+        cache_key_display2 = StateKeys.bom_sync(station_id, 2)
+        shared_state.set(cache_key_display2, {
             'triggered_by': source_display,
             'target_page': target_page,
             'total_pages': total_pages,
@@ -6103,9 +6595,9 @@ def sync_bom_pagination(request, station_id):
             'timestamp': time.time()
         }, timeout=10)  # Signal expires after 10 seconds
         
-        # Store sync signal in cache for Display 3
-        cache_key_display3 = f'bom_sync_station_{station_id}_display_3'
-        cache.set(cache_key_display3, {
+        # Store sync signal in shared state for Display 3
+        cache_key_display3 = StateKeys.bom_sync(station_id, 3)
+        shared_state.set(cache_key_display3, {
             'triggered_by': source_display,
             'target_page': target_page,
             'total_pages': total_pages,
@@ -6114,6 +6606,8 @@ def sync_bom_pagination(request, station_id):
             'timestamp': time.time()
         }, timeout=10)
         
+        publish_station_change('bom_sync', target_page=target_page)
+        
         return JsonResponse({
             'success': True,
             'message': f'BOM sync signal broadcasted to displays 2 & 3',
@@ -6150,14 +6644,11 @@ def check_bom_sync(request, station_id):
                 'error': 'display_number parameter required'
             }, status=400)
         
-        # Check cache for sync signal
-        cache_key = f'bom_sync_station_{station_id}_display_{display_number}'
-        sync_data = cache.get(cache_key)
+        # Check shared state for sync signal, clearing it as it is read (one-time use)
+        cache_key = StateKeys.bom_sync(station_id, display_number)
+        sync_data = shared_state.pop(cache_key)
         
         if sync_data:
-            # Clear the signal after reading (one-time use)
-            cache.delete(cache_key)
-            
             return JsonResponse({
                 'success': True,
                 'should_sync': True,